@@ -20,9 +20,15 @@ def health_check():
 def generate_story():
     data = request.get_json()
     
+    # Accept either a list of records or {"dataset_handle": ..., "data": [...]}
+    dataset_handle = None
+    if isinstance(data, dict):
+        dataset_handle = data.get('dataset_handle')
+        data = data.get('data')
+    
     # Use storytelling engine
     engine = StorytellingEngine()
-    story = engine.analyze_data(data or [])
+    story = engine.analyze_data(data or [], dataset_handle)
     
     return jsonify(story)
 
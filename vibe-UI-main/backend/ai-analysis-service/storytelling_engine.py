@@ -1,7 +1,11 @@
 import requests
 import json
 import os
+import sys
+import random
 from typing import Dict, Any, List, Optional
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared'))
+from dataset_store import dataset_store
 
 class StorytellingEngine:
     """AI-powered storytelling engine that generates insights from data"""
@@ -10,23 +14,31 @@ class StorytellingEngine:
         """Initialize the storytelling engine"""
         self.llm_service_url = os.getenv('LLM_SERVICE_URL', 'http://llm-integration-service:5005')
         self.anomaly_service_url = os.getenv('ANOMALY_SERVICE_URL', 'http://anomaly-detection-service:5006')
+        self.data_service_url = os.getenv('DATA_SERVICE_URL', 'http://data-processing-service:5002')
     
-    def analyze_data(self, data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def analyze_data(self, data: List[Dict[str, Any]], dataset_handle: Optional[str] = None) -> Dict[str, Any]:
         """
         Analyze data and generate storytelling insights
         
         Args:
             data: List of data records
+            dataset_handle: Handle of the dataset in the shared dataset store (optional)
             
         Returns:
             Dictionary containing storytelling insights
         """
         try:
+            row_count = None
+            if dataset_handle and not data:
+                # Only a small sample of a stored dataset is needed for the description and sample
+                row_count = dataset_store.info(dataset_handle)["rowCount"]
+                data = self._fetch_sample(dataset_handle)
+            
             # Detect anomalies in the data
-            anomalies = self._detect_anomalies(data)
+            anomalies = self._detect_anomalies(data, dataset_handle)
             
             # Prepare data description
-            data_description = self._describe_data(data)
+            data_description = self._describe_data(data, row_count)
             data_sample = self._create_sample(data)
             
             # Call LLM integration service
@@ -51,12 +63,13 @@ class StorytellingEngine:
             # Fallback if there's an error
             return self._create_fallback_insights()
     
-    def _describe_data(self, data: List[Dict[str, Any]]) -> str:
+    def _describe_data(self, data: List[Dict[str, Any]], row_count: Optional[int] = None) -> str:
         """
         Create a description of the data structure
         
         Args:
             data: List of data records
+            row_count: Total number of records when data is only a sample (optional)
             
         Returns:
             String description of the data
@@ -73,7 +86,10 @@ class StorytellingEngine:
             if data and col in data[0]:
                 types[col] = type(data[0][col]).__name__
         
-        return f"Dataset with {len(data)} records and columns: {', '.join(columns)} (types: {', '.join([f'{k}:{v}' for k,v in types.items()])})"
+        if row_count is None:
+            row_count = len(data)
+        
+        return f"Dataset with {row_count} records and columns: {', '.join(columns)} (types: {', '.join([f'{k}:{v}' for k,v in types.items()])})"
     
     def _create_sample(self, data: List[Dict[str, Any]], max_records: int = 5) -> str:
         """
@@ -89,8 +105,38 @@ class StorytellingEngine:
         if not data:
             return ""
         
-        sample = data[:max_records]
-        return json.dumps(sample, indent=2)
+        if len(data) <= max_records:
+            sample = data
+        else:
+            # Seeded so the same data always produces the same prompt
+            indices = sorted(random.Random(0).sample(range(len(data)), max_records))
+            sample = [data[i] for i in indices]
+        return json.dumps(sample, indent=2, default=str)
+    
+    def _fetch_sample(self, dataset_handle: str, max_records: int = 5) -> List[Dict[str, Any]]:
+        """
+        Get a representative sample of a stored dataset from the data processing service
+        
+        Args:
+            dataset_handle: Handle of the stored dataset
+            max_records: Maximum number of records in the sample
+            
+        Returns:
+            List of sampled records, or the first records of the dataset if sampling fails
+        """
+        try:
+            response = requests.post(
+                f"{self.data_service_url}/api/sample",
+                json={"dataset_handle": dataset_handle, "size": max_records, "seed": 0},
+                timeout=30
+            )
+            
+            if response.status_code == 200:
+                return response.json().get("data", [])
+        except Exception as e:
+            print(f"Error calling data processing service for sample: {e}")
+        
+        return dataset_store.get_records(dataset_handle, 0, max_records)
     
     def _call_llm_service(self, data_description: str, data_sample: str) -> Optional[Dict[str, Any]]:
         """
@@ -134,20 +180,22 @@ class StorytellingEngine:
             print(f"Error calling LLM service: {e}")
             return None
     
-    def _detect_anomalies(self, data: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    def _detect_anomalies(self, data: List[Dict[str, Any]], dataset_handle: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """
         Detect anomalies in the data using the anomaly detection service
         
         Args:
             data: List of data records
+            dataset_handle: Handle of the stored dataset; sent instead of the records when given
             
         Returns:
             Dictionary with anomaly detection results or None if failed
         """
         try:
+            payload = {"dataset_handle": dataset_handle} if dataset_handle else {"data": data}
             response = requests.post(
                 f"{self.anomaly_service_url}/api/quick-detect",
-                json={"data": data},
+                json=payload,
                 timeout=30
             )
             
@@ -3,7 +3,7 @@ import pandas as pd
 from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
 from sklearn.cluster import DBSCAN
-from typing import Dict, Any, List, Tuple, Optional
+from typing import Dict, Any, List, Tuple, Optional, Union
 import json
 
 class AnomalyDetector:
@@ -15,23 +15,23 @@ class AnomalyDetector:
         self.scaler = StandardScaler()
         self.dbscan = DBSCAN(eps=0.5, min_samples=5)
     
-    def detect_anomalies(self, data: List[Dict[str, Any]], method: str = "isolation_forest") -> Dict[str, Any]:
+    def detect_anomalies(self, data: Union[List[Dict[str, Any]], pd.DataFrame], method: str = "isolation_forest") -> Dict[str, Any]:
         """
         Detect anomalies in the given data
         
         Args:
-            data: List of data records
+            data: List of data records or a DataFrame
             method: Anomaly detection method ("isolation_forest", "dbscan", or "statistical")
             
         Returns:
             Dictionary containing anomaly detection results
         """
-        if not data:
+        if data is None or len(data) == 0:
             return {"anomalies": [], "summary": "No data provided"}
         
         try:
             # Convert to DataFrame
-            df = pd.DataFrame(data)
+            df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
             
             # Select numeric columns
             numeric_columns = df.select_dtypes(include=[np.number]).columns.tolist()
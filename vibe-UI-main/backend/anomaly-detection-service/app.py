@@ -1,7 +1,10 @@
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared'))
 from anomaly_detector import AnomalyDetector
+from dataset_store import dataset_store
 
 app = Flask(__name__)
 CORS(app, resources={r"/api/*": {"origins": "*"}})
@@ -9,6 +12,13 @@ CORS(app, resources={r"/api/*": {"origins": "*"}})
 # Initialize the anomaly detector
 detector = AnomalyDetector()
 
+def _resolve_records(data):
+    """Get records from the request body, or a DataFrame from the dataset store when a handle is given"""
+    dataset_handle = data.get('dataset_handle')
+    if dataset_handle:
+        return dataset_store.get_dataframe(dataset_handle)
+    return data.get('data', [])
+
 # Health check endpoint
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -33,10 +43,10 @@ def detect_anomalies():
         data = request.get_json()
         
         # Extract data and parameters
-        records = data.get('data', [])
+        records = _resolve_records(data)
         method = data.get('method', 'isolation_forest')
         
-        if not records:
+        if len(records) == 0:
             return jsonify({"error": "No data provided"}), 400
         
         # Validate method
@@ -51,6 +61,8 @@ def detect_anomalies():
         
         return jsonify(results)
         
+    except KeyError as e:
+        return jsonify({"error": f"Dataset not found: {str(e)}"}), 404
     except Exception as e:
         return jsonify({"error": f"Anomaly detection failed: {str(e)}"}), 500
 
@@ -59,9 +71,9 @@ def detect_anomalies():
 def quick_detect():
     try:
         data = request.get_json()
-        records = data.get('data', [])
+        records = _resolve_records(data)
         
-        if not records:
+        if len(records) == 0:
             return jsonify({"error": "No data provided"}), 400
         
         # Use default method (isolation forest)
@@ -69,6 +81,8 @@ def quick_detect():
         
         return jsonify(results)
         
+    except KeyError as e:
+        return jsonify({"error": f"Dataset not found: {str(e)}"}), 404
     except Exception as e:
         return jsonify({"error": f"Quick anomaly detection failed: {str(e)}"}), 500
 
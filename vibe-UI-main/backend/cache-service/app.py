@@ -1,14 +1,35 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import os
-from cache_manager import CacheManager
+import json
+import datetime
+import threading
+from cache_manager import CacheManager, is_reserved_namespace
+from cache_warmer import CacheWarmer, WARM_TOP_N, WARM_CONCURRENCY
+from chunked_values import ChunkedValue
+from value_codecs import CODECS
+
+class CacheJSONProvider(DefaultJSONProvider):
+    """JSON provider that writes the datetimes restored by binary codecs as ISO 8601"""
+    
+    @staticmethod
+    def default(o):
+        if isinstance(o, (datetime.date, datetime.time)):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
 
 app = Flask(__name__)
+app.json = CacheJSONProvider(app)
 CORS(app, resources={r"/api/*": {"origins": "*"}})
 
 # Initialize the cache manager
 cache_manager = CacheManager()
 
+# Count reads and warm the most read entries on startup and on schedule
+cache_warmer = CacheWarmer(cache_manager)
+cache_warmer.start()
+
 # Health check endpoint
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -27,34 +48,107 @@ def set_cache():
         value = data.get('value')
         ttl = data.get('ttl')
         tags = data.get('tags', [])
+        codec = data.get('codec')
+        recipe = data.get('recipe')
         
         if not key or value is None:
             return jsonify({"error": "Key and value are required"}), 400
+        if codec is not None and codec != 'auto' and codec not in CODECS:
+            return jsonify({"error": f"Invalid codec. Available codecs: {list(CODECS) + ['auto']}"}), 400
+        if recipe is not None:
+            recipe_error = cache_warmer.validate_recipe(recipe)
+            if recipe_error:
+                return jsonify({"error": recipe_error}), 400
         
+        # Request values are JSON already, so large ones are stored as JSON to be streamed back
         if tags:
-            success = cache_manager.set_with_tags(key, value, tags, ttl)
+            success = cache_manager.set_with_tags(key, value, tags, ttl, codec, streamable=True)
         else:
-            success = cache_manager.set(key, value, ttl)
+            success = cache_manager.set(key, value, ttl, codec, streamable=True)
+        
+        if success and recipe is not None:
+            # Lets warm-ups recompute the entry after it expires
+            cache_warmer.save_recipe(key, recipe)
         
         if success:
             return jsonify({"message": "Value cached successfully"}), 201
         else:
             return jsonify({"error": "Failed to cache value"}), 500
-            
+    
     except Exception as e:
         return jsonify({"error": f"Cache set failed: {str(e)}"}), 500
 
+# Multi-get endpoint: several keys in one request and one Redis round trip
+@app.route('/api/cache/mget', methods=['POST'])
+def get_many_cache():
+    try:
+        data = request.get_json() or {}
+        keys = data.get('keys')
+        
+        if not isinstance(keys, list) or not keys:
+            return jsonify({"error": "A non-empty list of keys is required"}), 400
+        
+        cache_warmer.record_access(keys)
+        values = cache_manager.get_many(keys)
+        return jsonify({
+            "values": values,
+            "missing": [key for key in keys if key not in values]
+        }), 200
+    except Exception as e:
+        return jsonify({"error": f"Cache mget failed: {str(e)}"}), 500
+
+# Multi-set endpoint: several entries, each with its own TTL and tags
+@app.route('/api/cache/mset', methods=['POST'])
+def set_many_cache():
+    try:
+        data = request.get_json() or {}
+        entries = data.get('entries')
+        
+        if not isinstance(entries, list) or not entries:
+            return jsonify({"error": "A non-empty list of entries is required"}), 400
+        for entry in entries:
+            if not isinstance(entry, dict) or not entry.get('key') or entry.get('value') is None:
+                return jsonify({"error": "Every entry needs a key and a value"}), 400
+            codec = entry.get('codec')
+            if codec is not None and codec != 'auto' and codec not in CODECS:
+                return jsonify({"error": f"Invalid codec. Available codecs: {list(CODECS) + ['auto']}"}), 400
+            if entry.get('recipe') is not None:
+                recipe_error = cache_warmer.validate_recipe(entry['recipe'])
+                if recipe_error:
+                    return jsonify({"error": f"{entry['key']}: {recipe_error}"}), 400
+        
+        results = cache_manager.set_many(entries, streamable=True)
+        stored = sum(1 for success in results.values() if success)
+        for entry in entries:
+            if entry.get('recipe') is not None and results.get(entry['key']):
+                cache_warmer.save_recipe(entry['key'], entry['recipe'])
+        return jsonify({
+            "results": results,
+            "stored": stored
+        }), 201 if stored == len(results) else 207
+    except Exception as e:
+        return jsonify({"error": f"Cache mset failed: {str(e)}"}), 500
+
 # Get cache value endpoint
 @app.route('/api/cache/<key>', methods=['GET'])
 def get_cache(key):
     try:
-        value = cache_manager.get(key)
+        cache_warmer.record_access([key])
+        value = cache_manager.get(key, stream=True)
         
-        if value is not None:
+        if isinstance(value, ChunkedValue):
+            # Send large values chunk by chunk as they are read from Redis; if a
+            # chunk has meanwhile been removed the connection is dropped mid-body
+            def generate():
+                yield '{"key": ' + json.dumps(key) + ', "value": '
+                yield from value
+                yield '}'
+            return Response(generate(), mimetype='application/json'), 200
+        elif value is not None:
             return jsonify({"key": key, "value": value}), 200
         else:
             return jsonify({"error": "Key not found"}), 404
-            
+    
     except Exception as e:
         return jsonify({"error": f"Cache get failed: {str(e)}"}), 500
 
@@ -68,7 +162,7 @@ def delete_cache(key):
             return jsonify({"message": "Value deleted successfully"}), 200
         else:
             return jsonify({"error": "Key not found"}), 404
-            
+    
     except Exception as e:
         return jsonify({"error": f"Cache delete failed: {str(e)}"}), 500
 
@@ -101,18 +195,83 @@ def get_stats():
     except Exception as e:
         return jsonify({"error": f"Stats retrieval failed: {str(e)}"}), 500
 
-# Flush all cache endpoint
+# Bump namespace generation endpoint
+@app.route('/api/cache/namespaces/<namespace>/bump', methods=['POST'])
+def bump_namespace(namespace):
+    try:
+        if ':' in namespace:
+            return jsonify({"error": "Namespace must not contain ':'"}), 400
+        if is_reserved_namespace(namespace):
+            return jsonify({"error": f"Namespace '{namespace}' is reserved for the cache service"}), 400
+        
+        generation = cache_manager.bump_namespace(namespace)
+        return jsonify({
+            "message": f"Namespace '{namespace}' invalidated",
+            "namespace": namespace,
+            "generation": generation
+        }), 200
+    except Exception as e:
+        return jsonify({"error": f"Namespace bump failed: {str(e)}"}), 500
+
+# Cache warm-up endpoint: replay the recipes of the most read keys that are not cached
+@app.route('/api/cache/warm', methods=['POST'])
+def warm_cache():
+    try:
+        data = request.get_json(silent=True) or {}
+        top_n = int(data.get('top', WARM_TOP_N))
+        concurrency = int(data.get('concurrency', WARM_CONCURRENCY))
+        if top_n <= 0 or concurrency <= 0:
+            return jsonify({"error": "top and concurrency must be positive"}), 400
+        
+        thread = threading.Thread(target=cache_warmer.warm, args=(top_n, concurrency), daemon=True)
+        thread.start()
+        return jsonify({"message": "Cache warm-up started"}), 202
+    except ValueError:
+        return jsonify({"error": "top and concurrency must be integers"}), 400
+    except Exception as e:
+        return jsonify({"error": f"Cache warm-up failed: {str(e)}"}), 500
+
+# Last cache warm-up endpoint
+@app.route('/api/cache/warm', methods=['GET'])
+def get_warm_status():
+    if cache_warmer.last_run is None:
+        return jsonify({"error": "No warm-up has run yet"}), 404
+    return jsonify(cache_warmer.last_run), 200
+
+# Prometheus metrics endpoint
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    try:
+        return Response(cache_manager.metrics_text(), mimetype='text/plain; version=0.0.4')
+    except Exception as e:
+        return jsonify({"error": f"Metrics retrieval failed: {str(e)}"}), 500
+
+# Flush cache endpoint; ?namespace= limits the flush to one key prefix
 @app.route('/api/cache/flush', methods=['DELETE'])
 def flush_cache():
     try:
-        success = cache_manager.flush_all()
-        if success:
-            return jsonify({"message": "Cache flushed successfully"}), 200
-        else:
-            return jsonify({"error": "Failed to flush cache"}), 500
+        namespace = request.args.get('namespace')
+        if namespace is not None and not namespace:
+            return jsonify({"error": "Namespace must not be empty"}), 400
+        if namespace is not None and is_reserved_namespace(namespace):
+            return jsonify({"error": f"Namespace '{namespace}' is reserved for the cache service"}), 400
+        
+        job = cache_manager.flush_namespace(namespace)
+        return jsonify({"message": "Cache flush started", "job": job}), 202
     except Exception as e:
         return jsonify({"error": f"Cache flush failed: {str(e)}"}), 500
 
+# Flush progress endpoint
+@app.route('/api/cache/flush/<job_id>', methods=['GET'])
+def get_flush_job(job_id):
+    try:
+        job = cache_manager.get_flush_job(job_id)
+        if job is None:
+            return jsonify({"error": "Flush job not found"}), 404
+        return jsonify(job), 200
+    except Exception as e:
+        return jsonify({"error": f"Flush job retrieval failed: {str(e)}"}), 500
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5005))
     app.run(host='0.0.0.0', port=port, debug=True)
\ No newline at end of file
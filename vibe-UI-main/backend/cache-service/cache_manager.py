@@ -1,9 +1,72 @@
 import redis
 import json
 import os
+import uuid
+import time
+import math
+import random
 import hashlib
-from typing import Any, Optional, Dict, List
+import threading
+from typing import Any, Callable, Optional, Dict, Iterator, List, Tuple
 from datetime import datetime, timedelta
+from value_codecs import (
+    encode_value, decode_value, encode_manifest, parse_manifest, parse_header, iter_decompress, HEADER_SIZE
+)
+from chunked_values import (
+    CHUNK_THRESHOLD, CHUNK_SIZE, CHUNK_PIPELINE_DEPTH, CHUNK_TTL_MARGIN,
+    ChunkedValue, IncompleteValueError, chunk_key, is_chunk_key, is_streamable
+)
+from local_cache import LocalCache, MISSING
+from cache_metrics import CacheMetrics
+
+# Keys removed per UNLINK when invalidating a tag
+INVALIDATE_BATCH_SIZE = int(os.getenv('CACHE_INVALIDATE_BATCH_SIZE', 1000))
+
+# Tag sets outlive the entries they index by this many seconds
+TAG_TTL_MARGIN = 3600
+
+# Commands _queue_tags adds to a pipeline per tag
+TAG_COMMANDS = 3
+
+# In-process L1 cache in front of Redis, kept coherent across replicas over pub/sub
+L1_ENABLED = os.getenv('CACHE_L1_ENABLED', 'false').lower() == 'true'
+INVALIDATION_CHANNEL = os.getenv('CACHE_INVALIDATION_CHANNEL', 'cache:invalidations')
+
+# Probabilistic early recomputation (XFetch): larger beta refreshes earlier
+XFETCH_BETA = float(os.getenv('CACHE_XFETCH_BETA', 1.0))
+# Longest a caller may hold the right to recompute a key, in seconds
+RECOMPUTE_LOCK_TTL = int(os.getenv('CACHE_RECOMPUTE_LOCK_TTL', 30))
+# How long callers missing a key wait for another caller's recomputation
+RECOMPUTE_WAIT = float(os.getenv('CACHE_RECOMPUTE_WAIT', 5))
+RECOMPUTE_POLL_INTERVAL = 0.05
+
+# Prefix of the keys the service keeps for itself (generation counters, the
+# access log and warm-up recipes), which survive flush_all
+SERVICE_KEY_PREFIX = "cache:"
+
+# Generation counters of versioned namespaces, and how long a replica uses a
+# generation it read before reading it again (bumps made by other replicas
+# normally arrive sooner over the invalidation channel). The counters have no
+# TTL; run Redis with a volatile-* or noeviction maxmemory-policy so they are
+# never evicted. Only bumps create counters: a namespace without one is at the
+# base generation 0, so reads never write to Redis. The first bump starts the
+# counter at the current time, so a counter lost anyway and bumped again moves
+# past every generation it used; until then the namespace is read at the base
+# generation, where only entries written before its first bump can reappear.
+GENERATION_KEY_PREFIX = SERVICE_KEY_PREFIX + "generation:"
+GENERATION_CACHE_TTL = float(os.getenv('CACHE_GENERATION_TTL', 5))
+MAX_CACHED_GENERATIONS = 10000
+
+# Keys SCANned and UNLINKed per batch by background flushes, and the pause
+# between batches that lets other clients' commands through
+FLUSH_BATCH_SIZE = int(os.getenv('CACHE_FLUSH_BATCH_SIZE', 1000))
+FLUSH_BATCH_PAUSE = float(os.getenv('CACHE_FLUSH_BATCH_PAUSE', 0.001))
+# Finished flush jobs kept for progress queries
+FLUSH_JOBS_KEPT = 100
+
+def is_reserved_namespace(namespace: str) -> bool:
+    """Check if a namespace holds the service's own keys (generation counters, access log, recipes)"""
+    return f"{namespace}:" == SERVICE_KEY_PREFIX
 
 class CacheManager:
     """Redis-based cache manager for storing and retrieving data"""
@@ -13,67 +76,385 @@ class CacheManager:
         redis_url = os.getenv('REDIS_URL', 'redis://redis:6379/0')
         self.redis_client = redis.from_url(redis_url)
         self.default_ttl = int(os.getenv('CACHE_TTL', 3600))  # Default 1 hour
+        
+        # Identifies this replica's own invalidation messages
+        self.instance_id = uuid.uuid4().hex
+        self.metrics = CacheMetrics()
+        self.flush_jobs: Dict[str, Dict[str, Any]] = {}
+        self.flush_jobs_lock = threading.Lock()
+        # namespace -> (generation, monotonic time it is read again)
+        self.generations: Dict[str, Tuple[int, float]] = {}
+        self.local_cache = None
+        if L1_ENABLED:
+            self.local_cache = LocalCache(on_evict=lambda key: self.metrics.increment("cache_l1_evictions_total", key))
+        self._start_invalidation_listener()
     
-    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+    def set(self, key: str, value: Any, ttl: Optional[int] = None, codec: Optional[str] = None,
+            streamable: bool = False) -> bool:
         """
         Set a value in the cache
         
         Args:
             key: Cache key
-            value: Value to cache (will be JSON serialized)
+            value: Value to cache
             ttl: Time to live in seconds (optional)
-            
+            codec: Value encoding, see value_codecs.encode_value (optional)
+            streamable: Without a codec, store the value as JSON if it is chunked,
+                so GETs can stream it; for values that arrived as JSON
+        
         Returns:
             True if successful, False otherwise
         """
+        start = time.perf_counter()
+        key = self._physical_key(key)
         try:
-            # Serialize the value to JSON
-            serialized_value = json.dumps(value, default=str)
+            # Serialize the value with its codec header, compressing large values
+            serialized_value = self._encode(value, codec, streamable)
             
             # Set the value in Redis with TTL
             ttl = ttl or self.default_ttl
-            result = self.redis_client.setex(key, ttl, serialized_value)
+            if self._should_chunk(serialized_value):
+                result, size = self._set_chunked(key, serialized_value, ttl, [])
+            else:
+                result, size = self.redis_client.setex(key, ttl, serialized_value), len(serialized_value)
+            self._invalidate_local([key])
+            self._record_set(key, size, start)
             
             return result
         except Exception as e:
             print(f"Error setting cache key {key}: {e}")
+            self.metrics.increment("cache_set_errors_total", key)
             return False
     
-    def get(self, key: str) -> Optional[Any]:
+    def get(self, key: str, stream: bool = False) -> Optional[Any]:
         """
         Get a value from the cache
         
         Args:
             key: Cache key
-            
+            stream: Return chunked JSON values as a ChunkedValue, whose chunks
+                are only read while it is iterated, instead of loading them
+        
         Returns:
             Cached value or None if not found
         """
+        start = time.perf_counter()
+        key = self._physical_key(key)
         try:
+            if self.local_cache is not None:
+                value = self.local_cache.get(key)
+                if value is not MISSING:
+                    self._record_get(key, "l1", start)
+                    return value
+                values = self._read_through([key], stream)
+                self._record_get(key, "redis" if key in values else None, start)
+                return values.get(key)
+            
             # Get the value from Redis
             serialized_value = self.redis_client.get(key)
             
             if serialized_value is None:
+                self._record_get(key, None, start)
                 return None
             
-            # Deserialize the value from JSON
-            return json.loads(serialized_value)
+            manifest = parse_manifest(serialized_value)
+            if stream and manifest is not None and is_streamable(manifest):
+                value = ChunkedValue(key, manifest, self._iter_json_text)
+            else:
+                # Deserialize the value; entries without a codec header are JSON
+                value, _ = self._decode(key, serialized_value)
+            self._record_get(key, "redis", start)
+            return value
+        except IncompleteValueError:
+            self._record_get(key, None, start)
+            return None
         except Exception as e:
             print(f"Error getting cache key {key}: {e}")
             return None
     
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """
+        Get several values from the cache in one round trip
+        
+        Args:
+            keys: Cache keys
+        
+        Returns:
+            Dictionary of key -> value for the keys that were found
+        """
+        if not keys:
+            return {}
+        start = time.perf_counter()
+        # physical key -> key asked for
+        requested = {self._physical_key(key): key for key in keys}
+        keys = list(requested)
+        values = {}
+        if self.local_cache is not None:
+            remote_keys = []
+            for key in keys:
+                value = self.local_cache.get(key)
+                if value is MISSING:
+                    remote_keys.append(key)
+                else:
+                    values[key] = value
+            local_keys = set(values)
+            if remote_keys:
+                try:
+                    values.update(self._read_through(remote_keys))
+                except Exception as e:
+                    print(f"Error getting cache keys: {e}")
+        else:
+            local_keys = set()
+            try:
+                serialized_values = self.redis_client.mget(keys)
+            except Exception as e:
+                print(f"Error getting cache keys: {e}")
+                return {}
+            
+            for key, serialized_value in zip(keys, serialized_values):
+                if serialized_value is None:
+                    continue
+                try:
+                    values[key], _ = self._decode(key, serialized_value)
+                except IncompleteValueError:
+                    continue
+                except Exception as e:
+                    print(f"Error decoding cache key {key}: {e}")
+        
+        for key in keys:
+            if key in values:
+                self.metrics.increment("cache_hits_total", key, tier="l1" if key in local_keys else "redis")
+            else:
+                self.metrics.increment("cache_misses_total", key)
+        self.metrics.observe_batch("cache_operation_duration_seconds", keys, time.perf_counter() - start, operation="get_many")
+        return {requested[key]: value for key, value in values.items()}
+    
+    def _read_through(self, keys: List[str], stream: bool = False) -> Dict[str, Any]:
+        """
+        Read keys from Redis along with their TTLs and offer them to the L1 cache
+        
+        Args:
+            keys: Cache keys missing from the L1 cache
+            stream: Return chunked JSON values as a ChunkedValue, see get; these
+                are not offered to the L1 cache
+        
+        Returns:
+            Dictionary of key -> value for the keys that were found
+        """
+        # Taken before reading, so an invalidation arriving meanwhile drops the values
+        epoch = self.local_cache.epoch
+        pipeline = self.redis_client.pipeline(transaction=False)
+        pipeline.mget(keys)
+        for key in keys:
+            pipeline.pttl(key)
+        replies = pipeline.execute()
+        
+        values = {}
+        for key, serialized_value, pttl in zip(keys, replies[0], replies[1:]):
+            if serialized_value is None:
+                continue
+            if stream:
+                manifest = parse_manifest(serialized_value)
+                if manifest is not None and is_streamable(manifest):
+                    values[key] = ChunkedValue(key, manifest, self._iter_json_text)
+                    continue
+            try:
+                value, size = self._decode(key, serialized_value)
+            except IncompleteValueError:
+                continue
+            except Exception as e:
+                print(f"Error decoding cache key {key}: {e}")
+                continue
+            values[key] = value
+            # PTTL is -1 for keys without an expiry and -2 if the key just expired
+            if pttl != -2:
+                self.local_cache.put(key, value, size, pttl / 1000 if pttl >= 0 else None, epoch)
+        return values
+    
+    def _decode(self, key: str, serialized_value: bytes) -> Tuple[Any, int]:
+        """
+        Decode a stored value, reading its chunks if it is chunked
+        
+        Returns:
+            (value, encoded size in bytes)
+        """
+        manifest = parse_manifest(serialized_value)
+        if manifest is None:
+            return decode_value(serialized_value), len(serialized_value)
+        return decode_value(b"".join(self._iter_chunks(key, manifest))), manifest["size"]
+    
+    def _encode(self, value: Any, codec: Optional[str], streamable: bool) -> bytes:
+        """Encode a value for set; see set for streamable"""
+        serialized_value = encode_value(value, codec)
+        if (streamable and codec is None and self._should_chunk(serialized_value)
+                and parse_header(serialized_value)[0] != "json"):
+            # Only chunked JSON entries are sent to HTTP clients without being rebuilt
+            serialized_value = encode_value(value, "json")
+        return serialized_value
+    
+    def _should_chunk(self, serialized_value: bytes) -> bool:
+        """Check if an encoded value is large enough to be stored in chunks"""
+        return len(serialized_value) >= CHUNK_THRESHOLD
+    
+    def _set_chunked(self, key: str, serialized_value: bytes, ttl: int, tags: List[str]) -> Tuple[bool, int]:
+        """
+        Store an encoded value as CHUNK_SIZE chunks followed by its manifest
+        
+        Args:
+            key: Cache key
+            serialized_value: Output of encode_value, header included
+            ttl: Time to live in seconds
+            tags: Tags of the entry; its chunks get the same tags so tag
+                invalidation removes them too
+        
+        Returns:
+            (True if stored, bytes written)
+        """
+        codec, compression = parse_header(serialized_value)
+        write_id = uuid.uuid4().hex
+        chunk_ttl = ttl + CHUNK_TTL_MARGIN
+        count = 0
+        pipeline = self.redis_client.pipeline(transaction=False)
+        for start in range(0, len(serialized_value), CHUNK_SIZE):
+            name = chunk_key(key, write_id, count)
+            pipeline.setex(name, chunk_ttl, serialized_value[start:start + CHUNK_SIZE])
+            self._queue_tags(pipeline, name, tags, chunk_ttl)
+            count += 1
+            if count % CHUNK_PIPELINE_DEPTH == 0:
+                pipeline.execute()
+        pipeline.execute()
+        
+        # The manifest is written last, so readers never find one whose chunks are
+        # still being written, and replaces the previous value in the same command
+        manifest = encode_manifest({
+            "id": write_id,
+            "chunks": count,
+            "size": len(serialized_value),
+            "codec": codec,
+            "compression": compression
+        })
+        pipeline = self.redis_client.pipeline(transaction=True)
+        pipeline.set(key, manifest, ex=ttl, get=True)
+        self._queue_tags(pipeline, key, tags, ttl)
+        previous = pipeline.execute()[0]
+        self._remove_chunks(key, previous)
+        return True, len(serialized_value) + len(manifest)
+    
+    def _iter_chunks(self, key: str, manifest: Dict[str, Any]) -> Iterator[bytes]:
+        """Read the chunks of a value in pipelined batches; they concatenate to the encoded value"""
+        for first in range(0, manifest["chunks"], CHUNK_PIPELINE_DEPTH):
+            names = [chunk_key(key, manifest["id"], index)
+                     for index in range(first, min(first + CHUNK_PIPELINE_DEPTH, manifest["chunks"]))]
+            for chunk in self.redis_client.mget(names):
+                if chunk is None:
+                    raise IncompleteValueError(f"Chunk of cache key {key} is missing")
+                yield chunk
+    
+    def _iter_json_text(self, key: str, manifest: Dict[str, Any]) -> Iterator[bytes]:
+        """Read a chunked JSON value as pieces of its JSON text, decompressing as the chunks arrive"""
+        def payload():
+            chunks = self._iter_chunks(key, manifest)
+            first = next(chunks, b"")
+            # The codec header sits at the start of the first chunk
+            yield first[HEADER_SIZE:]
+            yield from chunks
+        return iter_decompress(payload(), manifest["compression"])
+    
+    def _remove_chunks(self, key: str, serialized_value: Optional[bytes]) -> None:
+        """UNLINK the chunks of a replaced or deleted value, if it was chunked"""
+        manifest = parse_manifest(serialized_value)
+        if manifest is None:
+            return
+        names = [chunk_key(key, manifest["id"], index) for index in range(manifest["chunks"])]
+        for first in range(0, len(names), INVALIDATE_BATCH_SIZE):
+            self.redis_client.unlink(*names[first:first + INVALIDATE_BATCH_SIZE])
+    
+    def set_many(self, entries: List[Dict[str, Any]], streamable: bool = False) -> Dict[str, bool]:
+        """
+        Set several values, each with its own TTL and tags, in one pipelined round trip
+        
+        Args:
+            entries: List of {"key", "value", "ttl" (optional), "tags" (optional), "codec" (optional)}
+            streamable: Store values without a codec as JSON if they are chunked, see set
+        
+        Returns:
+            Dictionary of key -> True if stored
+        """
+        start = time.perf_counter()
+        results = {}
+        sizes = {}
+        # physical key -> key given in the entry
+        requested = {}
+        pipeline = self.redis_client.pipeline(transaction=False)
+        # (key, number of tags) in the order the commands were queued
+        queued = []
+        for entry in entries:
+            key = self._physical_key(entry.get('key'))
+            requested[key] = entry.get('key')
+            tags = entry.get('tags') or []
+            ttl = entry.get('ttl') or self.default_ttl
+            try:
+                serialized_value = self._encode(entry.get('value'), entry.get('codec'), streamable)
+                if self._should_chunk(serialized_value):
+                    # Large values get their own pipelines
+                    results[key], sizes[key] = self._set_chunked(key, serialized_value, ttl, tags)
+                    self._invalidate_local([key])
+                    continue
+            except Exception as e:
+                print(f"Error setting cache key {key}: {e}")
+                results[key] = False
+                continue
+            pipeline.setex(key, ttl, serialized_value)
+            self._queue_tags(pipeline, key, tags, ttl)
+            queued.append((key, len(tags)))
+            sizes[key] = len(serialized_value)
+        
+        if queued:
+            try:
+                replies = pipeline.execute(raise_on_error=False)
+                position = 0
+                for key, tag_count in queued:
+                    results[key] = replies[position] is True
+                    position += 1 + TAG_COMMANDS * tag_count
+            except Exception as e:
+                print(f"Error setting cache keys: {e}")
+                for key, _ in queued:
+                    results[key] = False
+            self._invalidate_local([key for key, _ in queued])
+            self.metrics.observe_batch("cache_operation_duration_seconds", sizes, time.perf_counter() - start, operation="set_many")
+        
+        for key, stored in results.items():
+            if stored:
+                self.metrics.increment("cache_sets_total", key)
+                self.metrics.observe("cache_value_size_bytes", key, sizes[key])
+            else:
+                self.metrics.increment("cache_set_errors_total", key)
+        return {requested[key]: stored for key, stored in results.items()}
+    
     def delete(self, key: str) -> bool:
         """
         Delete a value from the cache
         
         Args:
             key: Cache key
-            
+        
         Returns:
             True if successful, False otherwise
         """
+        key = self._physical_key(key)
         try:
-            result = self.redis_client.delete(key)
+            try:
+                # Entries are small unless chunked, so fetching the deleted value
+                # to find its chunks is cheap
+                previous = self.redis_client.getdel(key)
+                self._remove_chunks(key, previous)
+                result = 0 if previous is None else 1
+            except redis.exceptions.ResponseError:
+                # Not a string, e.g. a tag set
+                result = self.redis_client.delete(key)
+            self._invalidate_local([key])
+            if result > 0:
+                self.metrics.increment("cache_removals_total", key, reason="delete")
             return result > 0
         except Exception as e:
             print(f"Error deleting cache key {key}: {e}")
@@ -85,12 +466,12 @@ class CacheManager:
         
         Args:
             key: Cache key
-            
+        
         Returns:
             True if key exists, False otherwise
         """
         try:
-            return self.redis_client.exists(key) > 0
+            return self.redis_client.exists(self._physical_key(key)) > 0
         except Exception as e:
             print(f"Error checking cache key {key}: {e}")
             return False
@@ -102,7 +483,7 @@ class CacheManager:
         Args:
             prefix: Key prefix
             data: Data to hash for key generation
-            
+        
         Returns:
             Generated cache key
         """
@@ -112,7 +493,8 @@ class CacheManager:
         
         return f"{prefix}:{data_hash}"
     
-    def set_with_tags(self, key: str, value: Any, tags: List[str], ttl: Optional[int] = None) -> bool:
+    def set_with_tags(self, key: str, value: Any, tags: List[str], ttl: Optional[int] = None,
+                      codec: Optional[str] = None, streamable: bool = False) -> bool:
         """
         Set a value in the cache with tags for easy invalidation
         
@@ -121,60 +503,379 @@ class CacheManager:
             value: Value to cache
             tags: List of tags to associate with this key
             ttl: Time to live in seconds (optional)
-            
+            codec: Value encoding (optional)
+            streamable: Store the value as JSON if it is chunked, see set
+        
         Returns:
             True if successful, False otherwise
         """
+        start = time.perf_counter()
+        key = self._physical_key(key)
         try:
-            # Set the main value
-            success = self.set(key, value, ttl)
-            
-            if success:
-                # Associate the key with each tag
-                for tag in tags:
-                    self.redis_client.sadd(f"tag:{tag}", key)
-                    # Set expiration for tag sets (longer than item TTL)
-                    tag_ttl = (ttl or self.default_ttl) + 3600
-                    self.redis_client.expire(f"tag:{tag}", tag_ttl)
+            serialized_value = self._encode(value, codec, streamable)
+            ttl = ttl or self.default_ttl
+            if self._should_chunk(serialized_value):
+                result, size = self._set_chunked(key, serialized_value, ttl, tags)
+                self._invalidate_local([key])
+                self._record_set(key, size, start)
+                return result
             
-            return success
+            # Write the value and its tag memberships in one MULTI/EXEC round trip,
+            # so a reader never sees the value without its tags
+            pipeline = self.redis_client.pipeline(transaction=True)
+            pipeline.setex(key, ttl, serialized_value)
+            self._queue_tags(pipeline, key, tags, ttl)
+            replies = pipeline.execute()
+            self._invalidate_local([key])
+            self._record_set(key, len(serialized_value), start)
+            return replies[0] is True
         except Exception as e:
             print(f"Error setting cache key with tags {key}: {e}")
+            self.metrics.increment("cache_set_errors_total", key)
             return False
     
+    def _queue_tags(self, pipeline, key: str, tags: List[str], ttl: int) -> None:
+        """
+        Queue the commands associating a key with its tags
+        
+        Tag sets expire TAG_TTL_MARGIN after their longest lived member: EXPIRE NX
+        gives a new set its TTL and EXPIRE GT only ever extends it.
+        """
+        for tag in tags:
+            pipeline.sadd(f"tag:{tag}", key)
+            pipeline.expire(f"tag:{tag}", ttl + TAG_TTL_MARGIN, nx=True)
+            pipeline.expire(f"tag:{tag}", ttl + TAG_TTL_MARGIN, gt=True)
+    
+    def get_or_compute(self, key: str, producer: Callable[[], Any], ttl: Optional[int] = None,
+                       beta: float = XFETCH_BETA, tags: Optional[List[str]] = None,
+                       codec: Optional[str] = None) -> Any:
+        """
+        Get a value, computing and caching it when missing or about to expire
+        
+        Follows XFetch: every value is stored with the time it took to compute
+        (delta) and its expiry, and a read recomputes it early when
+        now - delta * beta * ln(rand()) >= expiry. The chance grows as expiry
+        nears and is higher for values that are slow to compute. A lock makes
+        sure only one caller recomputes; the others keep getting the cached
+        value, or on a miss wait for the recomputed one.
+        
+        Args:
+            key: Cache key
+            producer: Function computing the value
+            ttl: Time to live in seconds (optional)
+            beta: Eagerness of early recomputation; 0 disables it
+            tags: Tags of the value (optional)
+            codec: Value encoding (optional)
+        
+        Returns:
+            The cached or freshly computed value
+        """
+        ttl = ttl or self.default_ttl
+        value = self.get(key)
+        if value is not None:
+            if not self._should_recompute(key, beta):
+                return value
+            lock = self._recompute_lock(key)
+            if lock is None:
+                # Another caller is already refreshing it
+                return value
+            return self._compute(key, producer, ttl, tags, codec, lock)
+        
+        lock = self._recompute_lock(key)
+        if lock is None:
+            deadline = time.monotonic() + RECOMPUTE_WAIT
+            while time.monotonic() < deadline:
+                time.sleep(RECOMPUTE_POLL_INTERVAL)
+                value = self.get(key)
+                if value is not None:
+                    return value
+        else:
+            # The caller holding the lock before may have stored the value between our
+            # get and taking the lock, so it is only recomputed if still missing
+            value = self.get(key)
+            if value is not None:
+                self._release_lock(key, lock)
+                return value
+        return self._compute(key, producer, ttl, tags, codec, lock)
+    
+    def _should_recompute(self, key: str, beta: float) -> bool:
+        """Draw whether a cached value is recomputed ahead of its expiry"""
+        if beta <= 0:
+            return False
+        try:
+            state = self.redis_client.get(f"{self._physical_key(key)}:xfetch")
+        except Exception as e:
+            print(f"Error getting recomputation state of {key}: {e}")
+            return False
+        if state is None:
+            # Written by set rather than get_or_compute
+            return False
+        state = json.loads(state)
+        # 1 - random() lies in (0, 1], so the logarithm is defined
+        return time.time() - state["delta"] * beta * math.log(1 - random.random()) >= state["expiry"]
+    
+    def _recompute_lock(self, key: str):
+        """Take the right to recompute a key, or get None if another caller holds it"""
+        try:
+            lock = self.redis_client.lock(f"{self._physical_key(key)}:recompute", timeout=RECOMPUTE_LOCK_TTL)
+            return lock if lock.acquire(blocking=False) else None
+        except Exception as e:
+            print(f"Error locking cache key {key}: {e}")
+            return None
+    
+    def _compute(self, key: str, producer: Callable[[], Any], ttl: int, tags: Optional[List[str]],
+                 codec: Optional[str], lock) -> Any:
+        """Run the producer and store its value together with its compute time and expiry"""
+        try:
+            start = time.time()
+            value = producer()
+            delta = time.time() - start
+            stored = self.set_with_tags(key, value, tags, ttl, codec) if tags else self.set(key, value, ttl, codec)
+            if stored:
+                state = json.dumps({"delta": delta, "expiry": time.time() + ttl})
+                try:
+                    self.redis_client.setex(f"{self._physical_key(key)}:xfetch", ttl, state)
+                except Exception as e:
+                    print(f"Error setting recomputation state of {key}: {e}")
+            return value
+        finally:
+            if lock is not None:
+                self._release_lock(key, lock)
+    
+    def _release_lock(self, key: str, lock) -> None:
+        """Give up the right to recompute a key"""
+        try:
+            lock.release()
+        except redis.exceptions.LockError:
+            # Held past RECOMPUTE_LOCK_TTL and taken over by another caller
+            pass
+        except Exception as e:
+            # The lock expires after RECOMPUTE_LOCK_TTL
+            print(f"Error unlocking cache key {key}: {e}")
+    
     def invalidate_tag(self, tag: str) -> int:
         """
         Invalidate all cache entries with a specific tag
         
         Args:
             tag: Tag to invalidate
-            
+        
         Returns:
             Number of keys deleted
         """
         try:
-            # Get all keys associated with this tag
-            keys = self.redis_client.smembers(f"tag:{tag}")
-            
-            if not keys:
+            # Atomically detach the tag set, so keys tagged from now on start a new
+            # set and this invalidation works on a fixed snapshot
+            snapshot = f"tag:{tag}:invalidating:{uuid.uuid4().hex}"
+            try:
+                self.redis_client.rename(f"tag:{tag}", snapshot)
+            except redis.exceptions.ResponseError:
+                # No such tag
                 return 0
             
-            # Delete all tagged keys
+            # Walk the snapshot with SSCAN and UNLINK its members in batches: every
+            # command is short and memory is reclaimed off the main Redis thread
             deleted_count = 0
-            for key in keys:
-                # Decode bytes to string if needed
-                key_str = key.decode('utf-8') if isinstance(key, bytes) else key
-                if self.delete(key_str):
-                    deleted_count += 1
+            batch = []
+            for key in self.redis_client.sscan_iter(snapshot, count=INVALIDATE_BATCH_SIZE):
+                batch.append(key)
+                if len(batch) >= INVALIDATE_BATCH_SIZE:
+                    deleted_count += self._unlink_tagged(batch)
+                    batch = []
+            if batch:
+                deleted_count += self._unlink_tagged(batch)
             
             # Delete the tag set itself
-            self.redis_client.delete(f"tag:{tag}")
+            self.redis_client.unlink(snapshot)
             
             return deleted_count
         except Exception as e:
             print(f"Error invalidating tag {tag}: {e}")
             return 0
     
+    def _unlink_tagged(self, keys: List[bytes]) -> int:
+        """
+        UNLINK one batch of a tag's members
+        
+        Returns:
+            Number of entries removed, not counting the chunks of chunked values
+        """
+        # Tag sets can name keys that already expired, so the members actually
+        # removed are counted per namespace with one EXISTS each
+        pipeline = self.redis_client.pipeline(transaction=False)
+        for key in keys:
+            pipeline.exists(key)
+        pipeline.unlink(*keys)
+        replies = pipeline.execute()
+        entries = []
+        removed = 0
+        for key, existed in zip(keys, replies):
+            # Chunks are removed along with their entry and are not entries themselves
+            if is_chunk_key(key):
+                continue
+            entries.append(key)
+            if existed:
+                removed += 1
+                self.metrics.increment("cache_removals_total", key, reason="invalidate")
+        self._invalidate_local(entries)
+        return removed
+    
+    def _record_get(self, key: str, tier: Optional[str], start: float) -> None:
+        """Count a lookup as a hit in tier ("l1" or "redis"), or a miss when tier is None"""
+        if tier is None:
+            self.metrics.increment("cache_misses_total", key)
+        else:
+            self.metrics.increment("cache_hits_total", key, tier=tier)
+        self.metrics.observe("cache_operation_duration_seconds", key, time.perf_counter() - start, operation="get")
+    
+    def _record_set(self, key: str, size: int, start: float) -> None:
+        """Count a write of size encoded bytes"""
+        self.metrics.increment("cache_sets_total", key)
+        self.metrics.observe("cache_value_size_bytes", key, size)
+        self.metrics.observe("cache_operation_duration_seconds", key, time.perf_counter() - start, operation="set")
+    
+    def metrics_text(self) -> str:
+        """
+        Render the per-namespace metrics and Redis-wide gauges for Prometheus
+        
+        Returns:
+            Metrics in the Prometheus text exposition format
+        """
+        gauges = {}
+        try:
+            info = self.redis_client.info()
+            gauges["cache_redis_used_memory_bytes"] = ("Memory used by Redis", info.get("used_memory", 0))
+            gauges["cache_redis_evicted_keys"] = ("Keys Redis evicted under maxmemory since it started", info.get("evicted_keys", 0))
+            gauges["cache_redis_expired_keys"] = ("Keys Redis expired since it started", info.get("expired_keys", 0))
+        except Exception as e:
+            print(f"Error getting cache stats: {e}")
+        if self.local_cache is not None:
+            local_stats = self.local_cache.stats()
+            gauges["cache_l1_entries"] = ("Entries held in the in-process L1 cache", local_stats["entries"])
+            gauges["cache_l1_bytes"] = ("Encoded bytes held in the in-process L1 cache", local_stats["bytes"])
+        return self.metrics.render(gauges)
+    
+    def _physical_key(self, key: Any) -> Any:
+        """
+        Fold the generation of a key's namespace into the key
+        
+        'ns:rest' is stored as 'ns:@<generation>:rest'; keys without a
+        namespace are stored as given.
+        """
+        if not isinstance(key, str) or ':' not in key:
+            return key
+        namespace, rest = key.split(':', 1)
+        generation = self._generation(namespace)
+        if generation == 0:
+            # Never bumped, or Redis was unreachable before its generation was read
+            return key
+        return f"{namespace}:@{generation}:{rest}"
+    
+    def _generation(self, namespace: str) -> int:
+        """Get the current generation of a namespace, read from Redis at most every GENERATION_CACHE_TTL seconds"""
+        cached = self.generations.get(namespace)
+        if cached is not None and cached[1] > time.monotonic():
+            return cached[0]
+        try:
+            generation = int(self.redis_client.get(GENERATION_KEY_PREFIX + namespace) or 0)
+        except Exception as e:
+            print(f"Error getting generation of namespace {namespace}: {e}")
+            return cached[0] if cached is not None else 0
+        self._cache_generation(namespace, generation)
+        return generation
+    
+    def _cache_generation(self, namespace: str, generation: int) -> None:
+        """Remember the generation of a namespace for GENERATION_CACHE_TTL seconds"""
+        if len(self.generations) >= MAX_CACHED_GENERATIONS:
+            self.generations = {}
+        self.generations[namespace] = (generation, time.monotonic() + GENERATION_CACHE_TTL)
+    
+    def bump_namespace(self, namespace: str) -> int:
+        """
+        Invalidate every key of a namespace at once by moving it to a new generation
+        
+        Keys written under older generations are no longer read and are left
+        to expire with their TTL.
+        
+        Args:
+            namespace: Key prefix (the part of keys before the first ':')
+        
+        Returns:
+            The new generation
+        """
+        try:
+            # Counters start at the current time in milliseconds rather than 0, so a
+            # namespace whose counter was lost moves past every generation it used
+            # before (as long as it was bumped less than once per millisecond)
+            pipeline = self.redis_client.pipeline(transaction=True)
+            pipeline.set(GENERATION_KEY_PREFIX + namespace, int(time.time() * 1000), nx=True)
+            pipeline.incr(GENERATION_KEY_PREFIX + namespace)
+            generation = pipeline.execute()[1]
+        except Exception as e:
+            raise Exception(f"Error bumping namespace {namespace}: {str(e)}")
+        self._cache_generation(namespace, generation)
+        self._publish_invalidation({"generation": {"namespace": namespace, "value": generation}})
+        return generation
+    
+    def _invalidate_local(self, keys: List[str]) -> None:
+        """Drop keys from the L1 cache of this and every other replica"""
+        if self.local_cache is None or not keys:
+            return
+        self.local_cache.invalidate(keys)
+        self._publish_invalidation({"keys": [key.decode() if isinstance(key, bytes) else key for key in keys]})
+    
+    def _publish_invalidation(self, message: Dict[str, Any]) -> None:
+        """Tell the other replicas to drop entries from their L1 cache"""
+        try:
+            message["origin"] = self.instance_id
+            self.redis_client.publish(INVALIDATION_CHANNEL, json.dumps(message))
+        except Exception as e:
+            print(f"Error publishing cache invalidation: {e}")
+    
+    def _start_invalidation_listener(self) -> None:
+        """Apply invalidations published by other replicas on a background thread"""
+        thread = threading.Thread(target=self._listen_for_invalidations, daemon=True)
+        thread.start()
+    
+    def _listen_for_invalidations(self) -> None:
+        """Subscribe to the invalidation channel, resubscribing after connection errors"""
+        backoff = 1
+        while True:
+            try:
+                pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Messages published while unsubscribed are lost, so start from empty
+                self._clear_local()
+                backoff = 1
+                for message in pubsub.listen():
+                    self._apply_invalidation(message.get("data"))
+            except Exception as e:
+                print(f"Cache invalidation listener error: {e}")
+                self._clear_local()
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+    
+    def _apply_invalidation(self, data: Any) -> None:
+        """Drop the entries named by an invalidation message"""
+        try:
+            message = json.loads(data)
+        except (TypeError, ValueError):
+            return
+        if message.get("origin") == self.instance_id:
+            return
+        if "generation" in message:
+            self._cache_generation(message["generation"]["namespace"], message["generation"]["value"])
+        elif message.get("all"):
+            self._clear_local()
+        elif self.local_cache is not None:
+            self.local_cache.invalidate(message.get("keys", []))
+    
+    def _clear_local(self) -> None:
+        """Forget everything held in process: L1 entries and namespace generations"""
+        self.generations = {}
+        if self.local_cache is not None:
+            self.local_cache.clear()
+    
     def get_stats(self) -> Dict[str, Any]:
         """
         Get cache statistics
@@ -184,7 +885,7 @@ class CacheManager:
         """
         try:
             info = self.redis_client.info()
-            return {
+            stats = {
                 "connected_clients": info.get("connected_clients", 0),
                 "used_memory": info.get("used_memory_human", "0B"),
                 "total_commands_processed": info.get("total_commands_processed", 0),
@@ -195,6 +896,9 @@ class CacheManager:
                     info.get("keyspace_misses", 0)
                 )
             }
+            if self.local_cache is not None:
+                stats["l1"] = self.local_cache.stats()
+            return stats
         except Exception as e:
             print(f"Error getting cache stats: {e}")
             return {}
@@ -206,16 +910,118 @@ class CacheManager:
             return 0.0
         return round((hits / total) * 100, 2)
     
-    def flush_all(self) -> bool:
+    def flush_all(self) -> Dict[str, Any]:
         """
-        Flush all cache entries
+        Flush all cache entries in the background
+        
+        Only the cache's own Redis database is cleared, with SCAN and batched
+        UNLINK rather than FLUSHALL, so other databases on the instance are kept
+        and Redis stays responsive. The service's own keys under
+        SERVICE_KEY_PREFIX are kept.
         
         Returns:
-            True if successful, False otherwise
+            The flush job, see flush_namespace
+        """
+        return self.flush_namespace(None)
+    
+    def flush_namespace(self, namespace: Optional[str]) -> Dict[str, Any]:
+        """
+        Remove every key of a namespace (keys starting with '<namespace>:') in the background
+        
+        Args:
+            namespace: Key prefix, or None for every key in the cache database
+        
+        Returns:
+            The flush job: id, namespace, status ("running", "completed" or
+            "failed"), matched and deleted key counts and estimated progress in percent
         """
+        if namespace is not None and is_reserved_namespace(namespace):
+            raise ValueError(f"Namespace '{namespace}' holds the cache service's own keys")
+        with self.flush_jobs_lock:
+            # A namespace already being flushed is not walked twice
+            for job in self.flush_jobs.values():
+                if job["namespace"] == namespace and job["status"] == "running":
+                    return dict(job)
+            job = {
+                "id": uuid.uuid4().hex,
+                "namespace": namespace,
+                "status": "running",
+                "matched": 0,
+                "deleted": 0,
+                "progress": 0.0,
+                "started_at": datetime.now().isoformat(),
+                "finished_at": None,
+                "error": None
+            }
+            self.flush_jobs[job["id"]] = job
+            finished = [job_id for job_id, other in self.flush_jobs.items() if other["status"] != "running"]
+            for job_id in finished[:max(0, len(finished) - FLUSH_JOBS_KEPT)]:
+                del self.flush_jobs[job_id]
+            
+            snapshot = dict(job)
+        
+        thread = threading.Thread(target=self._run_flush, args=(job,), daemon=True)
+        thread.start()
+        return snapshot
+    
+    def get_flush_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get the state of a flush job, or None if it is unknown"""
+        with self.flush_jobs_lock:
+            job = self.flush_jobs.get(job_id)
+            return dict(job) if job is not None else None
+    
+    def _run_flush(self, job: Dict[str, Any]) -> None:
+        """Walk the keyspace with SCAN and UNLINK the namespace's keys batch by batch"""
+        namespace = job["namespace"]
+        if namespace is None:
+            pattern = "*"
+        else:
+            # Glob characters in the namespace match literally
+            escaped = "".join("\\" + char if char in "*?[]\\" else char for char in namespace)
+            pattern = f"{escaped}:*"
         try:
-            self.redis_client.flushall()
-            return True
+            # Every SCAN call visits about FLUSH_BATCH_SIZE of the keys in the
+            # database, matching or not, which gives the progress estimate
+            total = max(self.redis_client.dbsize(), 1)
+            visited = 0
+            cursor = 0
+            batch = []
+            while True:
+                cursor, keys = self.redis_client.scan(cursor, match=pattern, count=FLUSH_BATCH_SIZE)
+                visited += FLUSH_BATCH_SIZE
+                if namespace is None:
+                    keys = [key for key in keys if not key.startswith(SERVICE_KEY_PREFIX.encode())]
+                batch.extend(keys)
+                if len(batch) >= FLUSH_BATCH_SIZE or cursor == 0:
+                    self._flush_batch(job, batch)
+                    batch = []
+                    time.sleep(FLUSH_BATCH_PAUSE)
+                with self.flush_jobs_lock:
+                    job["progress"] = round(min(visited / total * 100, 99.9), 1)
+                if cursor == 0:
+                    break
+            if namespace is None:
+                self._clear_local()
+                self._publish_invalidation({"all": True})
+            with self.flush_jobs_lock:
+                job["status"] = "completed"
+                job["progress"] = 100.0
         except Exception as e:
-            print(f"Error flushing cache: {e}")
-            return False
\ No newline at end of file
+            print(f"Error flushing cache namespace {namespace}: {e}")
+            with self.flush_jobs_lock:
+                job["status"] = "failed"
+                job["error"] = str(e)
+        finally:
+            with self.flush_jobs_lock:
+                job["finished_at"] = datetime.now().isoformat()
+    
+    def _flush_batch(self, job: Dict[str, Any], keys: List[bytes]) -> None:
+        """UNLINK one batch of a flush and count it in the job"""
+        if not keys:
+            return
+        deleted = self.redis_client.unlink(*keys)
+        if job["namespace"] is not None:
+            self._invalidate_local([key for key in keys if not is_chunk_key(key)])
+        with self.flush_jobs_lock:
+            job["matched"] += len(keys)
+            job["deleted"] += deleted
\ No newline at end of file
@@ -0,0 +1,157 @@
+"""
+Per-namespace cache metrics in Prometheus text format
+
+A key's namespace is the part before its first ':' (e.g. "data_connector"
+for "data_connector:3f2a..."), so hit rates, value sizes and latencies can
+be compared between workloads. The number of namespaces tracked is capped;
+keys beyond the cap are counted under "other" to keep label cardinality
+bounded.
+"""
+import os
+import threading
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+MAX_NAMESPACES = int(os.getenv('CACHE_METRICS_MAX_NAMESPACES', 100))
+OVERFLOW_NAMESPACE = "other"
+# Namespace of keys without a prefix
+DEFAULT_NAMESPACE = "default"
+
+# Histogram upper bounds
+SIZE_BUCKETS = [64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216]
+LATENCY_BUCKETS = [0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0]
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    """Render a label set, escaping values as the text format requires"""
+    if not labels:
+        return ""
+    rendered = []
+    for name, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        rendered.append(f'{name}="{value}"')
+    return "{" + ",".join(rendered) + "}"
+
+def _format_number(value: float) -> str:
+    """Render a sample value"""
+    if value == float('inf'):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class Histogram:
+    """Cumulative histogram with fixed bucket bounds"""
+    
+    def __init__(self, buckets: List[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value: float) -> None:
+        """Add one observation"""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+    
+    def samples(self, name: str, labels: Tuple[Tuple[str, str], ...]) -> List[str]:
+        """Render the _bucket, _sum and _count series"""
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + [float('inf')], self.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', _format_number(bound)),))} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_number(self.sum)}")
+        lines.append(f"{name}_count{_format_labels(labels)} {self.count}")
+        return lines
+
+class CacheMetrics:
+    """Thread-safe counters and histograms labelled by key namespace"""
+    
+    COUNTERS = {
+        "cache_hits_total": "Cache lookups that found a value, by tier",
+        "cache_misses_total": "Cache lookups that found no value",
+        "cache_sets_total": "Values written to the cache",
+        "cache_set_errors_total": "Values that could not be written",
+        "cache_removals_total": "Entries removed explicitly, by reason",
+        "cache_l1_evictions_total": "Entries evicted from the in-process L1 cache to make room"
+    }
+    HISTOGRAMS = {
+        "cache_value_size_bytes": ("Encoded size of values written to the cache", SIZE_BUCKETS),
+        "cache_operation_duration_seconds": ("Latency of cache operations as seen by the service", LATENCY_BUCKETS)
+    }
+    
+    def __init__(self, max_namespaces: int = MAX_NAMESPACES):
+        self.max_namespaces = max_namespaces
+        self.namespaces = set()
+        self.lock = threading.Lock()
+        # metric name -> label tuple -> value or Histogram
+        self.counters: Dict[str, Dict[Tuple, float]] = {name: {} for name in self.COUNTERS}
+        self.histograms: Dict[str, Dict[Tuple, Histogram]] = {name: {} for name in self.HISTOGRAMS}
+    
+    def namespace(self, key: Any) -> str:
+        """Get the metrics namespace of a key"""
+        if isinstance(key, bytes):
+            key = key.decode(errors='replace')
+        namespace = str(key).split(":", 1)[0] if ":" in str(key) else DEFAULT_NAMESPACE
+        if namespace in self.namespaces:
+            return namespace
+        with self.lock:
+            if len(self.namespaces) < self.max_namespaces:
+                self.namespaces.add(namespace)
+                return namespace
+        return OVERFLOW_NAMESPACE
+    
+    def increment(self, name: str, key: Any, amount: float = 1, **labels: str) -> None:
+        """Add to a counter for the namespace of key"""
+        label_set = (("namespace", self.namespace(key)),) + tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.counters[name]
+            series[label_set] = series.get(label_set, 0) + amount
+    
+    def observe(self, name: str, key: Any, value: float, **labels: str) -> None:
+        """Add an observation to a histogram for the namespace of key"""
+        label_set = (("namespace", self.namespace(key)),) + tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.histograms[name]
+            histogram = series.get(label_set)
+            if histogram is None:
+                histogram = series[label_set] = Histogram(self.HISTOGRAMS[name][1])
+            histogram.observe(value)
+    
+    def observe_batch(self, name: str, keys: Iterable[Any], value: float, **labels: str) -> None:
+        """Add one observation for every namespace touched by a multi-key operation"""
+        seen = set()
+        for key in keys:
+            namespace = self.namespace(key)
+            if namespace not in seen:
+                seen.add(namespace)
+                self.observe(name, f"{namespace}:", value, **labels)
+    
+    def render(self, gauges: Optional[Dict[str, Tuple[str, float]]] = None) -> str:
+        """
+        Render every metric in the Prometheus text exposition format
+        
+        Args:
+            gauges: Extra unlabelled gauges as name -> (help, value), e.g. Redis INFO fields
+        
+        Returns:
+            Exposition text
+        """
+        lines = []
+        with self.lock:
+            for name, help_text in self.COUNTERS.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+                for label_set, value in sorted(self.counters[name].items()):
+                    lines.append(f"{name}{_format_labels(label_set)} {_format_number(value)}")
+            for name, (help_text, _) in self.HISTOGRAMS.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for label_set, histogram in sorted(self.histograms[name].items()):
+                    lines.extend(histogram.samples(name, label_set))
+        for name, (help_text, value) in (gauges or {}).items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_format_number(value)}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,246 @@
+"""
+Cache warming from access frequencies
+
+Reads are counted in process and folded into a Redis sorted set of
+key -> access count every few seconds; the set is trimmed to the most read
+keys and its counts are halved after every warm-up so old popularity fades.
+Writers can store a recipe with an entry: the request to a producer service
+that recomputes it (e.g. the connector config and query sent to the data
+processing service), which caches its result as usual. Recipes are stored in
+Redis as they are, so they must not carry credentials; producers resolve
+those from their own configuration. A warm-up replays the
+recipes of the N most read keys that are not cached, a bounded number at a
+time, on startup and on a schedule.
+"""
+import os
+import json
+import time
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import requests
+
+ACCESS_LOG_KEY = "cache:access"
+RECIPES_KEY = "cache:recipes"
+WARM_LOCK_KEY = "cache:warm:lock"
+
+# Keys kept in the access log, and how often in-process counts are written to it
+ACCESS_LOG_SIZE = int(os.getenv('CACHE_ACCESS_LOG_SIZE', 10000))
+ACCESS_FLUSH_INTERVAL = float(os.getenv('CACHE_ACCESS_FLUSH_INTERVAL', 10))
+# Weight applied to every access count after a warm-up
+ACCESS_DECAY = float(os.getenv('CACHE_ACCESS_DECAY', 0.5))
+
+WARM_ON_STARTUP = os.getenv('CACHE_WARM_ON_STARTUP', 'true').lower() == 'true'
+# Seconds between scheduled warm-ups (0 disables them)
+WARM_INTERVAL = int(os.getenv('CACHE_WARM_INTERVAL', 0))
+WARM_TOP_N = int(os.getenv('CACHE_WARM_TOP_N', 50))
+WARM_CONCURRENCY = int(os.getenv('CACHE_WARM_CONCURRENCY', 4))
+WARM_REQUEST_TIMEOUT = int(os.getenv('CACHE_WARM_REQUEST_TIMEOUT', 120))
+# Give the other services time to start before the startup warm-up
+WARM_STARTUP_DELAY = int(os.getenv('CACHE_WARM_STARTUP_DELAY', 30))
+
+# Fields a recipe must not contain anywhere in its body
+CREDENTIAL_FIELDS = {"username", "password"}
+
+# Services recipes may call, by name; recipes name a service rather than a
+# URL so replaying them cannot reach arbitrary hosts
+PRODUCERS = {
+    "data-processing": os.getenv('DATA_SERVICE_URL', 'http://data-processing-service:5002')
+}
+# Sent with replays so producers fill in the credentials of configured sources
+# for them and for no one else; must match the producers' WARMUP_TOKEN
+WARMUP_TOKEN = os.getenv('WARMUP_TOKEN')
+
+def _contains_credentials(value: Any) -> bool:
+    """Check if a recipe body has a credential field at any depth"""
+    if isinstance(value, dict):
+        return any(key in CREDENTIAL_FIELDS or _contains_credentials(item) for key, item in value.items())
+    if isinstance(value, list):
+        return any(_contains_credentials(item) for item in value)
+    return False
+
+class CacheWarmer:
+    """Access log, producer recipes and warm-up jobs for a cache manager"""
+    
+    def __init__(self, cache_manager):
+        self.cache_manager = cache_manager
+        self.redis_client = cache_manager.redis_client
+        self.access_counts = Counter()
+        self.access_lock = threading.Lock()
+        self.last_run: Optional[Dict[str, Any]] = None
+        self.run_lock = threading.Lock()
+    
+    def record_access(self, keys: List[str]) -> None:
+        """Count reads of keys; the counts reach Redis on the next flush"""
+        with self.access_lock:
+            self.access_counts.update(keys)
+    
+    def flush_access_log(self) -> None:
+        """Add the in-process counts to the access log and trim it to the most read keys"""
+        with self.access_lock:
+            counts, self.access_counts = self.access_counts, Counter()
+        if not counts:
+            return
+        try:
+            pipeline = self.redis_client.pipeline(transaction=False)
+            for key, count in counts.items():
+                pipeline.zincrby(ACCESS_LOG_KEY, count, key)
+            pipeline.zremrangebyrank(ACCESS_LOG_KEY, 0, -ACCESS_LOG_SIZE - 1)
+            pipeline.hlen(RECIPES_KEY)
+            recipe_count = pipeline.execute()[-1]
+            # Recipes are also pruned after every warm-up; this bounds them when warm-ups are rare
+            if recipe_count > 2 * ACCESS_LOG_SIZE:
+                self._prune_recipes()
+        except Exception as e:
+            print(f"Error writing cache access log: {e}")
+    
+    def validate_recipe(self, recipe: Any) -> Optional[str]:
+        """
+        Check a recipe
+        
+        Returns:
+            Error message, or None if the recipe is valid
+        """
+        if not isinstance(recipe, dict):
+            return "Recipe must be an object"
+        if recipe.get('producer') not in PRODUCERS:
+            return f"Unknown producer. Available producers: {list(PRODUCERS)}"
+        path = recipe.get('path')
+        if not isinstance(path, str) or not path.startswith('/') or '://' in path:
+            return "Recipe path must be an absolute path on the producer"
+        if recipe.get('method', 'POST').upper() not in ('GET', 'POST'):
+            return "Recipe method must be GET or POST"
+        if _contains_credentials(recipe.get('body')):
+            return f"Recipe body must not contain credentials ({', '.join(sorted(CREDENTIAL_FIELDS))})"
+        return None
+    
+    def save_recipe(self, key: str, recipe: Dict[str, Any]) -> bool:
+        """
+        Store the recipe that recomputes a key
+        
+        Args:
+            key: Cache key
+            recipe: {"producer", "path", "method" (default POST), "body" (optional)}
+        
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            self.redis_client.hset(RECIPES_KEY, key, json.dumps(recipe))
+            return True
+        except Exception as e:
+            print(f"Error saving recipe for cache key {key}: {e}")
+            return False
+    
+    def warm(self, top_n: int = WARM_TOP_N, concurrency: int = WARM_CONCURRENCY) -> Dict[str, Any]:
+        """
+        Recompute the most read keys that are not cached
+        
+        Args:
+            top_n: Number of most read keys to consider
+            concurrency: Recipes replayed at the same time
+        
+        Returns:
+            Summary of the run
+        """
+        run = {
+            "status": "running",
+            "started_at": datetime.now().isoformat(),
+            "finished_at": None,
+            "candidates": 0,
+            "cached": 0,
+            "without_recipe": 0,
+            "warmed": 0,
+            "failed": 0,
+            "error": None
+        }
+        if not self.run_lock.acquire(blocking=False):
+            return {**run, "status": "skipped", "error": "A warm-up is already running"}
+        try:
+            self.last_run = run
+            # Only one replica warms at a time; the lock outlives the longest possible run
+            lock_ttl = WARM_REQUEST_TIMEOUT * (top_n // max(1, concurrency) + 2)
+            if not self.redis_client.set(WARM_LOCK_KEY, self.cache_manager.instance_id, nx=True, ex=lock_ttl):
+                run["status"] = "skipped"
+                run["error"] = "Another replica is warming the cache"
+                return run
+            try:
+                self.flush_access_log()
+                keys = [key.decode() for key in self.redis_client.zrevrange(ACCESS_LOG_KEY, 0, top_n - 1)]
+                run["candidates"] = len(keys)
+                recipes = self.redis_client.hmget(RECIPES_KEY, keys) if keys else []
+                
+                pending = []
+                for key, recipe in zip(keys, recipes):
+                    if recipe is None:
+                        run["without_recipe"] += 1
+                    elif self.cache_manager.exists(key):
+                        run["cached"] += 1
+                    else:
+                        pending.append((key, json.loads(recipe)))
+                
+                with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+                    for succeeded in executor.map(lambda item: self._replay(*item), pending):
+                        run["warmed" if succeeded else "failed"] += 1
+                
+                # Fade old popularity and forget recipes of keys no longer read
+                self.redis_client.zunionstore(ACCESS_LOG_KEY, {ACCESS_LOG_KEY: ACCESS_DECAY})
+                self._prune_recipes()
+            finally:
+                self.redis_client.delete(WARM_LOCK_KEY)
+            run["status"] = "completed"
+        except Exception as e:
+            print(f"Error warming cache: {e}")
+            run["status"] = "failed"
+            run["error"] = str(e)
+        finally:
+            run["finished_at"] = datetime.now().isoformat()
+            self.run_lock.release()
+        return run
+    
+    def _replay(self, key: str, recipe: Dict[str, Any]) -> bool:
+        """Send a recipe's request to its producer, which caches the result"""
+        if self.validate_recipe(recipe) is not None:
+            print(f"Skipping invalid recipe for cache key {key}")
+            return False
+        url = PRODUCERS[recipe['producer']] + recipe['path']
+        try:
+            headers = {"X-Warm-Up-Token": WARMUP_TOKEN} if WARMUP_TOKEN else {}
+            response = requests.request(recipe.get('method', 'POST').upper(), url, json=recipe.get('body'),
+                                        headers=headers, timeout=WARM_REQUEST_TIMEOUT)
+            return response.status_code < 400
+        except Exception as e:
+            print(f"Error warming cache key {key}: {e}")
+            return False
+    
+    def _prune_recipes(self) -> None:
+        """Delete the recipes of keys that dropped out of the access log"""
+        fields = self.redis_client.hkeys(RECIPES_KEY)
+        pipeline = self.redis_client.pipeline(transaction=False)
+        for field in fields:
+            pipeline.zscore(ACCESS_LOG_KEY, field)
+        scores = pipeline.execute() if fields else []
+        stale = [field for field, score in zip(fields, scores) if score is None]
+        for first in range(0, len(stale), 1000):
+            self.redis_client.hdel(RECIPES_KEY, *stale[first:first + 1000])
+    
+    def start(self) -> None:
+        """Start flushing the access log and running scheduled warm-ups in the background"""
+        thread = threading.Thread(target=self._run_schedule, daemon=True)
+        thread.start()
+    
+    def _run_schedule(self) -> None:
+        """Flush the access log every ACCESS_FLUSH_INTERVAL seconds and warm when due"""
+        next_warm = None
+        if WARM_ON_STARTUP:
+            next_warm = time.monotonic() + WARM_STARTUP_DELAY
+        elif WARM_INTERVAL > 0:
+            next_warm = time.monotonic() + WARM_INTERVAL
+        while True:
+            time.sleep(ACCESS_FLUSH_INTERVAL)
+            self.flush_access_log()
+            if next_warm is not None and time.monotonic() >= next_warm:
+                self.warm()
+                next_warm = time.monotonic() + WARM_INTERVAL if WARM_INTERVAL > 0 else None
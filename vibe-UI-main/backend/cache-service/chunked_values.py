@@ -0,0 +1,54 @@
+"""
+Chunked storage for large cached values
+
+Encoded values (codec header and payload, as written by value_codecs) of at
+least CHUNK_THRESHOLD bytes are split into CHUNK_SIZE pieces stored under
+their own keys, followed by a small manifest under the entry's key that
+records the codec and compression. No single Redis command then moves more
+than one chunk, so large entries do not stall other clients. Entries stored
+with the JSON codec can also be sent to an HTTP client chunk by chunk,
+decompressing as they arrive, instead of rebuilding the value.
+"""
+import os
+from typing import Any, Callable, Dict, Iterator
+
+CHUNK_THRESHOLD = int(os.getenv('CACHE_CHUNK_THRESHOLD', 1024 * 1024))
+CHUNK_SIZE = int(os.getenv('CACHE_CHUNK_SIZE', 512 * 1024))
+# Chunks written or read per pipelined round trip
+CHUNK_PIPELINE_DEPTH = int(os.getenv('CACHE_CHUNK_PIPELINE_DEPTH', 16))
+# Chunks outlive their manifest by this many seconds, so a reader that found
+# the manifest does not see its chunks expire first
+CHUNK_TTL_MARGIN = 60
+
+class IncompleteValueError(Exception):
+    """A chunk named by a manifest is missing (expired, evicted or invalidated)"""
+
+def chunk_key(key: str, write_id: str, index: int) -> str:
+    """Key of one chunk of a value; write_id keeps chunks of concurrent writes apart"""
+    return f"{key}:chunk:{write_id}:{index}"
+
+def is_chunk_key(key: Any) -> bool:
+    """Check if a key holds a chunk rather than an entry"""
+    if isinstance(key, bytes):
+        key = key.decode(errors='replace')
+    return ":chunk:" in key
+
+def is_streamable(manifest: Dict[str, Any]) -> bool:
+    """Check if a chunked entry's payload is JSON text that can be streamed as it is read"""
+    return manifest.get("codec") == "json"
+
+class ChunkedValue:
+    """A chunked JSON entry to be streamed; iterating yields the pieces of its JSON text"""
+    
+    def __init__(self, key: str, manifest: Dict[str, Any], reader: Callable[[str, Dict[str, Any]], Iterator[bytes]]):
+        self.key = key
+        self.manifest = manifest
+        self.reader = reader
+    
+    @property
+    def size(self) -> int:
+        """Encoded size of the entry in bytes"""
+        return self.manifest["size"]
+    
+    def __iter__(self) -> Iterator[bytes]:
+        return self.reader(self.key, self.manifest)
@@ -0,0 +1,171 @@
+"""
+In-process L1 cache in front of Redis
+
+Entries are bounded by count and by encoded size, expire with their Redis
+TTL (capped so a missed invalidation cannot keep a value alive for long)
+and are evicted in LRU order. Admission follows TinyLFU: when the cache is
+full a new key only displaces the LRU victim if a count-min sketch has
+seen it more often, so one-off reads cannot flush out hot keys.
+"""
+import os
+import time
+import random
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+L1_MAX_ENTRIES = int(os.getenv('CACHE_L1_MAX_ENTRIES', 10000))
+L1_MAX_BYTES = int(os.getenv('CACHE_L1_MAX_BYTES', 64 * 1024 * 1024))
+# Longest time an entry is served from memory, whatever its Redis TTL
+L1_MAX_TTL = float(os.getenv('CACHE_L1_TTL', 30))
+
+# Returned by get for keys not in the cache, since None is a cacheable value
+MISSING = object()
+
+class FrequencySketch:
+    """Count-min sketch of key access frequencies with periodic aging"""
+    
+    def __init__(self, width: int, depth: int = 4, sample_size: Optional[int] = None):
+        self.width = max(64, width)
+        self.depth = depth
+        self.rows = [[0] * self.width for _ in range(depth)]
+        self.seeds = [random.getrandbits(32) for _ in range(depth)]
+        # Counters are halved after this many increments so old popularity fades
+        self.sample_size = sample_size or 10 * self.width
+        self.additions = 0
+    
+    def _indexes(self, key: str):
+        """Counter index of a key in every row"""
+        for row, seed in enumerate(self.seeds):
+            yield row, hash((seed, key)) % self.width
+    
+    def increment(self, key: str) -> None:
+        """Record one access of a key"""
+        for row, index in self._indexes(key):
+            if self.rows[row][index] < 15:
+                self.rows[row][index] += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self._age()
+    
+    def estimate(self, key: str) -> int:
+        """Estimated access count of a key"""
+        return min(self.rows[row][index] for row, index in self._indexes(key))
+    
+    def _age(self) -> None:
+        """Halve every counter"""
+        self.rows = [[count >> 1 for count in row] for row in self.rows]
+        self.additions //= 2
+
+class LocalCache:
+    """Size-bounded, TTL-aware LRU cache with TinyLFU admission"""
+    
+    def __init__(self, max_entries: int = L1_MAX_ENTRIES, max_bytes: int = L1_MAX_BYTES, max_ttl: float = L1_MAX_TTL,
+                 on_evict: Optional[Callable[[str], None]] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_ttl = max_ttl
+        # key -> (value, size, expires_at), least recently used first
+        self.entries: "OrderedDict[str, Tuple[Any, int, float]]" = OrderedDict()
+        self.size = 0
+        self.sketch = FrequencySketch(4 * max_entries)
+        self.lock = threading.Lock()
+        # Bumped by every invalidation; a put started before one is dropped
+        self.epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.rejections = 0
+        self.evictions = 0
+        # Called with the key of every entry evicted to make room
+        self.on_evict = on_evict
+    
+    def get(self, key: str) -> Any:
+        """
+        Look a key up
+        
+        Returns:
+            The cached value, or MISSING
+        """
+        with self.lock:
+            self.sketch.increment(key)
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            if entry[2] <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return MISSING
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+    
+    def put(self, key: str, value: Any, size: int, ttl: Optional[float], epoch: int) -> bool:
+        """
+        Offer a value read from Redis to the cache
+        
+        Args:
+            key: Cache key
+            value: Decoded value; callers must not mutate values they get back
+            size: Encoded size in bytes
+            ttl: Remaining Redis TTL in seconds (None if the key does not expire)
+            epoch: Value of self.epoch before Redis was read
+        
+        Returns:
+            True if the value was admitted
+        """
+        if size > self.max_bytes or (ttl is not None and ttl <= 0):
+            return False
+        expires_at = time.monotonic() + min(ttl if ttl is not None else self.max_ttl, self.max_ttl)
+        with self.lock:
+            if epoch != self.epoch:
+                # Invalidated while the value was being read
+                return False
+            if key in self.entries:
+                self._remove(key)
+            while self.entries and (len(self.entries) >= self.max_entries or self.size + size > self.max_bytes):
+                victim = next(iter(self.entries))
+                if self.entries[victim][2] > time.monotonic() and self.sketch.estimate(key) <= self.sketch.estimate(victim):
+                    self.rejections += 1
+                    return False
+                self._remove(victim)
+                self.evictions += 1
+                if self.on_evict is not None:
+                    self.on_evict(victim)
+            self.entries[key] = (value, size, expires_at)
+            self.size += size
+            return True
+    
+    def _remove(self, key: str) -> None:
+        """Drop an entry; the lock must be held"""
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+    
+    def invalidate(self, keys: Iterable[str]) -> None:
+        """Drop keys and cancel puts that are in flight"""
+        with self.lock:
+            self.epoch += 1
+            for key in keys:
+                self._remove(key)
+    
+    def clear(self) -> None:
+        """Drop every entry"""
+        with self.lock:
+            self.epoch += 1
+            self.entries.clear()
+            self.size = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get entry counts and hit statistics"""
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total * 100, 2) if total else 0.0,
+                "evictions": self.evictions,
+                "admission_rejections": self.rejections
+            }
\ No newline at end of file
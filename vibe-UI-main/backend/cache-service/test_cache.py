@@ -5,7 +5,14 @@ Test script for cache service
 
 import requests
 import json
+import os
 import time
+import datetime
+from decimal import Decimal
+from value_codecs import encode_value, decode_value, parse_header
+from local_cache import LocalCache, MISSING
+from chunked_values import ChunkedValue
+from cache_metrics import CacheMetrics
 
 # Service URL (adjust if running on different host/port)
 SERVICE_URL = "http://localhost:5010"
@@ -148,6 +155,507 @@ def test_cache_stats():
         print(f"✗ Cache stats failed: {e}")
         return False
 
+def test_value_codecs():
+    """Test that every codec returns values unchanged, including records Arrow cannot hold"""
+    print("\nTesting value codecs...")
+    try:
+        records = [{"id": i, "name": f"row-{i}", "amount": i * 1.5, "day": datetime.date(2024, 1, 1 + i % 28)} for i in range(1500)]
+        mixed_keys = [{"a": 1}] * 1000 + [{"a": 2, "b": "x"}]
+        mixed_types = [{"a": i} for i in range(1000)] + [{"a": 2.5}]
+        big_ints = [{"a": i} for i in range(1000)] + [{"a": 2 ** 70}, {"a": -2 ** 70}]
+        for value in (records, mixed_keys, mixed_types, big_ints):
+            encoded = encode_value(value, "auto")
+            if decode_value(encoded) != value:
+                print(f"✗ auto codec changed a {parse_header(encoded)[0]} value")
+                return False
+        if parse_header(encode_value(records, "auto"))[0] != "arrow":
+            print("✗ auto codec did not store uniform records as Arrow")
+            return False
+        if parse_header(encode_value(mixed_keys, "auto"))[0] == "arrow" or parse_header(encode_value(mixed_types, "auto"))[0] == "arrow":
+            print("✗ auto codec stored records with differing keys or types as Arrow")
+            return False
+        try:
+            encode_value([{"a": 1}, {"a": 2, "b": "x"}], "arrow")
+            print("✗ arrow codec accepted records with differing keys")
+            return False
+        except ValueError:
+            pass
+        
+        value = {"name": "Test Data", "values": [1, 2.5, None, "x"], "nested": {"ok": True}}
+        for codec in ("json", "msgpack"):
+            for compression in ("none", "lz4"):
+                if decode_value(encode_value(value, codec, compression)) != value:
+                    print(f"✗ {codec} with {compression} compression changed the value")
+                    return False
+        if decode_value(json.dumps(value).encode()) != value:
+            print("✗ Entries written before the codec header are not read as JSON")
+            return False
+        print("✓ Values round trip through every codec")
+        return True
+    except Exception as e:
+        print(f"✗ Value codecs failed: {e}")
+        return False
+
+def test_mset_mget():
+    """Test writing and reading several entries in one request"""
+    print("\nTesting mset and mget endpoints...")
+    try:
+        entries = [
+            {"key": "multi_a", "value": {"n": 1}, "ttl": 60},
+            {"key": "multi_b", "value": [1, 2, 3], "ttl": 60, "tags": ["multi_tag"]},
+            {"key": "multi_c", "value": "text", "codec": "json"}
+        ]
+        response = requests.post(f"{SERVICE_URL}/api/cache/mset", json={"entries": entries})
+        if response.status_code != 201 or response.json().get("stored") != 3:
+            print(f"✗ mset failed with status {response.status_code}: {response.text}")
+            return False
+        
+        response = requests.post(f"{SERVICE_URL}/api/cache/mget", json={"keys": ["multi_a", "multi_b", "multi_c", "multi_missing"]})
+        data = response.json()
+        if response.status_code != 200 or data.get("missing") != ["multi_missing"]:
+            print(f"✗ mget failed with status {response.status_code}: {response.text}")
+            return False
+        if data["values"] != {entry["key"]: entry["value"] for entry in entries}:
+            print(f"✗ mget returned different values: {data['values']}")
+            return False
+        
+        response = requests.post(f"{SERVICE_URL}/api/cache/mset", json={"entries": [{"key": "multi_d"}]})
+        if response.status_code != 400:
+            print(f"✗ mset accepted an entry without a value ({response.status_code})")
+            return False
+        
+        # Tags written by mset invalidate like any other
+        requests.delete(f"{SERVICE_URL}/api/cache/invalidate-tag/multi_tag")
+        response = requests.post(f"{SERVICE_URL}/api/cache/mget", json={"keys": ["multi_a", "multi_b"]})
+        if response.json().get("missing") != ["multi_b"]:
+            print(f"✗ Tagged mset entry survived invalidation: {response.text}")
+            return False
+        print("✓ mset stored 3 entries and mget read them back in one request")
+        return True
+    except Exception as e:
+        print(f"✗ mset/mget failed: {e}")
+        return False
+
+def test_invalidate_large_tag():
+    """Test invalidating a tag with more members than one UNLINK batch"""
+    print("\nTesting invalidation of a large tag...")
+    try:
+        entries = [{"key": f"bulk_tag_{i}", "value": i, "ttl": 60, "tags": ["bulk_tag"]} for i in range(1500)]
+        entries.append({"key": "bulk_other", "value": "kept", "ttl": 60, "tags": ["bulk_other_tag"]})
+        requests.post(f"{SERVICE_URL}/api/cache/mset", json={"entries": entries})
+        # Members deleted before the invalidation are not counted
+        requests.delete(f"{SERVICE_URL}/api/cache/bulk_tag_0")
+        
+        response = requests.delete(f"{SERVICE_URL}/api/cache/invalidate-tag/bulk_tag")
+        if response.status_code != 200 or "Invalidated 1499 entries" not in response.json().get("message", ""):
+            print(f"✗ Tag invalidation returned {response.status_code}: {response.text}")
+            return False
+        
+        response = requests.post(f"{SERVICE_URL}/api/cache/mget", json={"keys": ["bulk_tag_1", "bulk_tag_1499", "bulk_other"]})
+        if response.json().get("missing") != ["bulk_tag_1", "bulk_tag_1499"]:
+            print(f"✗ Wrong entries left after invalidation: {response.text}")
+            return False
+        
+        response = requests.delete(f"{SERVICE_URL}/api/cache/invalidate-tag/bulk_tag")
+        if "Invalidated 0 entries" not in response.json().get("message", ""):
+            print(f"✗ Invalidating an empty tag again removed entries: {response.text}")
+            return False
+        print("✓ Invalidated 1499 tagged entries in batches and kept other tags")
+        return True
+    except Exception as e:
+        print(f"✗ Large tag invalidation failed: {e}")
+        return False
+
+def test_local_cache():
+    """Test the in-process L1 cache bounds, expiry, admission and invalidation"""
+    print("\nTesting in-process L1 cache...")
+    try:
+        evicted = []
+        cache = LocalCache(max_entries=2, max_bytes=1000, max_ttl=30, on_evict=evicted.append)
+        for _ in range(5):
+            cache.get("hot")
+        cache.put("hot", {"v": 1}, 10, 60, cache.epoch)
+        cache.put("warm", "w", 10, 60, cache.epoch)
+        if cache.get("hot") != {"v": 1} or cache.get("warm") != "w":
+            print("✗ Admitted values were not returned")
+            return False
+        
+        # A key read once does not displace the least recently used, more popular key
+        if cache.put("one_off", "x", 10, 60, cache.epoch) or cache.get("one_off") is not MISSING:
+            print("✗ A one-off key displaced a popular one")
+            return False
+        for _ in range(10):
+            cache.get("rising")
+        if not cache.put("rising", "r", 10, 60, cache.epoch) or evicted != ["hot"]:
+            print(f"✗ A frequently read key was not admitted over the LRU entry: {evicted}")
+            return False
+        
+        if cache.put("huge", "h", 2000, 60, cache.epoch) or cache.put("expired", "e", 10, 0, cache.epoch):
+            print("✗ Oversized or expired values were admitted")
+            return False
+        
+        # A read that raced with an invalidation must not be cached
+        epoch = cache.epoch
+        cache.invalidate(["warm"])
+        if cache.put("warm", "stale", 10, 60, epoch) or cache.get("warm") is not MISSING:
+            print("✗ A value read before an invalidation was cached")
+            return False
+        
+        short = LocalCache(max_entries=10, max_bytes=1000, max_ttl=0.05)
+        short.put("brief", 1, 1, 3600, short.epoch)
+        time.sleep(0.1)
+        if short.get("brief") is not MISSING:
+            print("✗ Entry outlived the L1 TTL cap")
+            return False
+        print("✓ L1 cache bounded, expired and invalidated entries as expected")
+        return True
+    except Exception as e:
+        print(f"✗ L1 cache failed: {e}")
+        return False
+
+def test_metrics():
+    """Test per-namespace metrics and their Prometheus rendering"""
+    print("\nTesting cache metrics...")
+    try:
+        metrics = CacheMetrics(max_namespaces=2)
+        metrics.increment("cache_hits_total", "reports:1", tier="redis")
+        metrics.increment("cache_hits_total", "reports:2", tier="redis")
+        metrics.increment("cache_misses_total", "plain_key")
+        metrics.increment("cache_misses_total", "third:1")
+        metrics.observe("cache_value_size_bytes", "reports:1", 300)
+        text = metrics.render({"cache_redis_used_memory_bytes": ("Memory used by Redis", 1024)})
+        expected = [
+            'cache_hits_total{namespace="reports",tier="redis"} 2',
+            'cache_misses_total{namespace="default"} 1',
+            'cache_misses_total{namespace="other"} 1',
+            'cache_value_size_bytes_bucket{namespace="reports",le="256"} 0',
+            'cache_value_size_bytes_bucket{namespace="reports",le="1024"} 1',
+            'cache_value_size_bytes_bucket{namespace="reports",le="+Inf"} 1',
+            'cache_value_size_bytes_sum{namespace="reports"} 300',
+            "# TYPE cache_redis_used_memory_bytes gauge",
+            "cache_redis_used_memory_bytes 1024"
+        ]
+        missing = [line for line in expected if line not in text.splitlines()]
+        if missing:
+            print(f"✗ Rendered metrics lack: {missing}")
+            return False
+        
+        requests.post(f"{SERVICE_URL}/api/cache", json={"key": "metrics_ns:one", "value": 1, "ttl": 60})
+        requests.get(f"{SERVICE_URL}/api/cache/metrics_ns:one")
+        requests.get(f"{SERVICE_URL}/api/cache/metrics_ns:absent")
+        response = requests.get(f"{SERVICE_URL}/metrics")
+        lines = response.text.splitlines()
+        if response.status_code != 200 or not any(line.startswith('cache_hits_total{namespace="metrics_ns"') for line in lines) \
+                or not any(line.startswith('cache_misses_total{namespace="metrics_ns"}') for line in lines):
+            print(f"✗ /metrics does not report the metrics_ns namespace (status {response.status_code})")
+            return False
+        print("✓ Metrics are labelled by namespace and rendered for Prometheus")
+        return True
+    except Exception as e:
+        print(f"✗ Cache metrics failed: {e}")
+        return False
+
+def test_chunked_values():
+    """Test that values above the chunk threshold read back unchanged with every codec"""
+    print("\nTesting chunked values...")
+    try:
+        # Random text compresses poorly, so the encoded value stays above the 1 MiB threshold
+        value = {"blob": [os.urandom(512).hex() for _ in range(3000)], "count": 3000}
+        records = [{"id": i, "text": os.urandom(256).hex()} for i in range(5000)]
+        for key, entry_value, codec in (("chunked_json", value, "json"), ("chunked_msgpack", value, "msgpack"),
+                                        ("chunked_records", records, "auto")):
+            response = requests.post(f"{SERVICE_URL}/api/cache", json={"key": key, "value": entry_value, "ttl": 60, "codec": codec})
+            if response.status_code != 201:
+                print(f"✗ Setting {key} failed with status {response.status_code}: {response.text}")
+                return False
+            response = requests.get(f"{SERVICE_URL}/api/cache/{key}")
+            if response.status_code != 200 or response.json().get("value") != entry_value:
+                print(f"✗ {key} did not read back unchanged (status {response.status_code})")
+                return False
+        
+        response = requests.post(f"{SERVICE_URL}/api/cache/mget", json={"keys": ["chunked_json", "chunked_msgpack"]})
+        if response.json().get("values") != {"chunked_json": value, "chunked_msgpack": value}:
+            print("✗ mget did not read chunked values back unchanged")
+            return False
+        for key in ("chunked_json", "chunked_msgpack", "chunked_records"):
+            requests.delete(f"{SERVICE_URL}/api/cache/{key}")
+        
+        # Values only Python callers can store keep their types when chunked
+        from cache_manager import CacheManager
+        manager = CacheManager()
+        start = datetime.datetime(2020, 1, 1)
+        typed = {
+            "times": [start + datetime.timedelta(seconds=int.from_bytes(os.urandom(4), "big")) for _ in range(150000)],
+            "total": Decimal("12.50")
+        }
+        if not manager.set("chunked_typed", typed, 60, codec="msgpack") or manager.get("chunked_typed") != typed:
+            print("✗ Chunked msgpack value lost its datetime or Decimal types")
+            return False
+        if manager.get("chunked_typed", stream=True) != typed:
+            print("✗ Non-JSON chunked value was not decoded for a streaming read")
+            return False
+        manager.delete("chunked_typed")
+        
+        # Large values set over HTTP without a codec are stored as JSON, so GETs stream them
+        requests.post(f"{SERVICE_URL}/api/cache", json={"key": "chunked_default", "value": value, "ttl": 60})
+        if not isinstance(manager.get("chunked_default", stream=True), ChunkedValue):
+            print("✗ Large value set over HTTP without a codec cannot be streamed")
+            return False
+        
+        # Streaming reads fill the L1 cache with every value that is not streamed
+        manager.local_cache = LocalCache()
+        manager.set("chunked_small", {"small": True}, 60)
+        if manager.get("chunked_small", stream=True) != {"small": True} or manager.local_cache.get("chunked_small") is MISSING:
+            print("✗ Streaming read of a small value did not fill the L1 cache")
+            return False
+        if not isinstance(manager.get("chunked_default", stream=True), ChunkedValue) or manager.local_cache.get("chunked_default") is not MISSING:
+            print("✗ Streamed value was decoded into the L1 cache")
+            return False
+        for key in ("chunked_default", "chunked_small"):
+            manager.delete(key)
+        print("✓ Chunked json, msgpack and arrow values read back unchanged")
+        return True
+    except Exception as e:
+        print(f"✗ Chunked values failed: {e}")
+        return False
+
+def test_get_or_compute():
+    """Test XFetch early recomputation and stampede protection of get_or_compute"""
+    print("\nTesting get_or_compute...")
+    try:
+        import threading
+        from cache_manager import CacheManager
+        manager = CacheManager()
+        calls = []
+        
+        def producer():
+            calls.append(1)
+            time.sleep(0.2)
+            return {"computed": len(calls)}
+        
+        # A miss computes once; a fresh value is served from the cache
+        first = manager.get_or_compute("xfetch_key", producer, ttl=60)
+        second = manager.get_or_compute("xfetch_key", producer, ttl=60)
+        if first != {"computed": 1} or second != first or len(calls) != 1:
+            print(f"✗ Fresh value was recomputed: {first}, {second}, {len(calls)} calls")
+            return False
+        
+        # A value about to expire is recomputed early, unless beta is 0
+        state_key = "xfetch_key:xfetch"
+        manager.redis_client.setex(state_key, 60, json.dumps({"delta": 10.0, "expiry": time.time()}))
+        if manager.get_or_compute("xfetch_key", producer, ttl=60, beta=0) != first or len(calls) != 1:
+            print("✗ Value was recomputed with beta 0")
+            return False
+        if manager.get_or_compute("xfetch_key", producer, ttl=60) != {"computed": 2} or len(calls) != 2:
+            print("✗ Value about to expire was not recomputed early")
+            return False
+        
+        # Concurrent misses run the producer once; the others wait for its value
+        calls.clear()
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(manager.get_or_compute("xfetch_miss", producer, ttl=60)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        manager.delete("xfetch_key")
+        manager.delete("xfetch_miss")
+        if len(calls) != 1 or results != [{"computed": 1}] * 8:
+            print(f"✗ Concurrent misses ran the producer {len(calls)} times")
+            return False
+        
+        # A miss whose value is stored by the previous lock holder before the lock is taken is not recomputed
+        calls.clear()
+        manager.set("xfetch_late", {"computed": 0}, 60)
+        get = manager.get
+        reads = []
+        
+        def late_get(key, **kwargs):
+            # The first read misses, as if it ran just before the value was stored
+            reads.append(key)
+            return None if len(reads) == 1 else get(key, **kwargs)
+        
+        manager.get = late_get
+        value = manager.get_or_compute("xfetch_late", producer, ttl=60)
+        del manager.get
+        locked = manager.redis_client.exists("xfetch_late:recompute")
+        manager.delete("xfetch_late")
+        if value != {"computed": 0} or calls or locked:
+            print(f"✗ Value stored before the lock was taken was recomputed ({len(calls)} calls, lock held: {bool(locked)})")
+            return False
+        
+        print("✓ get_or_compute recomputed early only when due and once per miss")
+        return True
+    except Exception as e:
+        print(f"✗ get_or_compute test failed: {e}")
+        return False
+
+def test_flush_namespace():
+    """Test that a namespace flush runs as a job and removes only that namespace"""
+    print("\nTesting namespace flush...")
+    try:
+        entries = [{"key": f"flushns:item{i}", "value": i, "ttl": 60} for i in range(50)]
+        entries.append({"key": "keepns:item", "value": "kept", "ttl": 60})
+        response = requests.post(f"{SERVICE_URL}/api/cache/mset", json={"entries": entries})
+        if response.status_code != 201:
+            print(f"✗ Multi-set failed with status {response.status_code}")
+            return False
+        
+        response = requests.delete(f"{SERVICE_URL}/api/cache/flush", params={"namespace": "flushns"})
+        if response.status_code != 202:
+            print(f"✗ Flush failed with status {response.status_code}")
+            return False
+        job_id = response.json()["job"]["id"]
+        
+        job = None
+        for _ in range(100):
+            job = requests.get(f"{SERVICE_URL}/api/cache/flush/{job_id}").json()
+            if job.get("status") != "running":
+                break
+            time.sleep(0.05)
+        if job.get("status") != "completed" or job.get("deleted") != 50 or job.get("progress") != 100.0:
+            print(f"✗ Flush job did not complete as expected: {job}")
+            return False
+        
+        response = requests.post(f"{SERVICE_URL}/api/cache/mget",
+                                 json={"keys": ["flushns:item0", "flushns:item49", "keepns:item"]})
+        values = response.json().get("values", {})
+        requests.delete(f"{SERVICE_URL}/api/cache/keepns:item")
+        if "flushns:item0" in values or "flushns:item49" in values or values.get("keepns:item") != "kept":
+            print(f"✗ Flush removed the wrong keys: {values}")
+            return False
+        
+        if requests.get(f"{SERVICE_URL}/api/cache/flush/unknown").status_code != 404:
+            print("✗ Unknown flush job was not reported as missing")
+            return False
+        
+        print("✓ Namespace flush removed only its own keys and reported progress")
+        return True
+    except Exception as e:
+        print(f"✗ Namespace flush test failed: {e}")
+        return False
+
+def test_namespace_generations():
+    """Test that bumping or losing a namespace's generation hides its old entries"""
+    print("\nTesting namespace generations...")
+    try:
+        response = requests.post(f"{SERVICE_URL}/api/cache", json={"key": "genns:item", "value": "old", "ttl": 60})
+        if response.status_code != 201:
+            print(f"✗ Set failed with status {response.status_code}")
+            return False
+        response = requests.post(f"{SERVICE_URL}/api/cache/namespaces/genns/bump")
+        if response.status_code != 200:
+            print(f"✗ Bump failed with status {response.status_code}")
+            return False
+        if requests.get(f"{SERVICE_URL}/api/cache/genns:item").status_code != 404:
+            print("✗ Entry written before the bump was still read")
+            return False
+        requests.post(f"{SERVICE_URL}/api/cache", json={"key": "genns:item", "value": "new", "ttl": 60})
+        response = requests.get(f"{SERVICE_URL}/api/cache/genns:item")
+        requests.delete(f"{SERVICE_URL}/api/cache/genns:item")
+        if response.status_code != 200 or response.json().get("value") != "new":
+            print(f"✗ Entry written after the bump was not read: {response.text}")
+            return False
+        
+        # The service's own keys cannot be flushed or bumped away
+        if requests.delete(f"{SERVICE_URL}/api/cache/flush", params={"namespace": "cache"}).status_code != 400:
+            print("✗ Flush of the reserved namespace was accepted")
+            return False
+        if requests.post(f"{SERVICE_URL}/api/cache/namespaces/cache/bump").status_code != 400:
+            print("✗ Bump of the reserved namespace was accepted")
+            return False
+        
+        # Reads and writes of namespaces that were never bumped create no counters
+        from cache_manager import CacheManager, GENERATION_KEY_PREFIX
+        manager = CacheManager()
+        for i in range(20):
+            manager.get(f"readns{i}:item")
+        manager.set("readns:item", "value", 60)
+        counters = list(manager.redis_client.scan_iter(match=f"{GENERATION_KEY_PREFIX}readns*"))
+        manager.delete("readns:item")
+        if counters:
+            print(f"✗ Reads created {len(counters)} generation counters")
+            return False
+        
+        # A lost generation counter must not bring back entries of bumped generations
+        manager.bump_namespace("lostns")
+        manager.set("lostns:item", "bumped", 60)
+        time.sleep(0.01)
+        manager.redis_client.delete(GENERATION_KEY_PREFIX + "lostns")
+        manager.generations = {}
+        stale = manager.get("lostns:item")
+        manager.bump_namespace("lostns")
+        manager.generations = {}
+        if stale is not None or manager.get("lostns:item") is not None:
+            print(f"✗ Entry of an earlier generation was read after its counter was lost: {stale}")
+            return False
+        
+        print("✓ Bumped and lost generations hid older entries")
+        return True
+    except Exception as e:
+        print(f"✗ Namespace generation test failed: {e}")
+        return False
+
+def test_recipe_credentials():
+    """Test that recipes carrying credentials are refused and replays carry the warm-up token"""
+    print("\nTesting warm-up recipe validation...")
+    try:
+        recipe = {
+            "producer": "data-processing",
+            "path": "/api/connect",
+            "body": {"type": "postgresql", "params": {"host": "db", "password": "secret"}, "query": "select 1"}
+        }
+        entry = {"key": "recipe_key", "value": 1, "ttl": 60, "recipe": recipe}
+        response = requests.post(f"{SERVICE_URL}/api/cache", json=entry)
+        if response.status_code != 400:
+            print(f"✗ Recipe with a password was accepted ({response.status_code})")
+            return False
+        
+        recipe["body"]["params"] = {"host": "db"}
+        response = requests.post(f"{SERVICE_URL}/api/cache", json=entry)
+        requests.delete(f"{SERVICE_URL}/api/cache/recipe_key")
+        if response.status_code != 201:
+            print(f"✗ Recipe without credentials was refused: {response.text}")
+            return False
+        
+        # Replays carry the warm-up token, so the producer fills in configured credentials for them only
+        import threading
+        import cache_warmer
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+        from cache_manager import CacheManager
+        tokens = []
+        
+        class Producer(BaseHTTPRequestHandler):
+            def do_POST(self):
+                tokens.append(self.headers.get("X-Warm-Up-Token"))
+                self.send_response(200)
+                self.end_headers()
+            
+            def log_message(self, *args):
+                pass
+        
+        server = HTTPServer(('127.0.0.1', 0), Producer)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        previous = (cache_warmer.WARMUP_TOKEN, dict(cache_warmer.PRODUCERS))
+        cache_warmer.WARMUP_TOKEN = "warm-up-token"
+        cache_warmer.PRODUCERS["data-processing"] = f"http://127.0.0.1:{server.server_port}"
+        try:
+            replayed = cache_warmer.CacheWarmer(CacheManager())._replay("recipe_key", recipe)
+        finally:
+            server.shutdown()
+            cache_warmer.WARMUP_TOKEN = previous[0]
+            cache_warmer.PRODUCERS.update(previous[1])
+        if not replayed or tokens != ["warm-up-token"]:
+            print(f"✗ Replay did not send the warm-up token: {tokens}")
+            return False
+        
+        print("✓ Recipes with credentials were refused and replays carried the warm-up token")
+        return True
+    except Exception as e:
+        print(f"✗ Recipe validation test failed: {e}")
+        return False
+
 def main():
     """Main test function"""
     print("Cache Service Test")
@@ -161,7 +669,17 @@ def main():
         test_exists_cache,
         test_cache_stats,
         test_invalidate_tag,
-        test_delete_cache
+        test_delete_cache,
+        test_value_codecs,
+        test_mset_mget,
+        test_invalidate_large_tag,
+        test_local_cache,
+        test_metrics,
+        test_chunked_values,
+        test_get_or_compute,
+        test_flush_namespace,
+        test_namespace_generations,
+        test_recipe_credentials
     ]
     
     results = []
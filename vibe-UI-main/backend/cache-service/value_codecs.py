@@ -0,0 +1,297 @@
+"""
+Value encodings for cached entries
+
+Every value written by the cache manager starts with a four byte header:
+two magic bytes, the codec id and the compression id. The first magic byte
+(0xC1) can never start a JSON document (nor any UTF-8 text), so entries
+written before the header existed are recognised and decoded as JSON.
+"""
+import os
+import json
+import pickle
+import datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+try:
+    import lz4.frame
+    LZ4_AVAILABLE = True
+except ImportError:
+    LZ4_AVAILABLE = False
+
+MAGIC = b"\xc1\x5e"
+HEADER_SIZE = 4
+
+CODECS = {"json": 0, "msgpack": 1, "arrow": 2, "pickle": 3}
+COMPRESSIONS = {"none": 0, "zstd": 1, "lz4": 2}
+CODEC_NAMES = {code: name for name, code in CODECS.items()}
+COMPRESSION_NAMES = {code: name for name, code in COMPRESSIONS.items()}
+# Codec id of chunk manifests (see chunked_values.py); callers cannot select it
+MANIFEST_CODEC = 0x7F
+
+DEFAULT_CODEC = os.getenv('CACHE_CODEC', 'msgpack' if MSGPACK_AVAILABLE else 'json')
+DEFAULT_COMPRESSION = os.getenv('CACHE_COMPRESSION', 'zstd' if ZSTD_AVAILABLE else ('lz4' if LZ4_AVAILABLE else 'none'))
+# Encoded values smaller than this are stored uncompressed
+COMPRESSION_THRESHOLD = int(os.getenv('CACHE_COMPRESSION_THRESHOLD', 4096))
+# Lists of at least this many records are stored as Arrow tables when the codec is "auto"
+ARROW_MIN_ROWS = int(os.getenv('CACHE_ARROW_MIN_ROWS', 1000))
+# Pickle runs arbitrary code on load, so it is only allowed for trusted internal callers
+ALLOW_PICKLE = os.getenv('CACHE_ALLOW_PICKLE', 'false').lower() == 'true'
+
+# msgpack extension types for values JSON would turn into strings
+_EXT_DATETIME = 1
+_EXT_DATE = 2
+_EXT_DECIMAL = 3
+_EXT_BIGINT = 4
+
+def _msgpack_default(value: Any) -> Any:
+    """Encode types msgpack has no native representation for"""
+    if isinstance(value, datetime.datetime):
+        return msgpack.ExtType(_EXT_DATETIME, value.isoformat().encode())
+    if isinstance(value, datetime.date):
+        return msgpack.ExtType(_EXT_DATE, value.isoformat().encode())
+    if isinstance(value, Decimal):
+        return msgpack.ExtType(_EXT_DECIMAL, str(value).encode())
+    if isinstance(value, int):
+        # Only integers outside the 64-bit range reach the default hook
+        return msgpack.ExtType(_EXT_BIGINT, str(value).encode())
+    if isinstance(value, (set, tuple)):
+        return list(value)
+    return str(value)
+
+def _msgpack_ext_hook(code: int, data: bytes) -> Any:
+    """Decode the extension types written by _msgpack_default"""
+    if code == _EXT_DATETIME:
+        return datetime.datetime.fromisoformat(data.decode())
+    if code == _EXT_DATE:
+        return datetime.date.fromisoformat(data.decode())
+    if code == _EXT_DECIMAL:
+        return Decimal(data.decode())
+    if code == _EXT_BIGINT:
+        return int(data.decode())
+    return msgpack.ExtType(code, data)
+
+# Python types the arrow codec stores; each comes back from Arrow as the same type
+_ARROW_SCALARS = (bool, int, float, str, bytes, datetime.datetime, datetime.date)
+
+def _check_arrow_records(records: list) -> None:
+    """
+    Check that records survive a round trip through an Arrow table unchanged
+    
+    A table has the columns of the first record and one type per column, so
+    records with other keys would lose or gain keys, and a column mixing
+    Python types would be converted (1 and 2.5 come back as 1.0 and 2.5).
+    Nested and timezone-aware values are refused for the same reason.
+    
+    Raises:
+        ValueError: If the records do not fit a table exactly
+    """
+    if not records:
+        return
+    keys = records[0].keys()
+    if not all(isinstance(key, str) for key in keys):
+        raise ValueError("The arrow codec only stores records with string keys")
+    column_types = dict.fromkeys(keys)
+    for record in records:
+        if record.keys() != keys:
+            raise ValueError("The arrow codec only stores records that all have the same keys")
+        for key, value in record.items():
+            if value is None:
+                continue
+            kind = type(value)
+            if kind not in _ARROW_SCALARS or (kind is datetime.datetime and value.tzinfo is not None):
+                raise ValueError(f"The arrow codec cannot store {kind.__name__} values exactly")
+            seen = column_types[key]
+            if seen is None:
+                column_types[key] = kind
+            elif seen is not kind:
+                raise ValueError(f"Column {key} mixes {seen.__name__} and {kind.__name__} values")
+
+def _is_records(value: Any) -> bool:
+    """Check if a value is a list of flat records that fits an Arrow table"""
+    return (isinstance(value, list) and len(value) >= ARROW_MIN_ROWS
+            and all(isinstance(record, dict) for record in value))
+
+def _serialize(value: Any, codec: str) -> bytes:
+    """Serialise a value with one codec"""
+    if codec == "json":
+        return json.dumps(value, default=str).encode()
+    if codec == "msgpack":
+        if not MSGPACK_AVAILABLE:
+            raise ImportError("msgpack is not installed. Please install it to use the msgpack codec.")
+        return msgpack.packb(value, default=_msgpack_default, use_bin_type=True)
+    if codec == "arrow":
+        if not ARROW_AVAILABLE:
+            raise ImportError("pyarrow is not installed. Please install it to use the arrow codec.")
+        if not isinstance(value, list) or not all(isinstance(record, dict) for record in value):
+            raise ValueError("The arrow codec only stores lists of records")
+        _check_arrow_records(value)
+        table = pa.Table.from_pylist(value)
+        sink = pa.BufferOutputStream()
+        with ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    if codec == "pickle":
+        if not ALLOW_PICKLE:
+            raise ValueError("The pickle codec is disabled; set CACHE_ALLOW_PICKLE=true for trusted deployments")
+        return pickle.dumps(value, protocol=5)
+    raise ValueError(f"Unknown codec: {codec}. Available codecs: {list(CODECS)}")
+
+def _deserialize(data: bytes, codec: str) -> Any:
+    """Deserialise a value written with one codec"""
+    if codec == "json":
+        return json.loads(data)
+    if codec == "msgpack":
+        if not MSGPACK_AVAILABLE:
+            raise ImportError("msgpack is not installed. Please install it to use the msgpack codec.")
+        return msgpack.unpackb(data, ext_hook=_msgpack_ext_hook, raw=False, strict_map_key=False)
+    if codec == "arrow":
+        if not ARROW_AVAILABLE:
+            raise ImportError("pyarrow is not installed. Please install it to use the arrow codec.")
+        return ipc.open_stream(pa.py_buffer(data)).read_all().to_pylist()
+    if codec == "pickle":
+        if not ALLOW_PICKLE:
+            raise ValueError("The pickle codec is disabled; set CACHE_ALLOW_PICKLE=true for trusted deployments")
+        return pickle.loads(data)
+    raise ValueError(f"Unknown codec: {codec}")
+
+def compress(data: bytes, compression: str) -> bytes:
+    """Compress bytes with a compression method"""
+    if compression == "none":
+        return data
+    if compression == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise ImportError("zstandard is not installed. Please install it to use zstd compression.")
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    if compression == "lz4":
+        if not LZ4_AVAILABLE:
+            raise ImportError("lz4 is not installed. Please install it to use lz4 compression.")
+        return lz4.frame.compress(data)
+    raise ValueError(f"Unknown compression: {compression}. Available compressions: {list(COMPRESSIONS)}")
+
+def decompress(data: bytes, compression: str) -> bytes:
+    """Reverse compress"""
+    if compression == "none":
+        return data
+    if compression == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise ImportError("zstandard is not installed. Please install it to read zstd compressed values.")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if compression == "lz4":
+        if not LZ4_AVAILABLE:
+            raise ImportError("lz4 is not installed. Please install it to read lz4 compressed values.")
+        return lz4.frame.decompress(data)
+    raise ValueError(f"Unknown compression: {compression}")
+
+def iter_decompress(pieces: Iterable[bytes], compression: str) -> Iterator[bytes]:
+    """Decompress a compressed payload that arrives in pieces, yielding output as it becomes available"""
+    if compression == "none":
+        yield from pieces
+        return
+    if compression == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise ImportError("zstandard is not installed. Please install it to read zstd compressed values.")
+        decompressor = zstandard.ZstdDecompressor().decompressobj()
+    elif compression == "lz4":
+        if not LZ4_AVAILABLE:
+            raise ImportError("lz4 is not installed. Please install it to read lz4 compressed values.")
+        decompressor = lz4.frame.LZ4FrameDecompressor()
+    else:
+        raise ValueError(f"Unknown compression: {compression}")
+    for piece in pieces:
+        data = decompressor.decompress(piece)
+        if data:
+            yield data
+
+def encode_value(value: Any, codec: Optional[str] = None, compression: Optional[str] = None) -> bytes:
+    """
+    Encode a value for storage
+    
+    Args:
+        value: Value to encode
+        codec: "json", "msgpack", "arrow", "pickle" or "auto" (default: CACHE_CODEC);
+            "auto" stores large record lists as Arrow when they fit a table exactly and
+            everything else with the default codec
+        compression: "zstd", "lz4" or "none" (default: CACHE_COMPRESSION), applied above
+            COMPRESSION_THRESHOLD bytes when it makes the value smaller
+    
+    Returns:
+        Header followed by the (possibly compressed) payload
+    """
+    codec = codec or DEFAULT_CODEC
+    if codec == "auto":
+        codec = DEFAULT_CODEC if DEFAULT_CODEC != "auto" else ("msgpack" if MSGPACK_AVAILABLE else "json")
+        if ARROW_AVAILABLE and _is_records(value):
+            try:
+                payload = _serialize(value, "arrow")
+                codec = "arrow"
+            except (ValueError, OverflowError, pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+                # Records with differing keys or mixed column types do not fit a table
+                payload = _serialize(value, codec)
+        else:
+            payload = _serialize(value, codec)
+    else:
+        payload = _serialize(value, codec)
+    
+    compression = compression or DEFAULT_COMPRESSION
+    if compression != "none" and len(payload) >= COMPRESSION_THRESHOLD:
+        compressed = compress(payload, compression)
+        if len(compressed) < len(payload):
+            return MAGIC + bytes([CODECS[codec], COMPRESSIONS[compression]]) + compressed
+    return MAGIC + bytes([CODECS[codec], COMPRESSIONS["none"]]) + payload
+
+def parse_header(data: bytes) -> Optional[Tuple[str, str]]:
+    """Get (codec, compression) from an encoded value, or None for legacy JSON entries"""
+    if len(data) < HEADER_SIZE or data[:2] != MAGIC:
+        return None
+    if data[2] == MANIFEST_CODEC:
+        raise ValueError("Cached value is chunked and must be read through the cache manager")
+    codec = CODEC_NAMES.get(data[2])
+    compression = COMPRESSION_NAMES.get(data[3])
+    if codec is None or compression is None:
+        raise ValueError("Cached value has an unknown codec header")
+    return codec, compression
+
+def decode_value(data: bytes) -> Any:
+    """
+    Decode a stored value
+    
+    Args:
+        data: Bytes read from Redis
+    
+    Returns:
+        The original value; entries without a header are read as JSON
+    """
+    header = parse_header(data)
+    if header is None:
+        return json.loads(data)
+    codec, compression = header
+    return _deserialize(decompress(data[HEADER_SIZE:], compression), codec)
+
+def encode_manifest(manifest: Dict[str, Any]) -> bytes:
+    """Encode the manifest of a chunked value"""
+    return MAGIC + bytes([MANIFEST_CODEC, COMPRESSIONS["none"]]) + json.dumps(manifest).encode()
+
+def parse_manifest(data: Optional[bytes]) -> Optional[Dict[str, Any]]:
+    """Get the manifest from a stored value, or None if the value is not chunked"""
+    if data is None or len(data) < HEADER_SIZE or data[:2] != MAGIC or data[2] != MANIFEST_CODEC:
+        return None
+    return json.loads(data[HEADER_SIZE:])
\ No newline at end of file
@@ -1,12 +1,22 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, Response, stream_with_context
 from flask_cors import CORS
 import os
 import sys
+import hmac
 import requests
-import hashlib
 import json
+import pandas as pd
 sys.path.append(os.path.dirname(__file__))
-from data_connectors import create_connector
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared'))
+from data_connectors import create_connector, DataConnector, DEFAULT_BATCH_SIZE
+from dataset_store import dataset_store
+from sampling import reservoir_sample, stratified_sample, time_bucket_sample, DEFAULT_MAX_GROUPS
+from rollups import rollup_manager, aggregate_batches
+from sketches import DatasetSketch
+from query_cache import (build_cache_key, build_cache_tags, table_tag, source_id, without_credentials,
+                         CREDENTIAL_PARAMS, FILE_CONNECTORS)
+from fetch_budget import FetchBudget, ResultTooLarge, fetch_bounded
+import downsampling
 
 app = Flask(__name__)
 CORS(app, resources={r"/api/*": {"origins": "*"}})
@@ -49,6 +59,99 @@ def transform_data():
     
     return jsonify(transformed_data)
 
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+def _wants_stream(config):
+    """Check whether the caller asked for a streamed NDJSON response"""
+    if config.get('stream'):
+        return True
+    return request.accept_mimetypes.best == NDJSON_MIMETYPE
+
+def _ndjson_lines(records):
+    """Serialise an iterable of records as NDJSON lines"""
+    for record in records:
+        yield json.dumps(record, default=str) + "\n"
+
+def _stream_connector(connector, query, batch_size):
+    """
+    Stream connector results as NDJSON, one record per line
+    
+    Batches are serialised as soon as the connector yields them so the
+    full result never has to be held in memory. Errors after the first
+    byte has been sent are reported as a final {"error": ...} line.
+    """
+    try:
+        for batch in connector.fetch_batches(query, batch_size):
+            yield "".join(_ndjson_lines(batch))
+    except Exception as e:
+        yield json.dumps({"error": str(e)}) + "\n"
+    finally:
+        connector.disconnect()
+
+SKETCH_ATTACHMENT = "sketch"
+
+def _build_sketch(batches):
+    """Build column sketches from an iterable of record batches"""
+    sketch = DatasetSketch()
+    for batch in batches:
+        sketch.update(batch)
+    return sketch
+
+def _store_dataset(data, sketch=None):
+    """Save records and their column sketches to the dataset store, returning None if the store is unavailable"""
+    if not data:
+        return None
+    try:
+        dataset_handle = dataset_store.put_records(data)
+        if dataset_store.load_attachment(dataset_handle, SKETCH_ATTACHMENT) is None:
+            sketch = sketch or _build_sketch(data[start:start + DEFAULT_BATCH_SIZE] for start in range(0, len(data), DEFAULT_BATCH_SIZE))
+            dataset_store.save_attachment(dataset_handle, SKETCH_ATTACHMENT, sketch.to_dict())
+        return dataset_handle
+    except Exception as store_error:
+        print(f"Error storing dataset: {store_error}")
+        return None
+
+def _load_sketch(dataset_handle):
+    """Load the column sketches of a stored dataset, building them on first use"""
+    stored = dataset_store.load_attachment(dataset_handle, SKETCH_ATTACHMENT)
+    if stored is not None:
+        return DatasetSketch.from_dict(stored)
+    sketch = _build_sketch(dataset_store.iter_batches(dataset_handle))
+    dataset_store.save_attachment(dataset_handle, SKETCH_ATTACHMENT, sketch.to_dict())
+    return sketch
+
+def _is_warm_up_request():
+    """Check if the request is a warm-up replay sent by the cache service with the shared WARMUP_TOKEN"""
+    token = os.getenv('WARMUP_TOKEN')
+    if not token:
+        return False
+    return hmac.compare_digest(request.headers.get('X-Warm-Up-Token', '').encode(), token.encode())
+
+def _with_configured_credentials(connector_type, params):
+    """
+    Fill in the credentials of a source from the service's own configuration
+    
+    DATA_SOURCE_CREDENTIALS_FILE names a JSON file listing connector params
+    ({"type", "host", "port", "database", "username", "password"}); params
+    for a listed source that carry no credentials are given them. Only used
+    for warm-up replays, which carry no credentials of their own.
+    """
+    credentials_file = os.getenv('DATA_SOURCE_CREDENTIALS_FILE')
+    if (not credentials_file or connector_type.lower() in FILE_CONNECTORS
+            or any(key in params for key in CREDENTIAL_PARAMS)):
+        return params
+    try:
+        with open(credentials_file) as f:
+            sources = json.load(f)
+    except Exception as e:
+        print(f"Error reading data source credentials: {e}")
+        return params
+    wanted = source_id(connector_type, params)
+    for source in sources:
+        if source_id(source.get('type', ''), source) == wanted:
+            return {**params, **{key: source[key] for key in CREDENTIAL_PARAMS if key in source}}
+    return params
+
 # Data connector endpoint
 @app.route('/api/connect', methods=['POST'])
 def connect_to_data_source():
@@ -60,30 +163,37 @@ def connect_to_data_source():
     try:
         connector_type = config['type']
         connector_params = config.get('params', {})
+        if _is_warm_up_request():
+            connector_params = _with_configured_credentials(connector_type, connector_params)
         
         # Get cache service URL from environment
         cache_service_url = os.getenv('CACHE_SERVICE_URL', 'http://cache-service:5005')
         
-        # Generate cache key based on config
-        cache_key_data = {
-            "type": connector_type,
-            "params": connector_params,
-            "query": config.get('query', '')
-        }
-        cache_key = hashlib.md5(json.dumps(cache_key_data, sort_keys=True).encode()).hexdigest()
-        cache_key = f"data_connector:{cache_key}"
+        # Generate cache key from the normalised query
+        cache_key = build_cache_key(connector_type, connector_params, config.get('query', ''))
+        stream = _wants_stream(config)
+        include_data = config.get('include_data', True)
         
         # Try to get data from cache first
         try:
             cache_response = requests.get(f"{cache_service_url}/api/cache/{cache_key}", timeout=5)
             if cache_response.status_code == 200:
                 cached_data = cache_response.json()
-                return jsonify({
+                if stream:
+                    return Response(
+                        _ndjson_lines(cached_data['value']['data']),
+                        mimetype=NDJSON_MIMETYPE,
+                        headers={"X-Cache": "HIT"}
+                    )
+                response = {
                     "success": True,
-                    "data": cached_data['value']['data'],
                     "rowCount": cached_data['value']['rowCount'],
+                    "datasetHandle": cached_data['value'].get('datasetHandle'),
                     "cached": True
-                })
+                }
+                if include_data:
+                    response["data"] = cached_data['value']['data']
+                return jsonify(response)
         except Exception as cache_error:
             # Cache service unavailable, continue with normal flow
             pass
@@ -95,46 +205,574 @@ def connect_to_data_source():
         if not connector.connect():
             return jsonify({"error": "Failed to connect to data source"}), 500
         
-        # Fetch data if query is provided
         query = config.get('query')
-        if query:
-            data = connector.fetch_data(query)
+        
+        # Streamed responses are serialised batch by batch and are not
+        # cached, since caching would require the full result in memory
+        if stream:
+            if not query and connector_type.lower() != 'csv':
+                connector.disconnect()
+                return Response("", mimetype=NDJSON_MIMETYPE, headers={"X-Cache": "MISS"})
+            batch_size = int(config.get('batch_size', DEFAULT_BATCH_SIZE))
+            return Response(
+                stream_with_context(_stream_connector(connector, query, batch_size)),
+                mimetype=NDJSON_MIMETYPE,
+                headers={"X-Cache": "MISS"}
+            )
+        
+        # Fetch data if query is provided (for CSV, fetch all data), keeping
+        # within the request's memory budget
+        try:
+            budget = FetchBudget.from_config(config)
+            batch_size = int(config.get('batch_size', DEFAULT_BATCH_SIZE))
+        except ValueError as e:
+            connector.disconnect()
+            return jsonify({"error": str(e)}), 400
+        
+        rollup_name = config.get('rollup')
+        if rollup_name and rollup_name not in rollup_manager.rollups:
+            print(f"Rollup {rollup_name} is not declared, skipping ingest")
+            rollup_name = None
+        sketch = DatasetSketch()
+        
+        try:
+            batches = connector.fetch_batches(query, batch_size) if query or connector_type.lower() == 'csv' else []
+            # The column sketches are built batch by batch as the rows arrive
+            result = fetch_bounded(batches, budget, dataset_store, sketch.update)
+        except ResultTooLarge as e:
+            return jsonify({"error": str(e)}), 413
+        finally:
+            # Close connection
+            connector.disconnect()
+        
+        if result.spilled:
+            dataset_handle = result.dataset_handle
+            dataset_store.save_attachment(dataset_handle, SKETCH_ATTACHMENT, sketch.to_dict())
         else:
-            # For CSV, fetch all data
-            if connector_type.lower() == 'csv':
-                data = connector.fetch_data()
-            else:
-                data = []
+            # Save the dataset once so other services can read it by handle
+            dataset_handle = _store_dataset(result.data, sketch)
         
-        # Close connection
-        connector.disconnect()
+        # Rollup cubes only see complete results, so a fetch that is aborted
+        # over its budget leaves them untouched. The result replaces what this
+        # query contributed before, so refetching it on a cache miss or a
+        # warm-up does not count its rows again.
+        if rollup_name:
+            rows = dataset_store.iter_batches(dataset_handle, batch_size) if result.spilled else [result.data]
+            rollup_manager.ingest(rollup_name, rows, source=cache_key, version=dataset_handle)
+        
+        # Spilled results are already in the dataset store; they are too large
+        # to cache, so the caller pages through them by handle instead
+        if result.spilled:
+            page_size = int(config.get('page_size', 1000))
+            response = {
+                "success": True,
+                "rowCount": result.row_count,
+                "datasetHandle": dataset_handle,
+                "cached": False,
+                "spilled": True
+            }
+            if include_data:
+                response["data"] = dataset_store.get_records(dataset_handle, 0, page_size)
+                if page_size < result.row_count:
+                    response["nextOffset"] = page_size
+            return jsonify(response)
+        
+        data = result.data
         
         # Cache the result for 5 minutes
         try:
             cache_data = {
                 "data": data,
-                "rowCount": len(data)
+                "rowCount": len(data),
+                "datasetHandle": dataset_handle
             }
             cache_request = {
                 "key": cache_key,
                 "value": cache_data,
-                "ttl": 300  # 5 minutes
+                "ttl": 300,  # 5 minutes
+                # Tag with the tables read so a table reload invalidates this entry
+                "tags": build_cache_tags(connector_type, connector_params, query)
             }
+            # Lets the cache service rerun this request to warm the entry. Replays
+            # carry no credentials and are connected with the configured ones, so
+            # a recipe is only kept when the replay computes this same key
+            replay_params = without_credentials(connector_params)
+            replay_key = build_cache_key(connector_type, _with_configured_credentials(connector_type, replay_params),
+                                         config.get('query', ''))
+            if replay_key == cache_key:
+                cache_request["recipe"] = {
+                    "producer": "data-processing",
+                    "path": "/api/connect",
+                    "body": {
+                        # Rollups are not fed twice by a replay
+                        **{key: value for key, value in config.items() if key != 'rollup'},
+                        "params": replay_params,
+                        "include_data": False
+                    }
+                }
             requests.post(f"{cache_service_url}/api/cache", json=cache_request, timeout=5)
         except Exception as cache_error:
             # Cache service unavailable, but we still return the data
             pass
         
-        return jsonify({
+        response = {
             "success": True,
-            "data": data,
             "rowCount": len(data),
+            "datasetHandle": dataset_handle,
             "cached": False
-        })
+        }
+        if include_data:
+            response["data"] = data
+        return jsonify(response)
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Store dataset endpoint
+@app.route('/api/datasets', methods=['POST'])
+def store_dataset():
+    payload = request.get_json()
+    records = payload.get('data') if isinstance(payload, dict) else payload
+    
+    if not isinstance(records, list) or not records:
+        return jsonify({"error": "A non-empty list of records is required"}), 400
+    
+    dataset_handle = _store_dataset(records)
+    if dataset_handle is None:
+        return jsonify({"error": "Failed to store dataset"}), 500
+    return jsonify({"datasetHandle": dataset_handle, "rowCount": len(records)}), 201
+
+# Read dataset endpoint
+@app.route('/api/datasets/<handle>', methods=['GET'])
+def get_dataset(handle):
+    if not dataset_store.exists(handle):
+        return jsonify({"error": "Dataset not found"}), 404
+    
+    try:
+        offset = int(request.args.get('offset', 0))
+        limit = request.args.get('limit')
+        limit = int(limit) if limit is not None else None
+        if offset < 0 or (limit is not None and limit < 0):
+            return jsonify({"error": "offset and limit must not be negative"}), 400
+        info = dataset_store.info(handle)
+        info["data"] = dataset_store.get_records(handle, offset, limit)
+        if offset + len(info["data"]) < info["rowCount"]:
+            info["nextOffset"] = offset + len(info["data"])
+        return jsonify(info)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Failed to read dataset: {str(e)}"}), 500
+
+# Dataset metadata endpoint
+@app.route('/api/datasets/<handle>/info', methods=['GET'])
+def get_dataset_info(handle):
+    if not dataset_store.exists(handle):
+        return jsonify({"error": "Dataset not found"}), 404
+    return jsonify(dataset_store.info(handle))
+
+# Dataset profile endpoint, answered from the stored column sketches
+@app.route('/api/datasets/<handle>/profile', methods=['GET'])
+def get_dataset_profile(handle):
+    if not dataset_store.exists(handle):
+        return jsonify({"error": "Dataset not found"}), 404
+    
+    try:
+        top_k = int(request.args.get('top_k', 10))
+        profile = _load_sketch(handle).profile(top_k)
+        profile["datasetHandle"] = handle
+        profile["approximate"] = True
+        return jsonify(profile)
+    except Exception as e:
+        return jsonify({"error": f"Failed to profile dataset: {str(e)}"}), 500
+
+# Column distinct values endpoint for filter dropdowns
+@app.route('/api/datasets/<handle>/columns/<column>/values', methods=['GET'])
+def get_column_values(handle, column):
+    if not dataset_store.exists(handle):
+        return jsonify({"error": "Dataset not found"}), 404
+    
+    try:
+        sketch = _load_sketch(handle)
+        if column not in sketch.columns:
+            return jsonify({"error": "Column not found"}), 404
+        top_k = int(request.args.get('top_k', 50))
+        column_sketch = sketch.columns[column]
+        return jsonify({
+            "column": column,
+            "distinctCount": column_sketch.distinct.estimate(),
+            "values": column_sketch.frequent.top(top_k)
+        })
+    except Exception as e:
+        return jsonify({"error": f"Failed to read column values: {str(e)}"}), 500
+
+def _source_batches(config, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Iterate over record batches of a stored dataset or a connector source
+    
+    The request either names a "dataset_handle" or describes a connector
+    with "source": {"type": ..., "params": {...}, "query": ...}.
+    """
+    dataset_handle = config.get('dataset_handle')
+    if dataset_handle:
+        yield from dataset_store.iter_batches(dataset_handle, batch_size)
+        return
+    
+    source = config.get('source')
+    if not source or 'type' not in source:
+        raise ValueError("Either dataset_handle or source with a connector type is required")
+    
+    connector = create_connector(source['type'], **source.get('params', {}))
+    if not connector.connect():
+        raise Exception("Failed to connect to data source")
+    try:
+        yield from connector.fetch_batches(source.get('query'), batch_size)
+    finally:
+        connector.disconnect()
+
+def _rollup_source(config):
+    """
+    Identify the rows a rollup ingest reads as (source, version)
+    
+    Ingesting a source again replaces its rows in the rollup instead of
+    adding them; connector sources get the same id as in /api/connect.
+    """
+    dataset_handle = config.get('dataset_handle')
+    if dataset_handle:
+        return dataset_handle, dataset_handle
+    source = config.get('source') or {}
+    return build_cache_key(source.get('type', ''), source.get('params', {}), source.get('query', '')), None
+
+# Sampling endpoint
+@app.route('/api/sample', methods=['POST'])
+def sample_data():
+    config = request.get_json() or {}
+    method = config.get('method', 'reservoir')
+    
+    try:
+        size = int(config.get('size', 1000))
+        seed = config.get('seed')
+        max_groups = int(config.get('max_groups', DEFAULT_MAX_GROUPS))
+        batches = _source_batches(config)
+        
+        if method == 'reservoir':
+            result = reservoir_sample(batches, size, seed)
+        elif method == 'stratified':
+            result = stratified_sample(batches, config.get('key_columns', []), size, seed, max_groups)
+        elif method == 'time_bucket':
+            if not config.get('time_column'):
+                return jsonify({"error": "time_column is required for time_bucket sampling"}), 400
+            result = time_bucket_sample(batches, config['time_column'], size, config.get('bucket', 'day'), seed, max_groups)
+        else:
+            return jsonify({
+                "error": "Invalid method. Available methods: ['reservoir', 'stratified', 'time_bucket']"
+            }), 400
+        
+        result["method"] = method
+        result["rowCount"] = len(result["data"])
+        return jsonify(result)
+    except KeyError as e:
+        return jsonify({"error": f"Dataset not found: {str(e)}"}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Sampling failed: {str(e)}"}), 500
+
+
+# Declare rollup cubes endpoint
+@app.route('/api/rollups', methods=['POST'])
+def declare_rollup():
+    config = request.get_json() or {}
+    name = config.get('name')
+    
+    if not name:
+        return jsonify({"error": "Rollup name is required"}), 400
+    
+    try:
+        rollup_manager.declare(name, config.get('cubes', []))
+        # Build the cubes from existing data when a source is given
+        if config.get('dataset_handle') or config.get('source'):
+            source, version = _rollup_source(config)
+            rollup_manager.ingest(name, _source_batches(config), source, version)
+        return jsonify(rollup_manager.describe(name)), 201
+    except KeyError as e:
+        return jsonify({"error": f"Dataset not found: {str(e)}"}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Failed to build rollup: {str(e)}"}), 500
+
+# Get rollup endpoint
+@app.route('/api/rollups/<name>', methods=['GET'])
+def get_rollup(name):
+    try:
+        return jsonify(rollup_manager.describe(name))
+    except KeyError:
+        return jsonify({"error": "Rollup not found"}), 404
+
+# Incremental rollup ingest endpoint
+@app.route('/api/rollups/<name>/rows', methods=['POST'])
+def ingest_rollup_rows(name):
+    payload = request.get_json() or {}
+    
+    try:
+        if isinstance(payload, list):
+            ingested = rollup_manager.ingest(name, [payload])
+        elif 'data' in payload:
+            ingested = rollup_manager.ingest(name, [payload['data']])
+        else:
+            source, version = _rollup_source(payload)
+            ingested = rollup_manager.ingest(name, _source_batches(payload), source, version)
+        return jsonify({"name": name, "ingested": ingested})
+    except KeyError as e:
+        return jsonify({"error": f"Rollup or dataset not found: {str(e)}"}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Rollup ingest failed: {str(e)}"}), 500
+
+# Aggregation endpoint
+@app.route('/api/aggregate', methods=['POST'])
+def aggregate_data():
+    config = request.get_json() or {}
+    group_by = config.get('group_by', [])
+    measures = config.get('measures', {})
+    filters = config.get('filters', {})
+    
+    try:
+        # Answer from the smallest covering rollup cube when possible
+        if config.get('rollup'):
+            result = rollup_manager.query(config['rollup'], group_by, measures, filters)
+            if result is not None:
+                result["rowCount"] = len(result["data"])
+                return jsonify(result)
+            if not (config.get('dataset_handle') or config.get('source')):
+                return jsonify({"error": "No rollup cube covers this query"}), 400
+        
+        data = aggregate_batches(_source_batches(config), group_by, measures, filters)
+        return jsonify({"data": data, "rowCount": len(data), "servedBy": "scan"})
+    except KeyError as e:
+        return jsonify({"error": f"Rollup or dataset not found: {str(e)}"}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Aggregation failed: {str(e)}"}), 500
+
+# Invalidate cached results that depend on tables of a data source
+@app.route('/api/invalidate', methods=['POST'])
+def invalidate_cached_results():
+    config = request.get_json() or {}
+    
+    if 'type' not in config:
+        return jsonify({"error": "Missing connector type in request"}), 400
+    
+    connector_type = config['type']
+    connector_params = config.get('params', {})
+    tables = config.get('tables', [])
+    
+    # Without tables, every cached result of a file source is dropped
+    if tables:
+        tags = [table_tag(connector_type, connector_params, table) for table in tables]
+    else:
+        tags = [f"source:{source_id(connector_type, connector_params)}"]
+    
+    try:
+        invalidated = _invalidate_cache_tags(tags)
+    except Exception as e:
+        return jsonify({"error": f"Cache service unavailable: {str(e)}"}), 503
+    
+    return jsonify({"invalidated": invalidated})
+
+def _invalidate_cache_tags(tags):
+    """Drop every cached result carrying one of the tags, returning tag -> success"""
+    cache_service_url = os.getenv('CACHE_SERVICE_URL', 'http://cache-service:5005')
+    invalidated = {}
+    for tag in tags:
+        response = requests.delete(f"{cache_service_url}/api/cache/invalidate-tag/{tag}", timeout=5)
+        invalidated[tag] = response.status_code == 200
+    return invalidated
+
+def _export_file_path(file_path):
+    """
+    Resolve a file export target inside EXPORT_DIR
+    
+    Relative paths are taken relative to EXPORT_DIR; symlinks and '..' are
+    resolved first, so a target cannot name or reach a file outside it.
+    
+    Raises:
+        ValueError: If the path is missing or resolves outside EXPORT_DIR
+    """
+    if not file_path or not isinstance(file_path, str):
+        raise ValueError("A target file_path is required")
+    export_dir = os.path.realpath(os.getenv('EXPORT_DIR', '/data/exports'))
+    resolved = os.path.realpath(os.path.join(export_dir, file_path))
+    if os.path.commonpath([export_dir, resolved]) != export_dir or resolved == export_dir:
+        raise ValueError("Export files must be written inside the export directory")
+    return resolved
+
+# Bulk export endpoint: write a stored dataset or connector result to a target
+@app.route('/api/export', methods=['POST'])
+def export_data():
+    config = request.get_json() or {}
+    target = config.get('target')
+    
+    if not target or 'type' not in target:
+        return jsonify({"error": "Missing target connector type in request"}), 400
+    
+    try:
+        batch_size = int(config.get('batch_size', DEFAULT_BATCH_SIZE))
+        commit_interval = config.get('commit_interval')
+        commit_interval = int(commit_interval) if commit_interval else None
+        if batch_size <= 0:
+            return jsonify({"error": "batch_size must be positive"}), 400
+        
+        target_type = target['type']
+        target_params = target.get('params', {})
+        if target_type.lower() in FILE_CONNECTORS:
+            target_params = {**target_params, 'file_path': _export_file_path(target_params.get('file_path'))}
+        connector = create_connector(target_type, **target_params)
+        if type(connector).write_batches is DataConnector.write_batches:
+            return jsonify({"error": f"Writing is not supported for {target_type} targets"}), 400
+        if not connector.connect_for_write():
+            return jsonify({"error": "Failed to connect to export target"}), 500
+        try:
+            rows_written = connector.write_batches(_source_batches(config, batch_size), target, batch_size, commit_interval)
+        finally:
+            connector.disconnect()
+        
+        # Results read from the target before this export are now stale
+        if target.get('table') or target.get('collection'):
+            tags = [table_tag(target_type, target_params, target.get('table') or target['collection'])]
+        else:
+            tags = [f"source:{source_id(target_type, target_params)}"]
+        try:
+            _invalidate_cache_tags(tags)
+        except Exception as cache_error:
+            # Cache service unavailable, cached reads expire with their TTL
+            pass
+        
+        return jsonify({"success": True, "rowsWritten": rows_written})
+    except NotImplementedError as e:
+        return jsonify({"error": str(e)}), 400
+    except KeyError as e:
+        return jsonify({"error": f"Dataset not found: {str(e)}"}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Export failed: {str(e)}"}), 500
+
+def _downsample_series(x_values, y_values, points, method):
+    """Downsample one series, returning (x, y) lists ready for JSON"""
+    is_datetime = pd.api.types.is_datetime64_any_dtype(x_values)
+    # Timezone-aware times are downsampled in UTC and returned with their offset
+    timezone = x_values.dt.tz if is_datetime else None
+    if is_datetime:
+        x_naive = x_values.dt.tz_convert(None) if timezone is not None else x_values
+        x_numeric = x_naive.astype('datetime64[ns]').astype('int64').astype(float)
+    else:
+        x_numeric = x_values.astype(float)
+    x_array = x_numeric.to_numpy()
+    y_array = y_values.astype(float).to_numpy()
+    
+    def format_times(times):
+        if timezone is not None:
+            return [time.isoformat(timespec='seconds') if pd.notna(time) else None for time in times]
+        return list(pd.DatetimeIndex(times).strftime('%Y-%m-%dT%H:%M:%S'))
+    
+    if method == 'average':
+        x_out, y_out = downsampling.average(x_array, y_array, points)
+        if is_datetime:
+            times = pd.to_datetime(x_out.astype('int64'))
+            if timezone is not None:
+                times = times.tz_localize('UTC').tz_convert(timezone)
+            x_out = format_times(times)
+        return list(x_out), y_out.tolist()
+    
+    if method == 'lttb':
+        keep = downsampling.lttb(x_array, y_array, points)
+    else:
+        keep = downsampling.minmax(x_array, y_array, points)
+    x_kept = x_values.iloc[keep]
+    if is_datetime:
+        return format_times(x_kept), y_array[keep].tolist()
+    return x_kept.tolist(), y_array[keep].tolist()
+
+# Chart series downsampling endpoint
+@app.route('/api/downsample', methods=['POST'])
+def downsample_series():
+    config = request.get_json() or {}
+    dataset_handle = config.get('dataset_handle')
+    x_column = config.get('x')
+    y_columns = config.get('y')
+    method = config.get('method', 'lttb')
+    
+    if not dataset_handle or not x_column or not y_columns:
+        return jsonify({"error": "dataset_handle, x and y are required"}), 400
+    if method not in downsampling.METHODS:
+        return jsonify({"error": f"Invalid method. Available methods: {downsampling.METHODS}"}), 400
+    if isinstance(y_columns, str):
+        y_columns = [y_columns]
+    if not dataset_store.exists(dataset_handle):
+        return jsonify({"error": "Dataset not found"}), 404
+    
+    try:
+        points = int(config.get('points', 2000))
+        table = dataset_store.open_table(dataset_handle)
+        missing = [column for column in [x_column] + y_columns if column not in table.column_names]
+        if missing:
+            return jsonify({"error": f"Columns not found: {missing}"}), 400
+        
+        df = table.select(list(dict.fromkeys([x_column] + y_columns))).to_pandas()
+        x_dtype = df[x_column].dtype
+        if not (pd.api.types.is_numeric_dtype(x_dtype) or pd.api.types.is_datetime64_any_dtype(x_dtype)):
+            df[x_column] = pd.to_datetime(df[x_column], format='mixed', errors='coerce')
+        if not df[x_column].is_monotonic_increasing:
+            df = df.sort_values(x_column, kind='stable')
+        
+        series = {}
+        for y_column in y_columns:
+            y_values = pd.to_numeric(df[y_column], errors='coerce')
+            valid = df[x_column].notna() & y_values.notna()
+            x_out, y_out = _downsample_series(df[x_column][valid], y_values[valid], points, method)
+            series[y_column] = [{x_column: x, y_column: y} for x, y in zip(x_out, y_out)]
+        
+        return jsonify({
+            "method": method,
+            "sourcePoints": table.num_rows,
+            "series": series
+        })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Downsampling failed: {str(e)}"}), 500
+
+# Source metadata endpoint: row counts and column min/max/null counts without a scan
+@app.route('/api/metadata', methods=['POST'])
+def get_source_metadata():
+    config = request.get_json() or {}
+    
+    if 'type' not in config:
+        return jsonify({"error": "Missing connector type in request"}), 400
+    
+    try:
+        connector = create_connector(config['type'], **config.get('params', {}))
+        if not hasattr(connector, 'fetch_metadata'):
+            return jsonify({"error": f"Metadata queries are not supported for {config['type']} sources"}), 400
+        if not connector.connect():
+            return jsonify({"error": "Failed to connect to data source"}), 500
+        
+        try:
+            metadata = connector.fetch_metadata(config.get('columns'), config.get('query'))
+        finally:
+            connector.disconnect()
+        return jsonify(metadata)
+    except KeyError as e:
+        return jsonify({"error": str(e.args[0]) if e.args else str(e)}), 400
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Failed to read metadata: {str(e)}"}), 500
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5002))
     app.run(host='0.0.0.0', port=port, debug=True)
\ No newline at end of file
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Throughput and memory benchmark for data connectors
+
+Generates deterministic fixtures in every supported file format, reads them
+through each connector and read mode in a fresh process, and records rows/s,
+bytes/s, peak RSS and time to first batch as JSON. Passing a baseline file
+compares the run against it and exits non-zero on regressions.
+
+Usage:
+    python benchmark_connectors.py --sizes 10k,1m --output bench_results.json
+    python benchmark_connectors.py --sizes 10k --baseline bench_baseline.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import sqlite3
+import tempfile
+import multiprocessing
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from data_connectors import create_connector, DEFAULT_BATCH_SIZE
+
+FORMATS = ["csv", "json", "ndjson", "parquet", "avro", "excel", "sqlite"]
+READ_MODES = ["fetch_data", "fetch_batches"]
+SIZE_SUFFIXES = {"k": 1000, "m": 1000000}
+# Rows generated per chunk so fixture generation itself stays memory-bounded
+GENERATION_CHUNK = 100000
+# Excel worksheets cannot hold more rows than this
+EXCEL_MAX_ROWS = 1048575
+SQLITE_TABLE = "bench"
+
+def parse_size(text: str) -> int:
+    """Parse sizes such as 10k, 1m or 2500"""
+    text = text.strip().lower()
+    if text[-1:] in SIZE_SUFFIXES:
+        return int(float(text[:-1]) * SIZE_SUFFIXES[text[-1]])
+    return int(text)
+
+def generate_chunk(start: int, rows: int, seed: int) -> pd.DataFrame:
+    """Generate one deterministic chunk of benchmark rows"""
+    rng = np.random.default_rng([seed, start])
+    ids = np.arange(start, start + rows)
+    return pd.DataFrame({
+        "id": ids,
+        "date": (np.datetime64("2020-01-01") + (ids % 1826).astype("timedelta64[D]")).astype(str),
+        "category": np.array(["Revenue", "Expense", "Refund", "Transfer", "Fee"])[rng.integers(0, 5, rows)],
+        "region": np.array(["North America", "Europe", "Asia", "South America", "Africa"])[rng.integers(0, 5, rows)],
+        "amount": np.round(rng.normal(1000, 250, rows), 2),
+        "quantity": rng.integers(1, 100, rows),
+        "note": np.char.add("note-", (ids % 997).astype(str))
+    })
+
+def iter_chunks(rows: int, seed: int):
+    """Yield fixture chunks covering `rows` rows"""
+    for start in range(0, rows, GENERATION_CHUNK):
+        yield generate_chunk(start, min(GENERATION_CHUNK, rows - start), seed)
+
+def generate_fixture(fmt: str, rows: int, directory: str, seed: int) -> Optional[str]:
+    """
+    Write a fixture file, reusing it if it already exists
+    
+    Returns:
+        Path of the fixture, or None if the format cannot hold that many rows
+    """
+    extension = {"excel": "xlsx", "sqlite": "db"}.get(fmt, fmt)
+    path = os.path.join(directory, f"bench_{rows}_{seed}.{extension}")
+    if os.path.exists(path):
+        return path
+    if fmt == "excel" and rows > EXCEL_MAX_ROWS:
+        return None
+    
+    # Keep the extension on the temporary file; some writers pick their format from it
+    tmp_path = os.path.join(directory, f"partial_{os.path.basename(path)}")
+    # The CSV and SQLite writers append, so a file left by an interrupted run must go first
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    if fmt == "csv":
+        for i, chunk in enumerate(iter_chunks(rows, seed)):
+            chunk.to_csv(tmp_path, mode="a", header=(i == 0), index=False)
+    elif fmt == "ndjson":
+        with open(tmp_path, "w") as f:
+            for chunk in iter_chunks(rows, seed):
+                f.write(chunk.to_json(orient="records", lines=True))
+    elif fmt == "json":
+        with open(tmp_path, "w") as f:
+            f.write("[")
+            for i, chunk in enumerate(iter_chunks(rows, seed)):
+                body = chunk.to_json(orient="records")[1:-1]
+                if body:
+                    f.write(("," if i else "") + body)
+            f.write("]")
+    elif fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        writer = None
+        for chunk in iter_chunks(rows, seed):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema)
+            writer.write_table(table)
+        if writer is not None:
+            writer.close()
+    elif fmt == "avro":
+        import avro.schema
+        import avro.io
+        import avro.datafile
+        schema = avro.schema.parse(json.dumps({
+            "type": "record",
+            "name": "Bench",
+            "fields": [
+                {"name": "id", "type": "long"},
+                {"name": "date", "type": "string"},
+                {"name": "category", "type": "string"},
+                {"name": "region", "type": "string"},
+                {"name": "amount", "type": "double"},
+                {"name": "quantity", "type": "long"},
+                {"name": "note", "type": "string"}
+            ]
+        }))
+        with open(tmp_path, "wb") as f:
+            writer = avro.datafile.DataFileWriter(f, avro.io.DatumWriter(), schema)
+            for chunk in iter_chunks(rows, seed):
+                for record in chunk.to_dict("records"):
+                    writer.append(record)
+            writer.close()
+    elif fmt == "excel":
+        pd.concat(iter_chunks(rows, seed)).to_excel(tmp_path, index=False, sheet_name="Sheet1", engine="openpyxl")
+    elif fmt == "sqlite":
+        connection = sqlite3.connect(tmp_path)
+        for chunk in iter_chunks(rows, seed):
+            chunk.to_sql(SQLITE_TABLE, connection, if_exists="append", index=False)
+        connection.close()
+    else:
+        raise ValueError(f"Unknown fixture format: {fmt}")
+    
+    os.replace(tmp_path, path)
+    return path
+
+def connector_config(fmt: str, path: str) -> Dict[str, Any]:
+    """Connector type, parameters and query used to read a fixture"""
+    if fmt == "sqlite":
+        return {"type": "sqlite", "params": {"file_path": path}, "query": f"SELECT * FROM {SQLITE_TABLE}"}
+    return {"type": fmt, "params": {"file_path": path}, "query": None}
+
+def _reset_peak_rss() -> bool:
+    """
+    Reset this process's peak RSS (VmHWM) to its current RSS
+    
+    A spawned process inherits the peak RSS of the process that started it,
+    since Linux keeps it across fork and exec. Writing 5 to clear_refs
+    (Linux 4.0+) resets it.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def _rss_bytes(field: str) -> Optional[int]:
+    """Read VmRSS or VmHWM of this process from /proc, or None where it is not available"""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+def _measure(config: Dict[str, Any], mode: str, batch_size: int, queue) -> None:
+    """Read a fixture once in this (fresh) process and report timings and peak RSS"""
+    try:
+        # The modules are imported by now, so the baseline covers the interpreter
+        # and libraries and the increase is what the read itself needed
+        exact_peak = _reset_peak_rss()
+        baseline = _rss_bytes("VmRSS") if exact_peak else None
+        connector = create_connector(config["type"], **config["params"])
+        start = time.perf_counter()
+        if not connector.connect():
+            raise Exception("Failed to connect to fixture")
+        first_batch = None
+        rows = 0
+        if mode == "fetch_data":
+            rows = len(connector.fetch_data(config["query"]))
+            first_batch = time.perf_counter() - start
+        else:
+            for batch in connector.fetch_batches(config["query"], batch_size):
+                if first_batch is None:
+                    first_batch = time.perf_counter() - start
+                rows += len(batch)
+        connector.disconnect()
+        elapsed = time.perf_counter() - start
+        if exact_peak:
+            peak_bytes = _rss_bytes("VmHWM")
+        else:
+            # Elsewhere fall back to ru_maxrss (kilobytes on Linux, bytes on
+            # macOS), which may include the parent's peak
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            peak_bytes = peak if sys.platform == "darwin" else peak * 1024
+        queue.put({
+            "rows": rows,
+            "seconds": elapsed,
+            "time_to_first_batch_s": first_batch,
+            "peak_rss_bytes": peak_bytes,
+            "rss_increase_bytes": peak_bytes - baseline if baseline is not None else None,
+            "peak_rss_exact": exact_peak
+        })
+    except ImportError as e:
+        queue.put({"skipped": f"dependency missing: {e}"})
+    except ValueError as e:
+        queue.put({"skipped": str(e)})
+    except Exception as e:
+        queue.put({"error": str(e)})
+
+def run_benchmark(fmt: str, path: str, mode: str, batch_size: int, timeout: int) -> Dict[str, Any]:
+    """Run one measurement in a spawned process so the memory of earlier runs is not counted"""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_measure, args=(connector_config(fmt, path), mode, batch_size, queue))
+    process.start()
+    process.join(timeout)
+    if process.is_alive():
+        process.terminate()
+        return {"error": f"timed out after {timeout}s"}
+    if queue.empty():
+        return {"error": f"benchmark process exited with code {process.exitcode}"}
+    return queue.get()
+
+def result_key(result: Dict[str, Any]) -> str:
+    """Identify a measurement across runs"""
+    return f"{result['format']}/{result['size']}/{result['mode']}"
+
+def compare_with_baseline(results: List[Dict[str, Any]], baseline_path: str, tolerance: float) -> List[str]:
+    """
+    Compare results against a previous run
+    
+    Returns:
+        Human readable descriptions of every regression beyond the tolerance
+    """
+    with open(baseline_path, "r") as f:
+        baseline = {result_key(result): result for result in json.load(f)["results"]}
+    
+    regressions = []
+    for result in results:
+        previous = baseline.get(result_key(result))
+        if not previous or "rows_per_s" not in result or "rows_per_s" not in previous:
+            continue
+        if result["rows_per_s"] < previous["rows_per_s"] * (1 - tolerance):
+            regressions.append(
+                f"{result_key(result)}: throughput {result['rows_per_s']:.0f} rows/s vs {previous['rows_per_s']:.0f} baseline"
+            )
+        if result["peak_rss_bytes"] > previous["peak_rss_bytes"] * (1 + tolerance):
+            regressions.append(
+                f"{result_key(result)}: peak RSS {result['peak_rss_bytes'] / 2**20:.1f} MiB vs {previous['peak_rss_bytes'] / 2**20:.1f} MiB baseline"
+            )
+    return regressions
+
+def main():
+    """Main benchmark function"""
+    parser = argparse.ArgumentParser(description="Benchmark data connector throughput and memory")
+    parser.add_argument("--sizes", default="10k", help="Comma separated row counts, e.g. 10k,1m,10m")
+    parser.add_argument("--formats", default=",".join(FORMATS), help="Comma separated fixture formats")
+    parser.add_argument("--modes", default=",".join(READ_MODES), help="Comma separated read modes")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--fixtures-dir", default=os.path.join(tempfile.gettempdir(), "vibe-bench-fixtures"))
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="Previous results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression (0.2 = 20%%)")
+    parser.add_argument("--timeout", type=int, default=3600, help="Per-measurement timeout in seconds")
+    args = parser.parse_args()
+    
+    os.makedirs(args.fixtures_dir, exist_ok=True)
+    sizes = [parse_size(size) for size in args.sizes.split(",")]
+    formats = [fmt.strip() for fmt in args.formats.split(",")]
+    modes = [mode.strip() for mode in args.modes.split(",")]
+    
+    print("Data Connector Benchmark")
+    print("=" * 24)
+    
+    results = []
+    for rows in sizes:
+        for fmt in formats:
+            print(f"\nGenerating {fmt} fixture with {rows} rows...")
+            try:
+                path = generate_fixture(fmt, rows, args.fixtures_dir, args.seed)
+            except ImportError as e:
+                print(f"⚠ Skipping {fmt}: {e}")
+                continue
+            if path is None:
+                print(f"⚠ Skipping {fmt}: format cannot hold {rows} rows")
+                continue
+            file_bytes = os.path.getsize(path)
+            
+            for mode in modes:
+                measurement = run_benchmark(fmt, path, mode, args.batch_size, args.timeout)
+                result = {"format": fmt, "size": rows, "mode": mode, "file_bytes": file_bytes}
+                result.update(measurement)
+                if "seconds" in measurement:
+                    seconds = max(measurement["seconds"], 1e-9)
+                    result["rows_per_s"] = measurement["rows"] / seconds
+                    result["bytes_per_s"] = file_bytes / seconds
+                    print(f"✓ {fmt:8} {mode:14} {result['rows_per_s']:>12.0f} rows/s "
+                          f"{result['bytes_per_s'] / 2**20:>8.1f} MiB/s "
+                          f"first batch {measurement['time_to_first_batch_s'] or 0:.3f}s "
+                          f"peak RSS {measurement['peak_rss_bytes'] / 2**20:.1f} MiB"
+                          + (f" (+{measurement['rss_increase_bytes'] / 2**20:.1f} MiB)"
+                             if measurement['rss_increase_bytes'] is not None else ""))
+                elif "skipped" in measurement:
+                    print(f"⚠ {fmt:8} {mode:14} skipped: {measurement['skipped']}")
+                else:
+                    print(f"✗ {fmt:8} {mode:14} failed: {measurement['error']}")
+                results.append(result)
+    
+    report = {
+        "generated_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "batch_size": args.batch_size,
+        "seed": args.seed,
+        "results": results
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+    
+    if args.baseline:
+        regressions = compare_with_baseline(results, args.baseline, args.tolerance)
+        if regressions:
+            print("\n✗ Regressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("\n✓ No regressions against baseline")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Transparent decompression for file connectors
+
+Compressed sources are recognised by their magic bytes rather than their
+extension and decompressed while they are read, so .csv.gz, .json.zst or
+.ndjson.bz2 deliveries never have to be unpacked to disk. Decompression runs
+on a background thread that stays a few chunks ahead of the parser; zlib,
+bz2 and zstd all release the GIL, so decompressing and parsing overlap.
+"""
+import io
+import os
+import bz2
+import gzip
+import lzma
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Optional, BinaryIO, TextIO, Iterator, Union
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+MAGIC_BYTES = {
+    "gzip": b"\x1f\x8b",
+    "zstd": b"\x28\xb5\x2f\xfd",
+    "bz2": b"BZh",
+    "xz": b"\xfd7zXZ\x00"
+}
+
+# File name suffixes of compressed files, stripped to find the underlying format
+COMPRESSION_SUFFIXES = (".gz", ".gzip", ".zst", ".zstd", ".bz2", ".xz")
+
+# Decompressed bytes per chunk, and chunks decompressed ahead of the reader
+CHUNK_SIZE = 1024 * 1024
+PREFETCH_CHUNKS = 4
+
+def detect_compression(file_path: str) -> Optional[str]:
+    """
+    Detect the compression codec of a file from its first bytes
+    
+    Args:
+        file_path: Path of the file
+    
+    Returns:
+        Codec name ("gzip", "zstd", "bz2", "xz") or None for uncompressed files
+    """
+    with open(file_path, 'rb') as f:
+        header = f.read(6)
+    for codec, magic in MAGIC_BYTES.items():
+        if header.startswith(magic):
+            return codec
+    return None
+
+def strip_compression_suffix(file_name: str) -> str:
+    """Remove a compression suffix, e.g. data.csv.gz -> data.csv"""
+    lowered = file_name.lower()
+    for suffix in COMPRESSION_SUFFIXES:
+        if lowered.endswith(suffix):
+            return file_name[:-len(suffix)]
+    return file_name
+
+def _open_codec(file_path: str, codec: str) -> BinaryIO:
+    """Open a decompressing binary stream for a codec"""
+    if codec == "gzip":
+        return gzip.open(file_path, 'rb')
+    if codec == "bz2":
+        return bz2.open(file_path, 'rb')
+    if codec == "xz":
+        return lzma.open(file_path, 'rb')
+    if codec == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise ImportError("zstandard is not installed. Please install it to read zstd compressed files.")
+        source = open(file_path, 'rb')
+        # Files written by parallel compressors consist of several frames
+        return zstandard.ZstdDecompressor().stream_reader(source, read_size=CHUNK_SIZE, read_across_frames=True, closefd=True)
+    raise ValueError(f"Unsupported compression codec: {codec}")
+
+class PrefetchReader(io.RawIOBase):
+    """Binary stream that reads its source on a background thread, a bounded number of chunks ahead"""
+    
+    def __init__(self, source: BinaryIO, chunk_size: int = CHUNK_SIZE, depth: int = PREFETCH_CHUNKS):
+        self.source = source
+        self.chunk_size = chunk_size
+        self.chunks = queue.Queue(maxsize=depth)
+        self.stopped = threading.Event()
+        self.buffer = b""
+        self.finished = False
+        self.thread = threading.Thread(target=self._produce, daemon=True)
+        self.thread.start()
+    
+    def _put(self, item) -> bool:
+        """Queue an item, giving up once the reader has been closed"""
+        while not self.stopped.is_set():
+            try:
+                self.chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def _produce(self) -> None:
+        """Decompress chunks until the source is exhausted or the reader is closed"""
+        try:
+            while True:
+                chunk = self.source.read(self.chunk_size)
+                if not chunk:
+                    break
+                if not self._put(chunk):
+                    return
+            self._put(None)
+        except Exception as e:
+            self._put(e)
+    
+    def readable(self) -> bool:
+        return True
+    
+    def readinto(self, target) -> int:
+        """Fill target from the prefetched chunks"""
+        while not self.buffer and not self.finished:
+            item = self.chunks.get()
+            if item is None:
+                self.finished = True
+            elif isinstance(item, Exception):
+                self.finished = True
+                raise item
+            else:
+                self.buffer = item
+        size = min(len(target), len(self.buffer))
+        target[:size] = self.buffer[:size]
+        self.buffer = self.buffer[size:]
+        return size
+    
+    def close(self) -> None:
+        """Stop the background thread and close the source"""
+        if not self.closed:
+            self.stopped.set()
+            self.thread.join()
+            self.source.close()
+        super().close()
+
+def open_binary(file_path: str) -> BinaryIO:
+    """
+    Open a file for binary reading, decompressing it if needed
+    
+    Args:
+        file_path: Path of the (possibly compressed) file
+    
+    Returns:
+        Readable binary stream of the uncompressed contents
+    """
+    codec = detect_compression(file_path)
+    if codec is None:
+        return open(file_path, 'rb')
+    return io.BufferedReader(PrefetchReader(_open_codec(file_path, codec)), buffer_size=CHUNK_SIZE)
+
+def open_text(file_path: str, encoding: str = 'utf-8', newline: Optional[str] = None) -> TextIO:
+    """Open a file for text reading, decompressing it if needed"""
+    if detect_compression(file_path) is None:
+        return open(file_path, 'r', encoding=encoding, newline=newline)
+    return io.TextIOWrapper(open_binary(file_path), encoding=encoding, newline=newline)
+
+@contextmanager
+def parser_source(file_path: str) -> Iterator[Union[str, BinaryIO]]:
+    """
+    Give a parser such as pandas.read_csv the cheapest source it can read
+    
+    Uncompressed files are passed by path so the parser reads them with its
+    own buffered I/O; compressed files are passed as a binary decompressing
+    stream, leaving decoding to the parser rather than a TextIOWrapper.
+    """
+    if detect_compression(file_path) is None:
+        yield file_path
+        return
+    with open_binary(file_path) as stream:
+        yield stream
+
+def is_line_delimited(file_path: str) -> bool:
+    """Check if a JSON file holds one record per line, judging by its name"""
+    base = strip_compression_suffix(os.path.basename(file_path)).lower()
+    return base.endswith((".ndjson", ".jsonl"))
\ No newline at end of file
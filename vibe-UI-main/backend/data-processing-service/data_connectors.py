@@ -4,10 +4,22 @@ Data connectors for various data sources
 import pandas as pd
 import json
 import csv
-from typing import List, Dict, Any, Optional
+import io
+import os
+import re
+import math
+import datetime
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from urllib.parse import unquote
+from typing import List, Dict, Any, Optional, Iterator, Iterable, Tuple
 import sqlite3
+from compression import open_text, parser_source, strip_compression_suffix, is_line_delimited
 try:
     import pymysql
+    import pymysql.cursors
     MYSQL_AVAILABLE = True
 except ImportError:
     MYSQL_AVAILABLE = False
@@ -55,7 +67,9 @@ except ImportError:
     JSON_AVAILABLE = False
 
 try:
+    import pyarrow as pa
     import pyarrow.parquet as pq
+    from parquet_metadata import file_statistics, ParquetStatistics
     PARQUET_AVAILABLE = True
 except ImportError:
     PARQUET_AVAILABLE = False
@@ -68,6 +82,269 @@ try:
 except ImportError:
     AVRO_AVAILABLE = False
 
+# Default number of records per batch when streaming results
+DEFAULT_BATCH_SIZE = 10000
+
+# Memory a single array fetch may use on Oracle and SQL Server cursors
+ARRAY_FETCH_MEMORY = int(os.getenv('ARRAY_FETCH_MEMORY', 16 * 1024 * 1024))
+MIN_ARRAYSIZE = 100
+MAX_ARRAYSIZE = 50000
+
+# Assumed width of columns whose description gives no usable size
+DEFAULT_COLUMN_WIDTH = 64
+LOB_COLUMN_WIDTH = 4000
+
+# Threads reading the files of a partitioned directory dataset
+PARTITION_READ_WORKERS = int(os.getenv('PARTITION_READ_WORKERS', 4))
+
+# Characters read at a time when parsing a JSON array incrementally
+JSON_READ_SIZE = 1024 * 1024
+
+# Bytes of a SQLite database file to memory map for reads
+SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+
+def _sql_batches(cursor, query: str, batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Read a SQL query with a server-side cursor in batches of batch_size records
+    
+    pd.read_sql with chunksize runs the query on a default cursor, which
+    psycopg2 and pymysql fill with the whole result before the first chunk;
+    a server-side cursor (named for psycopg2, SSCursor for pymysql) only
+    holds one round trip of rows on the client. The cursor is closed at the end.
+    """
+    try:
+        cursor.execute(query)
+        yield from _array_fetch_batches(cursor, batch_size, batch_size)
+    finally:
+        cursor.close()
+
+def _iter_json_array(f) -> Iterator[Any]:
+    """
+    Parse the elements of a top-level JSON array one at a time
+    
+    Reads JSON_READ_SIZE characters at a time, so only the current element
+    and one read are held in memory. Raises ValueError before yielding
+    anything if the document is not an array.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    at_end = False
+    started = False
+    while True:
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        needs_more = position == len(buffer)
+        if not needs_more:
+            if not started:
+                if buffer[position] != "[":
+                    raise ValueError("JSON document is not an array")
+                started = True
+                position += 1
+                continue
+            if buffer[position] == "]":
+                return
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+                # A number or literal cut off by the end of the read decodes as
+                # a shorter value; complete elements end at a separator
+                if end == len(buffer) or buffer[end] not in " \t\r\n,]":
+                    if at_end and end < len(buffer):
+                        raise ValueError(f"Unexpected character in JSON array at {end}")
+                    needs_more = not at_end
+            except json.JSONDecodeError:
+                if at_end:
+                    raise
+                needs_more = True
+            if not needs_more:
+                yield value
+                position = end
+                continue
+        if at_end:
+            raise ValueError("JSON array is not terminated")
+        # Keep only the unparsed text; read at least as much again for elements larger than a read
+        buffer = buffer[position:]
+        position = 0
+        chunk = f.read(max(JSON_READ_SIZE, len(buffer)))
+        at_end = not chunk
+        buffer += chunk
+
+def _row_width(description) -> int:
+    """
+    Estimate the bytes per row of a result from its DB-API cursor description
+    
+    Uses the internal (or display) size of every column; unsized and LOB
+    columns are assumed to be DEFAULT_COLUMN_WIDTH and LOB_COLUMN_WIDTH wide.
+    """
+    width = 0
+    for column in description:
+        display_size, internal_size = column[2], column[3]
+        size = internal_size if isinstance(internal_size, int) and internal_size > 0 else display_size
+        if not isinstance(size, int) or size <= 0:
+            size = DEFAULT_COLUMN_WIDTH
+        width += min(size, LOB_COLUMN_WIDTH)
+    return max(width, 1)
+
+def _tuned_arraysize(description, memory_budget: int) -> int:
+    """Rows per fetch round trip that fit in the memory budget"""
+    return max(MIN_ARRAYSIZE, min(MAX_ARRAYSIZE, memory_budget // _row_width(description)))
+
+def _array_fetch_batches(cursor, batch_size: int, arraysize: int) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Read an executed cursor with fetchmany, arraysize rows per round trip
+    
+    Rows are collected until a batch is full and turned into records the way
+    pd.read_sql does (DataFrame.from_records with coerce_float), so Decimal,
+    NULL and date values come out as they did when the query went through
+    pandas.
+    """
+    names = None
+    pending = []
+    while True:
+        rows = cursor.fetchmany(arraysize)
+        # Named psycopg2 cursors only describe the result after the first fetch
+        if names is None:
+            names = [column[0] for column in cursor.description or []]
+        if not rows:
+            break
+        pending.extend(rows)
+        while len(pending) >= batch_size:
+            yield pd.DataFrame.from_records(pending[:batch_size], columns=names, coerce_float=True).to_dict('records')
+            del pending[:batch_size]
+    if pending:
+        yield pd.DataFrame.from_records(pending, columns=names, coerce_float=True).to_dict('records')
+
+_IDENTIFIER_PATTERN = re.compile(r"^[A-Za-z_][\w$]*$")
+
+def _rebatch(batches: Iterable[List[Dict[str, Any]]], batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Regroup record batches into batches of exactly batch_size records (the last may be smaller)"""
+    pending: List[Dict[str, Any]] = []
+    for batch in batches:
+        pending.extend(batch)
+        while len(pending) >= batch_size:
+            yield pending[:batch_size]
+            pending = pending[batch_size:]
+    if pending:
+        yield pending
+
+def _write_value(value: Any) -> Any:
+    """Convert a record value to a type database drivers accept; NaN, NaT and NA become NULL"""
+    if value is None or value is pd.NaT or value is pd.NA:
+        return None
+    if hasattr(value, "item") and not isinstance(value, (str, bytes)):
+        # numpy scalars
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return value
+
+def _record_columns(batch: List[Dict[str, Any]]) -> List[str]:
+    """Column names of a batch, in first-seen order"""
+    return list(dict.fromkeys(key for record in batch for key in record))
+
+def _check_columns(batch: List[Dict[str, Any]], columns: List[str]) -> None:
+    """Reject records with columns the target was not written with"""
+    known = set(columns)
+    for record in batch:
+        extra = [key for key in record if key not in known]
+        if extra:
+            raise ValueError(f"Record has columns not present in the first batch: {extra}")
+
+def _quote_identifier(name: str, opening: str, closing: str, upper_case: bool = False) -> str:
+    """
+    Quote an identifier, escaping the closing quote character
+    
+    With upper_case, names that would be valid unquoted are upper-cased
+    first, the way Oracle stores unquoted names, so a quoted my_table still
+    refers to MY_TABLE; other names keep their case.
+    """
+    name = str(name)
+    if upper_case and _IDENTIFIER_PATTERN.match(name):
+        name = name.upper()
+    return opening + name.replace(closing, closing + closing) + closing
+
+def _table_identifier(target: Optional[Dict[str, Any]], opening: str, closing: str, upper_case: bool = False) -> str:
+    """Validate and quote a (schema qualified) target table name"""
+    table = (target or {}).get("table")
+    if not table:
+        raise ValueError("A target table is required")
+    parts = table.split(".")
+    if len(parts) > 2 or not all(_IDENTIFIER_PATTERN.match(part) for part in parts):
+        raise ValueError(f"Invalid table name: {table}")
+    return ".".join(_quote_identifier(part, opening, closing, upper_case) for part in parts)
+
+def _sql_insert_batches(connection, table_sql: str, batches: Iterable[List[Dict[str, Any]]], batch_size: int,
+                        commit_interval: Optional[int], placeholder, quote: Tuple[str, str],
+                        prepare_cursor=None, upper_case: bool = False) -> int:
+    """
+    Insert record batches with one executemany call per batch
+    
+    The drivers turn executemany into bulk operations: pymysql rewrites it
+    into multi-row INSERT statements, pyodbc binds parameter arrays when
+    fast_executemany is set and cx_Oracle uses array binding.
+    
+    Args:
+        connection: DB-API connection
+        table_sql: Quoted target table name
+        batches: Iterable of record batches
+        batch_size: Records per executemany call
+        commit_interval: Commit after at least this many rows (None: commit once at the end)
+        placeholder: Function from parameter position to placeholder text
+        quote: Opening and closing identifier quote characters
+        prepare_cursor: Called with the cursor before the first insert (optional)
+        upper_case: Upper-case column names that would be valid unquoted (Oracle)
+    
+    Returns:
+        Number of rows written
+    """
+    cursor = connection.cursor()
+    if prepare_cursor is not None:
+        prepare_cursor(cursor)
+    columns = None
+    statement = None
+    written = 0
+    uncommitted = 0
+    try:
+        for batch in _rebatch(batches, batch_size):
+            if columns is None:
+                columns = _record_columns(batch)
+                column_sql = ", ".join(_quote_identifier(column, *quote, upper_case) for column in columns)
+                values_sql = ", ".join(placeholder(position) for position in range(len(columns)))
+                statement = f"INSERT INTO {table_sql} ({column_sql}) VALUES ({values_sql})"
+            _check_columns(batch, columns)
+            cursor.executemany(statement, [tuple(_write_value(record.get(column)) for column in columns) for record in batch])
+            written += len(batch)
+            uncommitted += len(batch)
+            if commit_interval and uncommitted >= commit_interval:
+                connection.commit()
+                uncommitted = 0
+        connection.commit()
+        return written
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+def _copy_field(value: Any) -> str:
+    """Format a value for COPY ... (FORMAT csv): NULL is an unquoted empty field, text is always quoted"""
+    value = _write_value(value)
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, (datetime.date, datetime.time)):
+        value = value.isoformat()
+    elif isinstance(value, bytes):
+        value = "\\x" + value.hex()
+    return '"' + str(value).replace('"', '""') + '"'
+
 class DataConnector:
     """Base class for data connectors"""
     
@@ -82,6 +359,44 @@ class DataConnector:
     def fetch_data(self, query: str) -> List[Dict[str, Any]]:
         """Fetch data from data source"""
         raise NotImplementedError
+    
+    def fetch_batches(self, query: str = None, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Fetch data from data source as an iterator of record batches
+        
+        Connectors that can read incrementally override this; the default
+        slices the result of fetch_data.
+        
+        Args:
+            query: Query to execute (connector specific)
+            batch_size: Maximum number of records per batch
+        
+        Returns:
+            Iterator yielding lists of records
+        """
+        data = self.fetch_data(query)
+        for start in range(0, len(data), batch_size):
+            yield data[start:start + batch_size]
+    
+    def connect_for_write(self) -> bool:
+        """Prepare the connector for write_batches; the same as connect unless the target may not exist yet"""
+        return self.connect()
+    
+    def write_batches(self, batches: Iterable[List[Dict[str, Any]]], target: Optional[Dict[str, Any]] = None,
+                      batch_size: int = DEFAULT_BATCH_SIZE, commit_interval: Optional[int] = None) -> int:
+        """
+        Write record batches to the data source
+        
+        Args:
+            batches: Iterable of record batches
+            target: Where to write (connector specific, e.g. {"table": ...} or {"collection": ...})
+            batch_size: Records sent per bulk operation
+            commit_interval: Commit after at least this many rows, where the source has transactions
+        
+        Returns:
+            Number of records written
+        """
+        raise NotImplementedError(f"Writing is not supported by {type(self).__name__}")
 
 class CSVConnector(DataConnector):
     """Connector for CSV files"""
@@ -92,7 +407,7 @@ class CSVConnector(DataConnector):
     def connect(self) -> bool:
         """Check if file exists and is readable"""
         try:
-            with open(self.file_path, 'r') as f:
+            with open_text(self.file_path) as f:
                 csv.Sniffer().sniff(f.read(1024))
             return True
         except Exception:
@@ -105,12 +420,48 @@ class CSVConnector(DataConnector):
     def fetch_data(self, query: str = None) -> List[Dict[str, Any]]:
         """Read data from CSV file"""
         try:
-            # Read CSV file using pandas
-            df = pd.read_csv(self.file_path)
+            # Read CSV file using pandas, decompressing it if needed
+            with parser_source(self.file_path) as source:
+                df = pd.read_csv(source)
             # Convert to list of dictionaries
             return df.to_dict('records')
         except Exception as e:
             raise Exception(f"Error reading CSV file: {str(e)}")
+    
+    def fetch_batches(self, query: str = None, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """Read data from CSV file in chunks of batch_size records"""
+        try:
+            with parser_source(self.file_path) as source, pd.read_csv(source, chunksize=batch_size) as reader:
+                for chunk in reader:
+                    yield chunk.to_dict('records')
+        except Exception as e:
+            raise Exception(f"Error reading CSV file: {str(e)}")
+    
+    def connect_for_write(self) -> bool:
+        """Check that the directory of the file exists and is writable"""
+        directory = os.path.dirname(os.path.abspath(self.file_path))
+        return os.path.isdir(directory) and os.access(directory, os.W_OK)
+    
+    def write_batches(self, batches: Iterable[List[Dict[str, Any]]], target: Optional[Dict[str, Any]] = None,
+                      batch_size: int = DEFAULT_BATCH_SIZE, commit_interval: Optional[int] = None) -> int:
+        """Write records to the CSV file, replacing it once all batches are written"""
+        tmp_path = f"{self.file_path}.partial"
+        written = 0
+        try:
+            with open(tmp_path, 'w', newline='') as f:
+                columns = None
+                for batch in _rebatch(batches, batch_size):
+                    if columns is None:
+                        columns = _record_columns(batch)
+                    _check_columns(batch, columns)
+                    pd.DataFrame(batch, columns=columns).to_csv(f, header=written == 0, index=False)
+                    written += len(batch)
+            os.replace(tmp_path, self.file_path)
+            return written
+        except Exception as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise Exception(f"Error writing CSV file: {str(e)}")
 
 class MySQLConnector(DataConnector):
     """Connector for MySQL databases"""
@@ -157,6 +508,29 @@ class MySQLConnector(DataConnector):
             return df.to_dict('records')
         except Exception as e:
             raise Exception(f"Error executing MySQL query: {str(e)}")
+    
+    def fetch_batches(self, query: str = None, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """Execute query and fetch data from MySQL database in batches"""
+        if not self.connection:
+            raise Exception("Not connected to database")
+        
+        try:
+            yield from _sql_batches(self.connection.cursor(pymysql.cursors.SSCursor), query, batch_size)
+        except Exception as e:
+            raise Exception(f"Error executing MySQL query: {str(e)}")
+    
+    def write_batches(self, batches: Iterable[List[Dict[str, Any]]], target: Optional[Dict[str, Any]] = None,
+                      batch_size: int = DEFAULT_BATCH_SIZE, commit_interval: Optional[int] = None) -> int:
+        """Insert records into a MySQL table with multi-row INSERT statements"""
+        if not self.connection:
+            raise Exception("Not connected to database")
+        
+        table_sql = _table_identifier(target, "`", "`")
+        try:
+            return _sql_insert_batches(self.connection, table_sql, batches, batch_size, commit_interval,
+                                       lambda position: "%s", ("`", "`"))
+        except Exception as e:
+            raise Exception(f"Error writing to MySQL: {str(e)}")
 
 class PostgreSQLConnector(DataConnector):
     """Connector for PostgreSQL databases"""
@@ -203,11 +577,61 @@ class PostgreSQLConnector(DataConnector):
             return df.to_dict('records')
         except Exception as e:
             raise Exception(f"Error executing PostgreSQL query: {str(e)}")
+    
+    def fetch_batches(self, query: str = None, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """Execute query and fetch data from PostgreSQL database in batches"""
+        if not self.connection:
+            raise Exception("Not connected to database")
+        
+        try:
+            cursor = self.connection.cursor(name=f"fetch_{uuid.uuid4().hex}")
+            cursor.itersize = batch_size
+            yield from _sql_batches(cursor, query, batch_size)
+        except Exception as e:
+            raise Exception(f"Error executing PostgreSQL query: {str(e)}")
+    
+    def write_batches(self, batches: Iterable[List[Dict[str, Any]]], target: Optional[Dict[str, Any]] = None,
+                      batch_size: int = DEFAULT_BATCH_SIZE, commit_interval: Optional[int] = None) -> int:
+        """Load records into a PostgreSQL table with COPY FROM STDIN, one COPY per batch"""
+        if not self.connection:
+            raise Exception("Not connected to database")
+        
+        table_sql = _table_identifier(target, '"', '"')
+        cursor = self.connection.cursor()
+        columns = None
+        written = 0
+        uncommitted = 0
+        try:
+            for batch in _rebatch(batches, batch_size):
+                if columns is None:
+                    columns = _record_columns(batch)
+                    column_sql = ", ".join(_quote_identifier(column, '"', '"') for column in columns)
+                    copy_sql = f"COPY {table_sql} ({column_sql}) FROM STDIN WITH (FORMAT csv)"
+                _check_columns(batch, columns)
+                buffer = io.StringIO()
+                for record in batch:
+                    buffer.write(",".join(_copy_field(record.get(column)) for column in columns))
+                    buffer.write("\n")
+                buffer.seek(0)
+                cursor.copy_expert(copy_sql, buffer)
+                written += len(batch)
+                uncommitted += len(batch)
+                if commit_interval and uncommitted >= commit_interval:
+                    self.connection.commit()
+                    uncommitted = 0
+            self.connection.commit()
+            return written
+        except Exception as e:
+            self.connection.rollback()
+            raise Exception(f"Error writing to PostgreSQL: {str(e)}")
+        finally:
+            cursor.close()
 
 class MSSQLConnector(DataConnector):
     """Connector for Microsoft SQL Server databases"""
     
-    def __init__(self, host: str, port: int, username: str, password: str, database: str):
+    def __init__(self, host: str, port: int, username: str, password: str, database: str,
+                 fetch_memory: int = ARRAY_FETCH_MEMORY):
         if not MSSQL_AVAILABLE:
             raise ImportError("pyodbc is not installed. Please install it to use Microsoft SQL Server connector.")
         
@@ -216,6 +640,7 @@ class MSSQLConnector(DataConnector):
         self.username = username
         self.password = password
         self.database = database
+        self.fetch_memory = int(fetch_memory)
         self.connection = None
     
     def connect(self) -> bool:
@@ -239,11 +664,50 @@ class MSSQLConnector(DataConnector):
         if not self.connection:
             raise Exception("Not connected to database")
         
+        data = []
+        for batch in self.fetch_batches(query):
+            data.extend(batch)
+        return data
+    
+    def fetch_batches(self, query: str = None, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Execute query and fetch data from Microsoft SQL Server database in batches
+        
+        The cursor arraysize is sized from the row width of the result so each
+        fetchmany round trip uses about fetch_memory bytes.
+        """
+        if not self.connection:
+            raise Exception("Not connected to database")
+        
         try:
-            df = pd.read_sql(query, self.connection)
-            return df.to_dict('records')
+            cursor = self.connection.cursor()
+            try:
+                cursor.execute(query)
+                if cursor.description is None:
+                    return
+                cursor.arraysize = _tuned_arraysize(cursor.description, self.fetch_memory)
+                yield from _array_fetch_batches(cursor, batch_size, cursor.arraysize)
+            finally:
+                cursor.close()
         except Exception as e:
             raise Exception(f"Error executing Microsoft SQL Server query: {str(e)}")
+    
+    def write_batches(self, batches: Iterable[List[Dict[str, Any]]], target: Optional[Dict[str, Any]] = None,
+                      batch_size: int = DEFAULT_BATCH_SIZE, commit_interval: Optional[int] = None) -> int:
+        """Insert records into a SQL Server table with array-bound parameters (fast_executemany)"""
+        if not self.connection:
+            raise Exception("Not connected to database")
+        
+        table_sql = _table_identifier(target, "[", "]")
+        
+        def prepare_cursor(cursor):
+            cursor.fast_executemany = True
+        
+        try:
+            return _sql_insert_batches(self.connection, table_sql, batches, batch_size, commit_interval,
+                                       lambda position: "?", ("[", "]"), prepare_cursor)
+        except Exception as e:
+            raise Exception(f"Error writing to Microsoft SQL Server: {str(e)}")
 
 class MongoDBConnector(DataConnector):
     """Connector for MongoDB databases"""
@@ -309,11 +773,63 @@ class MongoDBConnector(DataConnector):
             return results
         except Exception as e:
             raise Exception(f"Error fetching data from MongoDB: {str(e)}")
+    
+    def fetch_batches(self, query: str = None, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """Fetch data from MongoDB collection in batches"""
+        if self.db is None:
+            raise Exception("Not connected to database")
+        
+        try:
+            query_dict = json.loads(query) if isinstance(query, str) else query
+            collection_name = query_dict.get("collection")
+            filter_query = query_dict.get("filter", {})
+            limit = query_dict.get("limit", 1000)
+            
+            if not collection_name:
+                raise Exception("Collection name is required in query")
+            
+            cursor = self.db[collection_name].find(filter_query).limit(limit).batch_size(batch_size)
+            batch = []
+            for doc in cursor:
+                if '_id' in doc:
+                    doc['_id'] = str(doc['_id'])
+                batch.append(doc)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+        except Exception as e:
+            raise Exception(f"Error fetching data from MongoDB: {str(e)}")
+    
+    def write_batches(self, batches: Iterable[List[Dict[str, Any]]], target: Optional[Dict[str, Any]] = None,
+                      batch_size: int = DEFAULT_BATCH_SIZE, commit_interval: Optional[int] = None) -> int:
+        """Insert documents into a MongoDB collection with unordered insert_many calls"""
+        if self.db is None:
+            raise Exception("Not connected to database")
+        
+        collection_name = (target or {}).get("collection")
+        if not collection_name:
+            raise ValueError("A target collection is required")
+        
+        try:
+            collection = self.db[collection_name]
+            written = 0
+            for batch in _rebatch(batches, batch_size):
+                # Unordered inserts let the server apply the batch in parallel and
+                # continue past individual failures; copies keep the caller's records free of _id
+                documents = [{key: _write_value(value) for key, value in record.items()} for record in batch]
+                result = collection.insert_many(documents, ordered=False)
+                written += len(result.inserted_ids)
+            return written
+        except Exception as e:
+            raise Exception(f"Error writing to MongoDB: {str(e)}")
 
 class OracleConnector(DataConnector):
     """Connector for Oracle databases"""
     
-    def __init__(self, host: str, port: int, username: str, password: str, database: str):
+    def __init__(self, host: str, port: int, username: str, password: str, database: str,
+                 fetch_memory: int = ARRAY_FETCH_MEMORY):
         if not ORACLE_AVAILABLE:
             raise ImportError("cx_Oracle is not installed. Please install it to use Oracle connector.")
         
@@ -322,6 +838,7 @@ class OracleConnector(DataConnector):
         self.username = username
         self.password = password
         self.database = database
+        self.fetch_memory = int(fetch_memory)
         self.connection = None
     
     def connect(self) -> bool:
@@ -345,11 +862,53 @@ class OracleConnector(DataConnector):
         if not self.connection:
             raise Exception("Not connected to database")
         
+        data = []
+        for batch in self.fetch_batches(query):
+            data.extend(batch)
+        return data
+    
+    def fetch_batches(self, query: str = None, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Execute query and fetch data from Oracle database in batches
+        
+        The statement is parsed first to describe its columns; arraysize and
+        prefetchrows are then sized from the row width so each round trip
+        uses about fetch_memory bytes, and the first round trip is served by
+        the execute call itself.
+        """
+        if not self.connection:
+            raise Exception("Not connected to database")
+        
         try:
-            df = pd.read_sql(query, self.connection)
-            return df.to_dict('records')
+            cursor = self.connection.cursor()
+            try:
+                cursor.parse(query)
+                if cursor.description is not None:
+                    arraysize = _tuned_arraysize(cursor.description, self.fetch_memory)
+                    cursor.arraysize = arraysize
+                    cursor.prefetchrows = arraysize
+                cursor.execute(query)
+                if cursor.description is None:
+                    return
+                yield from _array_fetch_batches(cursor, batch_size, cursor.arraysize)
+            finally:
+                cursor.close()
         except Exception as e:
             raise Exception(f"Error executing Oracle query: {str(e)}")
+    
+    def write_batches(self, batches: Iterable[List[Dict[str, Any]]], target: Optional[Dict[str, Any]] = None,
+                      batch_size: int = DEFAULT_BATCH_SIZE, commit_interval: Optional[int] = None) -> int:
+        """Insert records into an Oracle table with array binding"""
+        if not self.connection:
+            raise Exception("Not connected to database")
+        
+        # Oracle folds unquoted names to upper case, so my_table means MY_TABLE
+        table_sql = _table_identifier(target, '"', '"', upper_case=True)
+        try:
+            return _sql_insert_batches(self.connection, table_sql, batches, batch_size, commit_interval,
+                                       lambda position: f":{position + 1}", ('"', '"'), upper_case=True)
+        except Exception as e:
+            raise Exception(f"Error writing to Oracle: {str(e)}")
 
 class RedisConnector(DataConnector):
     """Connector for Redis databases"""
@@ -421,6 +980,40 @@ class RedisConnector(DataConnector):
                 raise Exception("Invalid Redis operation or missing key/pattern")
         except Exception as e:
             raise Exception(f"Error fetching data from Redis: {str(e)}")
+    
+    def write_batches(self, batches: Iterable[List[Dict[str, Any]]], target: Optional[Dict[str, Any]] = None,
+                      batch_size: int = DEFAULT_BATCH_SIZE, commit_interval: Optional[int] = None) -> int:
+        """
+        Store records as JSON strings with pipelined SET commands
+        
+        The target names the record field holding the key ("key_field"), an
+        optional key "prefix" and an optional "ttl" in seconds. One pipeline
+        round trip is made per batch.
+        """
+        if not self.client:
+            raise Exception("Not connected to database")
+        
+        target = target or {}
+        key_field = target.get("key_field")
+        if not key_field:
+            raise ValueError("A target key_field is required")
+        prefix = target.get("prefix", "")
+        ttl = target.get("ttl")
+        
+        try:
+            written = 0
+            for batch in _rebatch(batches, batch_size):
+                pipeline = self.client.pipeline(transaction=False)
+                for record in batch:
+                    if record.get(key_field) is None:
+                        raise ValueError(f"Record is missing key field '{key_field}'")
+                    value = json.dumps({key: _write_value(item) for key, item in record.items()}, default=str)
+                    pipeline.set(f"{prefix}{record[key_field]}", value, ex=int(ttl) if ttl else None)
+                pipeline.execute()
+                written += len(batch)
+            return written
+        except Exception as e:
+            raise Exception(f"Error writing to Redis: {str(e)}")
 
 class ExcelConnector(DataConnector):
     """Connector for Excel files"""
@@ -446,30 +1039,69 @@ class ExcelConnector(DataConnector):
     def fetch_data(self, query: str = None) -> List[Dict[str, Any]]:
         """Read data from Excel file"""
         try:
-            # Parse query to get sheet name and range
-            sheet_name = "Sheet1"
-            if query:
-                query_dict = json.loads(query) if isinstance(query, str) else query
-                sheet_name = query_dict.get("sheet", "Sheet1")
-            
             # Read Excel file using pandas
-            df = pd.read_excel(self.file_path, sheet_name=sheet_name)
+            df = pd.read_excel(self.file_path, sheet_name=self._sheet_name(query))
             # Convert to list of dictionaries
             return df.to_dict('records')
         except Exception as e:
             raise Exception(f"Error reading Excel file: {str(e)}")
+    
+    def fetch_batches(self, query: str = None, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """Read data from Excel file in batches; .xlsx sheets are read row by row"""
+        if not str(self.file_path).lower().endswith(('.xlsx', '.xlsm')):
+            # Legacy .xls files are read whole by pandas
+            yield from super().fetch_batches(query, batch_size)
+            return
+        
+        try:
+            # Read-only workbooks load rows lazily instead of building the whole sheet
+            workbook = openpyxl.load_workbook(self.file_path, read_only=True, data_only=True)
+            try:
+                rows = workbook[self._sheet_name(query)].iter_rows(values_only=True)
+                header = next(rows, None)
+                if header is None:
+                    return
+                # Name columns like pd.read_excel does
+                columns = [f"Unnamed: {position}" if name is None else name for position, name in enumerate(header)]
+                width = len(columns)
+                pending = []
+                for row in rows:
+                    pending.append(tuple(row[:width]) + (None,) * (width - len(row)))
+                    if len(pending) >= batch_size:
+                        yield pd.DataFrame.from_records(pending, columns=columns, coerce_float=True).to_dict('records')
+                        pending = []
+                if pending:
+                    yield pd.DataFrame.from_records(pending, columns=columns, coerce_float=True).to_dict('records')
+            finally:
+                workbook.close()
+        except Exception as e:
+            raise Exception(f"Error reading Excel file: {str(e)}")
+    
+    def _sheet_name(self, query: Any) -> str:
+        """Get the sheet named by a query, Sheet1 by default"""
+        if query:
+            query_dict = json.loads(query) if isinstance(query, str) else query
+            return query_dict.get("sheet", "Sheet1")
+        return "Sheet1"
 
 class JSONConnector(DataConnector):
-    """Connector for JSON files"""
+    """Connector for JSON and newline-delimited JSON files"""
     
-    def __init__(self, file_path: str):
+    def __init__(self, file_path: str, lines: Optional[bool] = None):
         self.file_path = file_path
+        # NDJSON is recognised by a .ndjson or .jsonl name unless set explicitly
+        self.lines = is_line_delimited(file_path) if lines is None and file_path else bool(lines)
     
     def connect(self) -> bool:
         """Check if file exists and is readable"""
         try:
-            with open(self.file_path, 'r') as f:
-                json.load(f)
+            with open_text(self.file_path) as f:
+                if self.lines:
+                    first_line = next((line for line in f if line.strip()), None)
+                    if first_line is not None:
+                        json.loads(first_line)
+                else:
+                    json.load(f)
             return True
         except Exception:
             return False
@@ -480,8 +1112,14 @@ class JSONConnector(DataConnector):
     
     def fetch_data(self, query: str = None) -> List[Dict[str, Any]]:
         """Read data from JSON file"""
+        if self.lines:
+            data = []
+            for batch in self.fetch_batches(query):
+                data.extend(batch)
+            return data
+        
         try:
-            with open(self.file_path, 'r') as f:
+            with open_text(self.file_path) as f:
                 data = json.load(f)
             
             # If data is a dictionary, convert to list
@@ -499,6 +1137,48 @@ class JSONConnector(DataConnector):
                 return data
         except Exception as e:
             raise Exception(f"Error reading JSON file: {str(e)}")
+    
+    def fetch_batches(self, query: str = None, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """Read data from JSON file in batches; NDJSON files are parsed line by line, arrays element by element"""
+        if not self.lines:
+            try:
+                with open_text(self.file_path) as f:
+                    elements = _iter_json_array(f)
+                    try:
+                        batch = [next(elements)]
+                    except StopIteration:
+                        return
+                    except ValueError:
+                        # A single object (or another document) is read whole by fetch_data
+                        batch = None
+                    if batch is not None:
+                        for element in elements:
+                            batch.append(element)
+                            if len(batch) >= batch_size:
+                                yield batch
+                                batch = []
+                        if batch:
+                            yield batch
+                        return
+            except Exception as e:
+                raise Exception(f"Error reading JSON file: {str(e)}")
+            yield from super().fetch_batches(query, batch_size)
+            return
+        
+        try:
+            with open_text(self.file_path) as f:
+                batch = []
+                for line in f:
+                    if not line.strip():
+                        continue
+                    batch.append(json.loads(line))
+                    if len(batch) >= batch_size:
+                        yield batch
+                        batch = []
+                if batch:
+                    yield batch
+        except Exception as e:
+            raise Exception(f"Error reading JSON file: {str(e)}")
 
 class ParquetConnector(DataConnector):
     """Connector for Parquet files"""
@@ -531,6 +1211,68 @@ class ParquetConnector(DataConnector):
             return df.to_dict('records')
         except Exception as e:
             raise Exception(f"Error reading Parquet file: {str(e)}")
+    
+    def fetch_batches(self, query: str = None, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """Read data from Parquet file one record batch at a time"""
+        try:
+            parquet_file = pq.ParquetFile(self.file_path)
+            for batch in parquet_file.iter_batches(batch_size=batch_size):
+                yield batch.to_pandas().to_dict('records')
+        except Exception as e:
+            raise Exception(f"Error reading Parquet file: {str(e)}")
+    
+    def connect_for_write(self) -> bool:
+        """Check that the directory of the file exists and is writable"""
+        directory = os.path.dirname(os.path.abspath(self.file_path))
+        return os.path.isdir(directory) and os.access(directory, os.W_OK)
+    
+    def write_batches(self, batches: Iterable[List[Dict[str, Any]]], target: Optional[Dict[str, Any]] = None,
+                      batch_size: int = DEFAULT_BATCH_SIZE, commit_interval: Optional[int] = None) -> int:
+        """Write records to the Parquet file, one row group per batch"""
+        tmp_path = f"{self.file_path}.partial"
+        compression = (target or {}).get("compression", "snappy")
+        writer = None
+        written = 0
+        try:
+            for batch in _rebatch(batches, batch_size):
+                table = pa.Table.from_pandas(pd.DataFrame(batch), preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_path, table.schema, compression=compression)
+                elif not table.schema.equals(writer.schema):
+                    table = table.select(writer.schema.names).cast(writer.schema)
+                writer.write_table(table)
+                written += len(batch)
+            if writer is None:
+                raise ValueError("No records to write")
+            writer.close()
+            writer = None
+            os.replace(tmp_path, self.file_path)
+            return written
+        except Exception as e:
+            if writer is not None:
+                writer.close()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise Exception(f"Error writing Parquet file: {str(e)}")
+    
+    def fetch_metadata(self, columns: Optional[List[str]] = None, query: Any = None) -> Dict[str, Any]:
+        """
+        Get the row count and per-column min, max and null counts from the file footer
+        
+        Row groups without statistics for a column are scanned for that column only.
+        
+        Args:
+            columns: File columns to describe (default: all)
+            query: Not supported for single files, whose footer describes every row
+        """
+        if query:
+            raise ValueError("Metadata queries with filters are only supported for partitioned Parquet datasets")
+        try:
+            return file_statistics(self.file_path, columns).to_dict()
+        except KeyError:
+            raise
+        except Exception as e:
+            raise Exception(f"Error reading Parquet metadata: {str(e)}")
 
 class AvroConnector(DataConnector):
     """Connector for Avro files"""
@@ -566,11 +1308,358 @@ class AvroConnector(DataConnector):
             return records
         except Exception as e:
             raise Exception(f"Error reading Avro file: {str(e)}")
+    
+    def fetch_batches(self, query: str = None, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """Read data from Avro file in batches of batch_size records"""
+        try:
+            with open(self.file_path, 'rb') as f:
+                reader = avro.datafile.DataFileReader(f, avro.io.DatumReader())
+                batch = []
+                for record in reader:
+                    batch.append(record)
+                    if len(batch) >= batch_size:
+                        yield batch
+                        batch = []
+                if batch:
+                    yield batch
+                reader.close()
+        except Exception as e:
+            raise Exception(f"Error reading Avro file: {str(e)}")
+
+# Per-thread SQLite connections, keyed by database path and file identity
+_sqlite_local = threading.local()
+
+class SQLiteConnector(DataConnector):
+    """
+    Connector for local SQLite database files
+    
+    Databases are opened read-only with a memory mapped file, so repeated
+    reads are served from the page cache without a database server. Each thread keeps its own connection per database and
+    reuses it across requests; databases are switched to WAL mode (when the
+    file is writable) so readers are not blocked while an extract is
+    refreshed.
+    """
+    
+    def __init__(self, file_path: str, mmap_size: int = SQLITE_MMAP_SIZE, wal: bool = True):
+        self.file_path = file_path
+        self.mmap_size = int(mmap_size)
+        self.wal = wal
+        self.connection = None
+    
+    def _connection_key(self):
+        """Identify the database file, so a replaced file gets a fresh connection"""
+        stat = os.stat(self.file_path)
+        return (os.path.abspath(self.file_path), stat.st_dev, stat.st_ino)
+    
+    def _enable_wal(self) -> None:
+        """Switch the database to WAL journaling; WAL mode is persistent, so this only writes once"""
+        try:
+            connection = sqlite3.connect(self.file_path, timeout=1)
+            try:
+                connection.execute("PRAGMA journal_mode=WAL")
+            finally:
+                connection.close()
+        except sqlite3.Error as e:
+            # Read-only files and directories keep their rollback journal
+            print(f"Could not enable WAL mode for {self.file_path}: {str(e)}")
+    
+    def _open(self) -> sqlite3.Connection:
+        """
+        Open a read-only, memory mapped connection
+        
+        Shared-cache mode is not used: a shared cache is keyed by path, so a
+        connection opened after the file was replaced would keep reading the
+        old file through another thread's still-open connection.
+        """
+        uri = f"file:{os.path.abspath(self.file_path)}?mode=ro"
+        connection = sqlite3.connect(uri, uri=True)
+        if self.wal and connection.execute("PRAGMA journal_mode").fetchone()[0].lower() != "wal":
+            self._enable_wal()
+        connection.execute(f"PRAGMA mmap_size={self.mmap_size}")
+        connection.execute("PRAGMA query_only=ON")
+        connection.execute("PRAGMA temp_store=MEMORY")
+        return connection
+    
+    def connect(self) -> bool:
+        """Reuse this thread's connection to the database, opening one if needed"""
+        try:
+            key = self._connection_key()
+            connections = getattr(_sqlite_local, 'connections', None)
+            if connections is None:
+                connections = _sqlite_local.connections = {}
+            connection = connections.get(key)
+            if connection is None:
+                connection = connections[key] = self._open()
+            self.connection = connection
+            return True
+        except Exception as e:
+            print(f"Error connecting to SQLite: {str(e)}")
+            return False
+    
+    def disconnect(self) -> None:
+        """Release the connection; it stays open for reuse by the same thread"""
+        self.connection = None
+    
+    def fetch_data(self, query: str) -> List[Dict[str, Any]]:
+        """Execute query and fetch data from SQLite database"""
+        data = []
+        for batch in self.fetch_batches(query):
+            data.extend(batch)
+        return data
+    
+    def fetch_batches(self, query: str = None, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """Execute query and fetch data from SQLite database in batches"""
+        if not self.connection:
+            raise Exception("Not connected to database")
+        
+        try:
+            cursor = self.connection.execute(query)
+            try:
+                columns = [column[0] for column in cursor.description or []]
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield [dict(zip(columns, row)) for row in rows]
+            finally:
+                cursor.close()
+        except Exception as e:
+            raise Exception(f"Error executing SQLite query: {str(e)}")
+
+# Hive writers use this directory name for rows whose partition value is null
+HIVE_NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+PARTITIONED_FORMATS = {
+    "parquet": (".parquet", ".parq"),
+    "csv": (".csv",)
+}
+
+def _parse_partition_value(value: Any) -> Any:
+    """Type a partition value from its path text: integers and floats become numbers"""
+    if value is None or value == HIVE_NULL_PARTITION:
+        return None
+    if not isinstance(value, str):
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+def _matches(value: Any, condition: Any) -> bool:
+    """
+    Check a value against a filter condition
+    
+    Conditions are a single value, a list of accepted values or a
+    {"min": ..., "max": ...} inclusive range.
+    """
+    if isinstance(condition, dict):
+        if value is None:
+            return False
+        try:
+            if "min" in condition and value < _parse_partition_value(condition["min"]):
+                return False
+            if "max" in condition and value > _parse_partition_value(condition["max"]):
+                return False
+        except TypeError:
+            return False
+        return True
+    accepted = condition if isinstance(condition, list) else [condition]
+    return any(value == _parse_partition_value(item) for item in accepted)
+
+class PartitionedDatasetConnector(DataConnector):
+    """
+    Connector for directories of Parquet or CSV files
+    
+    Hive-style directories (year=2024/month=03/part-0.parquet) are read as
+    one dataset; the partition keys become columns of every row. Filters on
+    partition keys prune whole directories before they are listed, so only
+    the matching files are opened, and the remaining files are read in
+    parallel on a thread pool.
+    
+    Queries are JSON: {"filters": {column: condition}, "columns": [...]},
+    where a condition is a value, a list of values or a {"min", "max"} range.
+    Filters on ordinary columns are applied to the rows after reading.
+    """
+    
+    def __init__(self, directory: str, file_format: str, max_workers: int = PARTITION_READ_WORKERS):
+        if file_format not in PARTITIONED_FORMATS:
+            raise ValueError(f"Unsupported partitioned dataset format: {file_format}")
+        if file_format == "parquet" and not PARQUET_AVAILABLE:
+            raise ImportError("pyarrow is not installed. Please install it to use Parquet connector.")
+        
+        self.directory = directory
+        self.file_format = file_format
+        self.max_workers = max(1, int(max_workers))
+    
+    def connect(self) -> bool:
+        """Check if the directory exists"""
+        return os.path.isdir(self.directory)
+    
+    def disconnect(self) -> None:
+        """No connection to close for directory datasets"""
+        pass
+    
+    @staticmethod
+    def _parse_query(query: Any) -> Tuple[Dict[str, Any], Optional[List[str]]]:
+        """Split a query into its filters and selected columns"""
+        if not query:
+            return {}, None
+        query_dict = json.loads(query) if isinstance(query, str) else query
+        return query_dict.get("filters", {}) or {}, query_dict.get("columns")
+    
+    def list_files(self, filters: Optional[Dict[str, Any]] = None) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Find the data files whose partitions satisfy the filters
+        
+        Args:
+            filters: Column -> condition; conditions on non-partition columns are ignored here
+        
+        Returns:
+            Sorted list of (file path, partition values) tuples
+        """
+        filters = filters or {}
+        extensions = PARTITIONED_FORMATS[self.file_format]
+        files = []
+        for root, dirnames, filenames in os.walk(self.directory):
+            partitions = self._partitions_of(root)
+            # Prune subdirectories that cannot hold matching rows before descending into them
+            kept = []
+            for dirname in sorted(dirnames):
+                if dirname.startswith(('.', '_')):
+                    continue
+                key, sep, raw = dirname.partition('=')
+                if sep and key in filters and not _matches(_parse_partition_value(unquote(raw)), filters[key]):
+                    continue
+                kept.append(dirname)
+            dirnames[:] = kept
+            
+            for filename in sorted(filenames):
+                if filename.startswith(('.', '_')) or not strip_compression_suffix(filename).lower().endswith(extensions):
+                    continue
+                files.append((os.path.join(root, filename), partitions))
+        return files
+    
+    def _partitions_of(self, path: str) -> Dict[str, Any]:
+        """Parse the key=value partition segments of a directory below the dataset root"""
+        partitions = {}
+        relative = os.path.relpath(path, self.directory)
+        if relative == os.curdir:
+            return partitions
+        for segment in relative.split(os.sep):
+            key, sep, raw = segment.partition('=')
+            if sep:
+                partitions[key] = _parse_partition_value(unquote(raw))
+        return partitions
+    
+    def _read_file(self, path: str, partitions: Dict[str, Any], filters: Dict[str, Any],
+                   columns: Optional[List[str]]) -> pd.DataFrame:
+        """Read one file, add its partition columns and apply the row filters"""
+        if self.file_format == "parquet":
+            file_columns = None
+            if columns is not None:
+                # Filtered columns have to be read even when they are not selected
+                wanted = set(columns) | set(filters)
+                file_columns = [name for name in pq.read_schema(path).names if name in wanted]
+            df = pq.read_table(path, columns=file_columns).to_pandas()
+        else:
+            with parser_source(path) as source:
+                df = pd.read_csv(source)
+        
+        for key, value in partitions.items():
+            df[key] = value
+        for column, condition in filters.items():
+            if column in partitions:
+                continue
+            if column not in df.columns:
+                return df.iloc[0:0]
+            if isinstance(condition, dict):
+                mask = df[column].notna()
+                if "min" in condition:
+                    mask &= df[column] >= condition["min"]
+                if "max" in condition:
+                    mask &= df[column] <= condition["max"]
+            else:
+                mask = df[column].isin(condition if isinstance(condition, list) else [condition])
+            df = df[mask]
+        if columns is not None:
+            df = df[[column for column in columns if column in df.columns]]
+        return df
+    
+    def fetch_data(self, query: str = None) -> List[Dict[str, Any]]:
+        """Read the matching files of the dataset"""
+        data = []
+        for batch in self.fetch_batches(query):
+            data.extend(batch)
+        return data
+    
+    def fetch_batches(self, query: str = None, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """Read the matching files in parallel, yielding their rows in file order"""
+        try:
+            filters, columns = self._parse_query(query)
+            files = self.list_files(filters)
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                # Keep at most max_workers files in flight so memory stays bounded
+                pending = deque()
+                remaining = iter(files)
+                for path, partitions in remaining:
+                    pending.append(executor.submit(self._read_file, path, partitions, filters, columns))
+                    if len(pending) >= self.max_workers:
+                        break
+                while pending:
+                    df = pending.popleft().result()
+                    next_file = next(remaining, None)
+                    if next_file is not None:
+                        pending.append(executor.submit(self._read_file, next_file[0], next_file[1], filters, columns))
+                    records = df.to_dict('records')
+                    for start in range(0, len(records), batch_size):
+                        yield records[start:start + batch_size]
+        except Exception as e:
+            raise Exception(f"Error reading {self.file_format} dataset directory: {str(e)}")
+    
+    def fetch_metadata(self, columns: Optional[List[str]] = None, query: Any = None) -> Dict[str, Any]:
+        """
+        Combine the footer statistics of the Parquet files that survive partition pruning
+        
+        Args:
+            columns: File columns to describe (default: all)
+            query: Optional JSON query whose partition filters select the files;
+                footers describe whole files, so filters on other columns are rejected
+        """
+        if self.file_format != "parquet":
+            raise ValueError("Metadata queries are only supported for Parquet datasets")
+        filters, _ = self._parse_query(query)
+        files = self.list_files(filters)
+        partition_keys = {key for _, partitions in files for key in partitions}
+        row_filters = sorted(column for column in filters if column not in partition_keys)
+        if files and row_filters:
+            raise ValueError(f"Metadata queries can only filter on partition keys, not on {', '.join(row_filters)}")
+        result = ParquetStatistics()
+        try:
+            for path, _ in files:
+                file_columns = columns
+                if columns is not None:
+                    # Not every file has to contain every column
+                    names = pq.read_schema(path).names
+                    file_columns = [column for column in columns if column in names]
+                result.merge(file_statistics(path, file_columns))
+        except Exception as e:
+            raise Exception(f"Error reading Parquet metadata: {str(e)}")
+        return result.to_dict()
 
 # Factory function to create appropriate connector
 def create_connector(connector_type: str, **kwargs) -> DataConnector:
     """Factory function to create data connectors"""
-    if connector_type.lower() == 'csv':
+    if connector_type.lower() in PARTITIONED_FORMATS and kwargs.get('file_path') and os.path.isdir(kwargs['file_path']):
+        return PartitionedDatasetConnector(
+            kwargs['file_path'],
+            connector_type.lower(),
+            kwargs.get('max_workers', PARTITION_READ_WORKERS)
+        )
+    elif connector_type.lower() == 'csv':
         return CSVConnector(kwargs.get('file_path'))
     elif connector_type.lower() == 'mysql':
         return MySQLConnector(
@@ -594,7 +1683,8 @@ def create_connector(connector_type: str, **kwargs) -> DataConnector:
             kwargs.get('port', 1433),
             kwargs.get('username'),
             kwargs.get('password'),
-            kwargs.get('database')
+            kwargs.get('database'),
+            kwargs.get('fetch_memory', ARRAY_FETCH_MEMORY)
         )
     elif connector_type.lower() == 'mongodb':
         return MongoDBConnector(
@@ -610,7 +1700,8 @@ def create_connector(connector_type: str, **kwargs) -> DataConnector:
             kwargs.get('port', 1521),
             kwargs.get('username'),
             kwargs.get('password'),
-            kwargs.get('database')
+            kwargs.get('database'),
+            kwargs.get('fetch_memory', ARRAY_FETCH_MEMORY)
         )
     elif connector_type.lower() == 'redis':
         return RedisConnector(
@@ -623,10 +1714,18 @@ def create_connector(connector_type: str, **kwargs) -> DataConnector:
     elif connector_type.lower() == 'excel':
         return ExcelConnector(kwargs.get('file_path'))
     elif connector_type.lower() == 'json':
-        return JSONConnector(kwargs.get('file_path'))
+        return JSONConnector(kwargs.get('file_path'), kwargs.get('lines'))
+    elif connector_type.lower() == 'ndjson':
+        return JSONConnector(kwargs.get('file_path'), True)
     elif connector_type.lower() == 'parquet':
         return ParquetConnector(kwargs.get('file_path'))
     elif connector_type.lower() == 'avro':
         return AvroConnector(kwargs.get('file_path'))
+    elif connector_type.lower() == 'sqlite':
+        return SQLiteConnector(
+            kwargs.get('file_path'),
+            kwargs.get('mmap_size', SQLITE_MMAP_SIZE),
+            kwargs.get('wal', True)
+        )
     else:
         raise ValueError(f"Unsupported connector type: {connector_type}")
\ No newline at end of file
@@ -0,0 +1,112 @@
+"""
+Downsampling of chart series
+
+Reduces an (x, y) series to a target number of points while keeping its
+visual shape. All methods operate on NumPy arrays and expect x sorted
+ascending; they return the indices of the points to keep (or, for
+averaging, new x/y arrays).
+"""
+from typing import Tuple
+import numpy as np
+
+METHODS = ["lttb", "minmax", "average"]
+
+def _bucket_edges(start: int, stop: int, buckets: int) -> np.ndarray:
+    """Split the index range [start, stop) into equally sized buckets"""
+    return np.linspace(start, stop, buckets + 1).astype(np.int64)
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling
+    
+    The first and last points are always kept. Every bucket in between
+    contributes the point forming the largest triangle with the point kept
+    from the previous bucket and the average of the next bucket.
+    
+    Args:
+        x: Sorted x values as floats
+        y: y values as floats
+        threshold: Number of points to keep
+    
+    Returns:
+        Indices of the kept points
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    
+    edges = _bucket_edges(1, n - 1, threshold - 2)
+    # Averages of every bucket, used as the third triangle vertex
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / counts
+    avg_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / counts
+    avg_x = np.append(avg_x, x[n - 1])
+    avg_y = np.append(avg_y, y[n - 1])
+    
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        next_x, next_y = avg_x[bucket + 1], avg_y[bucket + 1]
+        prev_x, prev_y = x[previous], y[previous]
+        # Twice the triangle area for every candidate in the bucket at once
+        areas = np.abs(
+            (prev_x - next_x) * (y[start:stop] - prev_y)
+            - (prev_x - x[start:stop]) * (next_y - prev_y)
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+def minmax(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Keep the minimum and maximum point of each bucket
+    
+    Preserves spikes exactly, at the cost of two points per bucket.
+    
+    Args:
+        x: Sorted x values as floats
+        y: y values as floats
+        threshold: Approximate number of points to keep
+    
+    Returns:
+        Indices of the kept points in x order
+    """
+    n = len(x)
+    if threshold >= n or threshold < 2:
+        return np.arange(n)
+    
+    buckets = max(1, threshold // 2)
+    edges = _bucket_edges(0, n, buckets)
+    bucket_ids = np.repeat(np.arange(buckets), np.diff(edges))
+    # Sort by (bucket, y); the first and last entry of each bucket are its min and max
+    order = np.lexsort((y, bucket_ids))
+    starts = edges[:-1]
+    ends = edges[1:] - 1
+    keep = np.unique(np.concatenate([order[starts], order[ends]]))
+    return keep
+
+def average(x: np.ndarray, y: np.ndarray, threshold: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Replace each bucket by its mean point
+    
+    Args:
+        x: Sorted x values as floats
+        y: y values as floats
+        threshold: Number of points to return
+    
+    Returns:
+        Tuple of (bucket mean x, bucket mean y)
+    """
+    n = len(x)
+    if threshold >= n or threshold < 1:
+        return x, y
+    
+    edges = _bucket_edges(0, n, threshold)
+    counts = np.diff(edges)
+    return (
+        np.add.reduceat(x, edges[:-1]) / counts,
+        np.add.reduceat(y, edges[:-1]) / counts
+    )
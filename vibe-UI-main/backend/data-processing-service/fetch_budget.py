@@ -0,0 +1,138 @@
+"""
+Memory-bounded connector fetches
+
+Results are collected batch by batch under a per-request budget. Small
+results stay in memory as before; once the estimated size of the buffered
+rows passes the memory budget, everything fetched so far and every later
+batch is spilled to an Arrow file in the dataset store and the caller gets
+a dataset handle to page through instead of the rows. Hard row and byte
+limits abort the fetch so a single query cannot fill the disk.
+"""
+import os
+import json
+from typing import List, Dict, Any, Optional, Iterable, Callable
+from dataset_store import DatasetStore, records_to_table
+
+# Server-wide limits; requests may lower them but never raise them
+DEFAULT_MEMORY_BUDGET = int(os.getenv('FETCH_MEMORY_BUDGET', 64 * 1024 * 1024))
+DEFAULT_MAX_ROWS = int(os.getenv('FETCH_MAX_ROWS', 10000000))
+DEFAULT_MAX_BYTES = int(os.getenv('FETCH_MAX_BYTES', 2 * 1024 * 1024 * 1024))
+
+# Records serialised per batch to estimate its size
+SIZE_SAMPLE = 100
+
+class ResultTooLarge(Exception):
+    """Raised when a fetch exceeds its row or byte limit"""
+    pass
+
+class FetchBudget:
+    """Per-request memory budget and result size limits"""
+    
+    def __init__(self, memory_bytes: int = DEFAULT_MEMORY_BUDGET, max_rows: int = DEFAULT_MAX_ROWS,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.memory_bytes = memory_bytes
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+    
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "FetchBudget":
+        """
+        Build the budget for a request
+        
+        Args:
+            config: Request body; "memory_budget", "max_rows" and "max_bytes" are optional
+        
+        Returns:
+            Budget clamped to the server limits
+        """
+        def limit(name: str, default: int) -> int:
+            value = config.get(name)
+            if value is None:
+                return default
+            value = int(value)
+            if value < 0:
+                raise ValueError(f"{name} must not be negative")
+            return min(value, default)
+        
+        return cls(
+            limit('memory_budget', DEFAULT_MEMORY_BUDGET),
+            limit('max_rows', DEFAULT_MAX_ROWS),
+            limit('max_bytes', DEFAULT_MAX_BYTES)
+        )
+
+class BoundedResult:
+    """Outcome of a bounded fetch: either the rows themselves or a spilled dataset"""
+    
+    def __init__(self, data: Optional[List[Dict[str, Any]]], row_count: int, dataset_handle: Optional[str] = None):
+        self.data = data
+        self.row_count = row_count
+        self.dataset_handle = dataset_handle
+    
+    @property
+    def spilled(self) -> bool:
+        """Whether the rows were written to disk instead of kept in memory"""
+        return self.data is None
+
+def estimate_batch_bytes(batch: List[Dict[str, Any]]) -> int:
+    """Estimate the serialised size of a batch from a sample of its records"""
+    if not batch:
+        return 0
+    sample = batch[:SIZE_SAMPLE]
+    sample_bytes = sum(len(json.dumps(record, default=str)) for record in sample)
+    return sample_bytes * len(batch) // len(sample)
+
+def fetch_bounded(batches: Iterable[List[Dict[str, Any]]], budget: FetchBudget, store: DatasetStore,
+                  on_batch: Optional[Callable[[List[Dict[str, Any]]], None]] = None) -> BoundedResult:
+    """
+    Collect record batches within a budget, spilling to the dataset store when it is exceeded
+    
+    Args:
+        batches: Iterable of record batches, e.g. from DataConnector.fetch_batches
+        budget: Memory budget and hard limits
+        store: Dataset store to spill to
+        on_batch: Called with every batch as it arrives (optional)
+    
+    Returns:
+        BoundedResult holding the rows, or the handle of the spilled dataset
+    
+    Raises:
+        ResultTooLarge: If the result exceeds max_rows or max_bytes
+    """
+    buffered: List[Dict[str, Any]] = []
+    buffered_bytes = 0
+    row_count = 0
+    writer = None
+    
+    try:
+        for batch in batches:
+            if not batch:
+                continue
+            row_count += len(batch)
+            if row_count > budget.max_rows:
+                raise ResultTooLarge(f"Result exceeds the limit of {budget.max_rows} rows")
+            if on_batch is not None:
+                on_batch(batch)
+            
+            if writer is None:
+                buffered.extend(batch)
+                buffered_bytes += estimate_batch_bytes(batch)
+                if buffered_bytes > budget.max_bytes:
+                    raise ResultTooLarge(f"Result exceeds the limit of {budget.max_bytes} bytes")
+                if buffered_bytes <= budget.memory_bytes:
+                    continue
+                # Over the memory budget: move the buffered rows to disk and keep writing there
+                writer = store.open_writer()
+                batch = buffered
+                buffered = []
+            
+            writer.write_table(records_to_table(batch))
+            if writer.bytes_written > budget.max_bytes:
+                raise ResultTooLarge(f"Result exceeds the limit of {budget.max_bytes} bytes")
+        
+        if writer is None:
+            return BoundedResult(buffered, row_count)
+        return BoundedResult(None, row_count, writer.commit())
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
\ No newline at end of file
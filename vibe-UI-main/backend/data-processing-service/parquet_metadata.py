@@ -0,0 +1,169 @@
+"""
+Parquet metadata answers from footer statistics
+
+Row counts come from the file footer, and per-column min, max and null
+counts from the statistics every row group stores there, so header tiles
+over large files are answered without reading any data pages. Only row
+groups written without statistics for a column are scanned, and only for
+that column.
+"""
+import datetime
+from decimal import Decimal
+from typing import List, Dict, Any, Optional
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+def _json_value(value: Any) -> Any:
+    """Convert statistics values to JSON friendly values"""
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, bytes):
+        return value.decode('utf-8', errors='replace')
+    return value
+
+class ColumnStatistics:
+    """Min, max and null count of one column, merged across row groups and files"""
+    
+    def __init__(self):
+        self.min = None
+        self.max = None
+        self.null_count = 0
+        self.sources = set()
+    
+    def _extend(self, minimum: Any, maximum: Any, null_count: int) -> None:
+        """Widen the range and add the null count"""
+        if minimum is not None and (self.min is None or minimum < self.min):
+            self.min = minimum
+        if maximum is not None and (self.max is None or maximum > self.max):
+            self.max = maximum
+        self.null_count += null_count
+    
+    def update(self, minimum: Any, maximum: Any, null_count: int, source: str) -> None:
+        """Fold the statistics of one row group, read from the footer or a scan, into the totals"""
+        self._extend(minimum, maximum, null_count)
+        self.sources.add(source)
+    
+    def merge(self, other: "ColumnStatistics") -> None:
+        """Fold the statistics of the same column from another file into these"""
+        self._extend(other.min, other.max, other.null_count)
+        self.sources |= other.sources
+    
+    def to_dict(self, row_count: int) -> Dict[str, Any]:
+        """Serialise the statistics for a file or dataset with row_count rows"""
+        if self.sources <= {"footer"}:
+            source = "footer"
+        elif self.sources == {"scan"}:
+            source = "scan"
+        else:
+            source = "mixed"
+        return {
+            "min": _json_value(self.min),
+            "max": _json_value(self.max),
+            "nullCount": self.null_count,
+            "count": row_count - self.null_count,
+            "source": source
+        }
+
+class ParquetStatistics:
+    """Row count and column statistics of one or more Parquet files"""
+    
+    def __init__(self):
+        self.row_count = 0
+        self.row_groups = 0
+        self.scanned_row_groups = 0
+        self.columns: Dict[str, ColumnStatistics] = {}
+    
+    def merge(self, other: "ParquetStatistics") -> None:
+        """Fold the statistics of another file into these"""
+        self.row_count += other.row_count
+        self.row_groups += other.row_groups
+        self.scanned_row_groups += other.scanned_row_groups
+        for name, column in other.columns.items():
+            if name not in self.columns:
+                self.columns[name] = ColumnStatistics()
+            self.columns[name].merge(column)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialise the statistics"""
+        return {
+            "rowCount": self.row_count,
+            "rowGroups": self.row_groups,
+            "scannedRowGroups": self.scanned_row_groups,
+            "columns": {name: column.to_dict(self.row_count) for name, column in self.columns.items()}
+        }
+
+def _footer_statistics(column_chunk) -> Optional[tuple]:
+    """Get (min, max, null_count) of a column chunk, or None if its statistics are incomplete"""
+    statistics = column_chunk.statistics
+    if statistics is None or not getattr(statistics, 'has_null_count', True):
+        return None
+    if not statistics.has_min_max:
+        # Chunks holding only nulls have no range but are fully described
+        if statistics.null_count == column_chunk.num_values:
+            return None, None, statistics.null_count
+        return None
+    minimum, maximum = statistics.min, statistics.max
+    # Float statistics can be NaN, which says nothing about the other values
+    if isinstance(minimum, float) and (minimum != minimum or maximum != maximum):
+        return None
+    return minimum, maximum, statistics.null_count
+
+def file_statistics(file_path: str, columns: Optional[List[str]] = None) -> ParquetStatistics:
+    """
+    Collect the statistics of a Parquet file
+    
+    Args:
+        file_path: Path of the Parquet file
+        columns: Top level columns to describe (default: all)
+    
+    Returns:
+        ParquetStatistics for the file
+    """
+    parquet_file = pq.ParquetFile(file_path)
+    metadata = parquet_file.metadata
+    names = parquet_file.schema_arrow.names
+    if columns is not None:
+        missing = [column for column in columns if column not in names]
+        if missing:
+            raise KeyError(f"Columns not found: {missing}")
+        names = [name for name in names if name in columns]
+    
+    # Statistics only describe leaf columns; nested columns are always scanned
+    leaf_index = {}
+    for index in range(metadata.num_columns):
+        path = metadata.schema.column(index).path
+        if path in names:
+            leaf_index[path] = index
+    
+    result = ParquetStatistics()
+    result.row_count = metadata.num_rows
+    result.row_groups = metadata.num_row_groups
+    result.columns = {name: ColumnStatistics() for name in names}
+    scanned = set()
+    for row_group in range(metadata.num_row_groups):
+        group = metadata.row_group(row_group)
+        to_scan = []
+        for name in names:
+            footer = _footer_statistics(group.column(leaf_index[name])) if name in leaf_index else None
+            if footer is None:
+                to_scan.append(name)
+            else:
+                result.columns[name].update(footer[0], footer[1], footer[2], "footer")
+        if to_scan:
+            # Read just the columns and row group the footer cannot describe
+            table = parquet_file.read_row_group(row_group, columns=to_scan)
+            for name in to_scan:
+                column = table.column(name)
+                minimum = maximum = None
+                try:
+                    extremes = pc.min_max(column).as_py()
+                    minimum, maximum = extremes["min"], extremes["max"]
+                except Exception:
+                    # Nested and other unorderable types only get a null count
+                    pass
+                result.columns[name].update(minimum, maximum, column.null_count, "scan")
+            scanned.add(row_group)
+    result.scanned_row_groups = len(scanned)
+    return result
\ No newline at end of file
@@ -0,0 +1,208 @@
+"""
+Cache keys and invalidation tags for connector queries
+
+SQL text is normalised before hashing so that queries differing only in
+whitespace, keyword case or comments share a cache entry, and the tables a
+query reads are turned into cache-service tags so that reloading one table
+invalidates exactly the results that depend on it.
+"""
+import os
+import re
+import hmac
+import json
+import hashlib
+import secrets
+from typing import List, Dict, Any, Tuple
+
+SQL_CONNECTORS = {"mysql", "postgresql", "mssql", "oracle", "sqlite"}
+FILE_CONNECTORS = {"csv", "excel", "json", "ndjson", "parquet", "avro"}
+
+# Connection parameters that identify a source; credentials are left out of keys and tags
+SOURCE_PARAMS = ("host", "port", "database", "file_path")
+# Connection parameters that authenticate against a source; never stored in warm-up recipes
+CREDENTIAL_PARAMS = ("username", "password")
+# Key of the credential fingerprints in cache keys; replicas must share it to
+# share cache entries, so a random one only suits a single process
+CACHE_KEY_SECRET = os.getenv('CACHE_KEY_SECRET') or secrets.token_hex(32)
+
+_TOKEN_PATTERN = re.compile(r"""
+    (?P<comment>--[^\n]*|/\*.*?\*/)
+  | (?P<string>'(?:[^']|'')*')
+  | (?P<quoted>"(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\])
+  | (?P<number>(?<![\w.])\d+(?:\.\d+)?(?:[eE][+-]?\d+)?(?![\w.]))
+  | (?P<word>[A-Za-z_][\w$]*)
+  | (?P<space>\s+)
+  | (?P<other>.)
+""", re.VERBOSE | re.DOTALL)
+
+_TABLE_KEYWORDS = {"from", "join", "update", "into"}
+
+# Words that end a table reference rather than name its alias
+_CLAUSE_WORDS = {
+    "where", "join", "inner", "left", "right", "full", "outer", "cross", "on", "using",
+    "group", "order", "having", "limit", "offset", "union", "except", "intersect",
+    "set", "values", "select", "natural", "window", "fetch", "for", "returning"
+}
+
+def normalize_sql(query: str) -> Tuple[str, List[Any]]:
+    """
+    Normalise a SQL query and lift its literals out as parameters
+    
+    Comments are dropped, whitespace is collapsed, unquoted words are
+    lower-cased and string and numeric literals are replaced with `?`.
+    
+    Args:
+        query: SQL text
+    
+    Returns:
+        Tuple of (normalised SQL, list of literal values in order)
+    """
+    parts = []
+    params: List[Any] = []
+    for match in _TOKEN_PATTERN.finditer(query):
+        kind = match.lastgroup
+        text = match.group()
+        if kind == "comment" or kind == "space":
+            if parts and parts[-1] != " ":
+                parts.append(" ")
+        elif kind == "string":
+            params.append(text[1:-1].replace("''", "'"))
+            parts.append("?")
+        elif kind == "number":
+            params.append(float(text) if any(c in text for c in ".eE") else int(text))
+            parts.append("?")
+        elif kind == "word":
+            parts.append(text.lower())
+        else:
+            parts.append(text)
+    
+    normalized = "".join(parts).strip()
+    # Spacing around punctuation carries no meaning
+    normalized = re.sub(r" ?([(),;=<>]) ?", r"\1", normalized).rstrip(";")
+    return normalized, params
+
+def extract_tables(query: str) -> List[str]:
+    """
+    Find the tables a SQL query reads or writes
+    
+    Args:
+        query: SQL text
+    
+    Returns:
+        Sorted list of lower-cased table names (quoting removed)
+    """
+    tokens = []
+    for match in _TOKEN_PATTERN.finditer(query):
+        kind = match.lastgroup
+        if kind in ("word", "quoted"):
+            tokens.append((kind, match.group()))
+        elif kind == "other" and match.group() in ",.()":
+            tokens.append(("punct", match.group()))
+        elif kind in ("string", "number"):
+            tokens.append((kind, match.group()))
+    
+    tables = set()
+    i = 0
+    while i < len(tokens):
+        kind, text = tokens[i]
+        if kind == "word" and text.lower() in _TABLE_KEYWORDS:
+            i += 1
+            # Read a comma separated list of (possibly schema qualified) names
+            while i < len(tokens) and tokens[i][0] in ("word", "quoted"):
+                name_parts = [_unquote(tokens[i][1])]
+                i += 1
+                while i + 1 < len(tokens) and tokens[i] == ("punct", ".") and tokens[i + 1][0] in ("word", "quoted"):
+                    name_parts.append(_unquote(tokens[i + 1][1]))
+                    i += 2
+                tables.add(".".join(name_parts).lower())
+                # Skip an alias, then continue if another table follows a comma
+                if i < len(tokens) and tokens[i][0] == "word" and tokens[i][1].lower() == "as":
+                    i += 1
+                if i < len(tokens) and tokens[i][0] == "word" and tokens[i][1].lower() not in _CLAUSE_WORDS:
+                    i += 1
+                if i < len(tokens) and tokens[i] == ("punct", ","):
+                    i += 1
+                    continue
+                break
+        else:
+            i += 1
+    return sorted(tables)
+
+def _unquote(name: str) -> str:
+    """Strip identifier quoting"""
+    if name[:1] in ('"', '`', '['):
+        return name[1:-1]
+    return name
+
+def source_id(connector_type: str, params: Dict[str, Any]) -> str:
+    """
+    Identify a data source by its type and location, without credentials
+    
+    The location is hashed so the id is safe to use in URL paths even for
+    file paths.
+    """
+    location = "|".join(str(params.get(key)) for key in SOURCE_PARAMS if params.get(key) is not None)
+    return f"{connector_type.lower()}:{hashlib.md5(location.encode()).hexdigest()[:12]}"
+
+def build_cache_key(connector_type: str, params: Dict[str, Any], query: Any) -> str:
+    """
+    Build the data connector cache key for a request
+    
+    SQL queries are normalised so equivalent spellings share a key; the
+    literal values are kept in the key so different filters do not collide.
+    """
+    connector_type = connector_type.lower()
+    if connector_type in SQL_CONNECTORS and isinstance(query, str):
+        normalized, literals = normalize_sql(query)
+        query_key: Any = {"sql": normalized, "params": literals}
+    elif isinstance(query, str) and query.strip().startswith("{"):
+        # JSON queries (MongoDB, Redis, Excel) are compared structurally
+        try:
+            query_key = json.loads(query)
+        except ValueError:
+            query_key = query
+    else:
+        query_key = query or ""
+    
+    # Credentials are only kept as a keyed fingerprint, so a request must
+    # present the same ones to read an entry without keys revealing them
+    key_data = {
+        "type": connector_type,
+        "params": without_credentials(params),
+        "credentials": credential_fingerprint(params) if connector_type not in FILE_CONNECTORS else None,
+        "query": query_key
+    }
+    key_hash = hashlib.md5(json.dumps(key_data, sort_keys=True, default=str).encode()).hexdigest()
+    return f"data_connector:{key_hash}"
+
+def credential_fingerprint(params: Dict[str, Any]) -> str:
+    """HMAC of the username and password in connection parameters, keyed with CACHE_KEY_SECRET"""
+    credentials = json.dumps([params.get(key) for key in CREDENTIAL_PARAMS], default=str)
+    return hmac.new(CACHE_KEY_SECRET.encode(), credentials.encode(), hashlib.sha256).hexdigest()
+
+def without_credentials(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy connection parameters without the username and password"""
+    return {key: value for key, value in params.items() if key not in CREDENTIAL_PARAMS}
+
+def table_tag(connector_type: str, params: Dict[str, Any], table: str) -> str:
+    """Cache tag for one table of one source"""
+    return f"table:{source_id(connector_type, params)}:{table.lower()}"
+
+def build_cache_tags(connector_type: str, params: Dict[str, Any], query: Any) -> List[str]:
+    """
+    Build the invalidation tags for a connector request
+    
+    SQL results are tagged with every table the query reads, MongoDB results
+    with their collection and file results with the file itself.
+    """
+    connector_type = connector_type.lower()
+    if connector_type in SQL_CONNECTORS and isinstance(query, str):
+        return [table_tag(connector_type, params, table) for table in extract_tables(query)]
+    if connector_type == "mongodb" and query:
+        query_dict = json.loads(query) if isinstance(query, str) else query
+        if query_dict.get("collection"):
+            return [table_tag(connector_type, params, query_dict["collection"])]
+        return []
+    if connector_type in FILE_CONNECTORS:
+        return [f"source:{source_id(connector_type, params)}"]
+    return []
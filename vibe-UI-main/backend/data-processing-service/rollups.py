@@ -0,0 +1,442 @@
+"""
+Incrementally maintained rollup cubes
+
+A cube keeps mergeable aggregates (count, sum, min, max) for one combination
+of dimension columns. Cubes are updated batch by batch as rows are ingested,
+and aggregation queries are answered by rolling up the smallest cube that
+covers the requested dimensions, filters and measures.
+
+Rows ingested from a named source (e.g. a connector query) are kept as that
+source's contribution: ingesting the source again replaces its contribution
+instead of adding to it, so refetching the same data never counts it twice.
+Only the replaced contribution is subtracted from the cubes and the new one
+added. A rollup keeps at most ROLLUP_MAX_SOURCES contributions, each for
+ROLLUP_SOURCE_TTL seconds after it was last ingested; older ones are dropped
+from the cubes, which then summarise the sources fetched recently.
+"""
+import os
+import math
+import time
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+import pandas as pd
+
+AGGREGATIONS = ["sum", "min", "max", "count", "avg"]
+
+# Source contributions kept per rollup, and how long one is kept after its last ingest
+ROLLUP_MAX_SOURCES = int(os.getenv('ROLLUP_MAX_SOURCES', 1000))
+ROLLUP_SOURCE_TTL = int(os.getenv('ROLLUP_SOURCE_TTL', 24 * 3600))
+
+def _python_value(value: Any) -> Any:
+    """Convert numpy scalars and missing values to plain Python values"""
+    if value is None:
+        return None
+    if hasattr(value, "item"):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+class MeasureStats:
+    """Mergeable statistics for one measure in one cube cell"""
+    
+    __slots__ = ("sum", "min", "max", "count")
+    
+    def __init__(self, total: float = 0.0, minimum: Optional[float] = None, maximum: Optional[float] = None, count: int = 0):
+        self.sum = total
+        self.min = minimum
+        self.max = maximum
+        self.count = count
+    
+    def merge(self, other: "MeasureStats") -> None:
+        """Fold another set of statistics into this one"""
+        if other.count == 0:
+            return
+        self.sum += other.sum
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self.count += other.count
+    
+    def value(self, aggregation: str) -> Any:
+        """Get the value of an aggregation"""
+        if aggregation == "count":
+            return self.count
+        if self.count == 0:
+            return None
+        if aggregation == "avg":
+            return self.sum / self.count
+        return getattr(self, aggregation)
+
+class RollupCube:
+    """Aggregates of a set of measures grouped by a fixed set of dimensions"""
+    
+    def __init__(self, dimensions: List[str], measures: List[str]):
+        if not measures:
+            raise ValueError("A rollup cube needs at least one measure")
+        self.dimensions = tuple(dimensions)
+        self.measures = tuple(measures)
+        # Dimension value tuple -> [row count, {measure: MeasureStats}]
+        self.cells: Dict[Tuple, List[Any]] = {}
+    
+    def covers(self, dimensions: Iterable[str], measures: Iterable[str]) -> bool:
+        """Check if this cube can answer a query over the given dimensions and measures"""
+        return set(dimensions) <= set(self.dimensions) and set(measures) <= set(self.measures)
+    
+    def ingest(self, df: pd.DataFrame) -> None:
+        """
+        Fold a batch of rows into the cube
+        
+        Args:
+            df: DataFrame holding the new rows
+        """
+        if df.empty:
+            return
+        
+        frame = pd.DataFrame(index=df.index)
+        for dimension in self.dimensions:
+            frame[dimension] = df[dimension] if dimension in df.columns else None
+        for measure in self.measures:
+            if measure in df.columns:
+                frame[f"__m_{measure}"] = pd.to_numeric(df[measure], errors='coerce')
+            else:
+                frame[f"__m_{measure}"] = float('nan')
+        
+        # A cube without dimensions is a single grand-total cell
+        group_columns = list(self.dimensions) or ["__all"]
+        if not self.dimensions:
+            frame["__all"] = 0
+        grouped = frame.groupby(group_columns, dropna=False, sort=False)
+        
+        sizes = grouped.size()
+        aggregates = {}
+        for measure in self.measures:
+            column = grouped[f"__m_{measure}"]
+            aggregates[measure] = (column.sum(), column.min(), column.max(), column.count())
+        
+        for position, key in enumerate(sizes.index):
+            if not isinstance(key, tuple):
+                key = (key,)
+            key = tuple(_python_value(value) for value in key) if self.dimensions else ()
+            cell = self.cells.get(key)
+            if cell is None:
+                cell = self.cells[key] = [0, {measure: MeasureStats() for measure in self.measures}]
+            cell[0] += int(sizes.iloc[position])
+            for measure, (sums, mins, maxs, counts) in aggregates.items():
+                count = int(counts.iloc[position])
+                if count:
+                    cell[1][measure].merge(MeasureStats(
+                        float(sums.iloc[position]),
+                        _python_value(mins.iloc[position]),
+                        _python_value(maxs.iloc[position]),
+                        count
+                    ))
+    
+    def merge(self, other: "RollupCube") -> None:
+        """Fold the cells of a cube with the same dimensions and measures into this one"""
+        for key, (row_count, stats) in other.cells.items():
+            cell = self.cells.get(key)
+            if cell is None:
+                cell = self.cells[key] = [0, {measure: MeasureStats() for measure in self.measures}]
+            cell[0] += row_count
+            for measure in self.measures:
+                cell[1][measure].merge(stats[measure])
+    
+    def subtract(self, other: "RollupCube") -> set:
+        """
+        Remove the cells of a cube previously merged into this one
+        
+        Sums and counts are subtracted; a minimum or maximum that the removed
+        rows may have supplied cannot be, so the keys of those cells are
+        returned for recompute_cell.
+        """
+        stale = set()
+        for key, (row_count, stats) in other.cells.items():
+            cell = self.cells.get(key)
+            if cell is None:
+                continue
+            cell[0] -= row_count
+            if cell[0] <= 0:
+                del self.cells[key]
+                continue
+            for measure in self.measures:
+                removed = stats[measure]
+                if removed.count == 0:
+                    continue
+                kept = cell[1][measure]
+                kept.sum -= removed.sum
+                kept.count -= removed.count
+                if kept.count <= 0:
+                    cell[1][measure] = MeasureStats()
+                elif removed.min == kept.min or removed.max == kept.max:
+                    stale.add(key)
+        return stale
+    
+    def recompute_cell(self, key: Tuple, parts: Iterable["RollupCube"]) -> None:
+        """Rebuild one cell from the cubes whose merge makes up this one"""
+        cell = [0, {measure: MeasureStats() for measure in self.measures}]
+        for part in parts:
+            part_cell = part.cells.get(key)
+            if part_cell is None:
+                continue
+            cell[0] += part_cell[0]
+            for measure in self.measures:
+                cell[1][measure].merge(part_cell[1][measure])
+        if cell[0]:
+            self.cells[key] = cell
+        else:
+            self.cells.pop(key, None)
+    
+    def empty_copy(self) -> "RollupCube":
+        """Get a cube with the same definition and no rows"""
+        return RollupCube(list(self.dimensions), list(self.measures))
+    
+    def query(self, group_by: List[str], measures: Dict[str, List[str]],
+              filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Roll the cube up to the requested dimensions
+        
+        Args:
+            group_by: Dimensions to group the result by
+            measures: Measure name -> list of aggregations ("sum", "min", "max", "count", "avg")
+            filters: Dimension -> value, or list of accepted values (optional)
+        
+        Returns:
+            List of aggregated records, one per group
+        """
+        filters = filters or {}
+        positions = {dimension: i for i, dimension in enumerate(self.dimensions)}
+        group_positions = [positions[dimension] for dimension in group_by]
+        filter_checks = [
+            (positions[dimension], set(value) if isinstance(value, list) else {value})
+            for dimension, value in filters.items()
+        ]
+        
+        groups: Dict[Tuple, List[Any]] = {}
+        for key, (row_count, stats) in self.cells.items():
+            if any(key[position] not in accepted for position, accepted in filter_checks):
+                continue
+            group_key = tuple(key[position] for position in group_positions)
+            group = groups.get(group_key)
+            if group is None:
+                group = groups[group_key] = [0, {measure: MeasureStats() for measure in measures}]
+            group[0] += row_count
+            for measure in measures:
+                group[1][measure].merge(stats[measure])
+        
+        results = []
+        for group_key, (row_count, stats) in groups.items():
+            record = dict(zip(group_by, group_key))
+            record["count"] = row_count
+            for measure, aggregations in measures.items():
+                for aggregation in aggregations:
+                    record[f"{measure}_{aggregation}"] = stats[measure].value(aggregation)
+            results.append(record)
+        return results
+    
+    def describe(self) -> Dict[str, Any]:
+        """Get the cube definition and size"""
+        return {
+            "dimensions": list(self.dimensions),
+            "measures": list(self.measures),
+            "cellCount": len(self.cells)
+        }
+
+class RollupManager:
+    """Named sets of rollup cubes, maintained as rows are ingested"""
+    
+    def __init__(self):
+        # Cubes answering queries: the unsourced rows plus every source's contribution
+        self.rollups: Dict[str, List[RollupCube]] = {}
+        self.row_counts: Dict[str, int] = {}
+        # Cubes and row count of the rows ingested without a source
+        self.unsourced: Dict[str, List[RollupCube]] = {}
+        self.unsourced_rows: Dict[str, int] = {}
+        # Rollup -> source -> (version, cubes, row count, monotonic expiry) of its
+        # latest contribution, least recently ingested first
+        self.sources: Dict[str, "OrderedDict[str, Tuple[Optional[str], List[RollupCube], int, float]]"] = {}
+        self.lock = threading.Lock()
+    
+    def declare(self, name: str, cubes: List[Dict[str, List[str]]]) -> None:
+        """
+        Declare (or redeclare) the cubes maintained for a rollup
+        
+        Args:
+            name: Rollup name, usually the data source it summarises
+            cubes: List of {"dimensions": [...], "measures": [...]} definitions
+        """
+        if not cubes:
+            raise ValueError("At least one cube definition is required")
+        built = [RollupCube(cube.get("dimensions", []), cube.get("measures", [])) for cube in cubes]
+        with self.lock:
+            self.rollups[name] = built
+            self.row_counts[name] = 0
+            self.unsourced[name] = [cube.empty_copy() for cube in built]
+            self.unsourced_rows[name] = 0
+            self.sources[name] = OrderedDict()
+    
+    def ingest(self, name: str, batches: Iterable[List[Dict[str, Any]]], source: Optional[str] = None,
+               version: Optional[str] = None) -> int:
+        """
+        Incrementally update every cube of a rollup with new rows
+        
+        Args:
+            name: Rollup name
+            batches: Iterable of record batches
+            source: Identifies where the rows come from (e.g. a connector query's
+                cache key); the rows replace whatever this source contributed
+                before instead of being added to it (optional)
+            version: Identifies the content of the rows (e.g. a dataset handle);
+                a source already ingested at this version is skipped without
+                reading the batches (optional)
+        
+        Returns:
+            Number of rows ingested
+        """
+        if name not in self.rollups:
+            raise KeyError(name)
+        if source is None:
+            return self._ingest_unsourced(name, batches)
+        
+        with self.lock:
+            unsourced = self.unsourced[name]
+            previous = self.sources[name].get(source)
+            if version is not None and previous is not None and previous[0] == version:
+                self.sources[name][source] = previous[:3] + (time.monotonic() + ROLLUP_SOURCE_TTL,)
+                self.sources[name].move_to_end(source)
+                return 0
+        
+        # Build the contribution on the side, then swap it in
+        cubes = [cube.empty_copy() for cube in unsourced]
+        ingested = 0
+        for batch in batches:
+            if not batch:
+                continue
+            df = pd.DataFrame(batch)
+            for cube in cubes:
+                cube.ingest(df)
+            ingested += len(batch)
+        
+        with self.lock:
+            if self.unsourced.get(name) is not unsourced:
+                # Redeclared meanwhile; the contribution was built for the old cubes
+                raise KeyError(name)
+            contributions = self.sources[name]
+            previous = contributions.pop(source, None)
+            if previous is not None:
+                self._remove_contribution(name, previous)
+            for position, cube in enumerate(self.rollups[name]):
+                cube.merge(cubes[position])
+            self.row_counts[name] += ingested
+            contributions[source] = (version, cubes, ingested, time.monotonic() + ROLLUP_SOURCE_TTL)
+            self._expire_sources(name)
+        return ingested
+    
+    def _ingest_unsourced(self, name: str, batches: Iterable[List[Dict[str, Any]]]) -> int:
+        """Add rows that do not belong to a source; they accumulate until the rollup is redeclared"""
+        ingested = 0
+        for batch in batches:
+            if not batch:
+                continue
+            df = pd.DataFrame(batch)
+            with self.lock:
+                for cube in self.unsourced[name] + self.rollups[name]:
+                    cube.ingest(df)
+                self.unsourced_rows[name] += len(batch)
+                self.row_counts[name] += len(batch)
+            ingested += len(batch)
+        return ingested
+    
+    def _remove_contribution(self, name: str, contribution: Tuple[Optional[str], List[RollupCube], int, float]) -> None:
+        """
+        Take a contribution that is no longer in self.sources out of the cubes
+        
+        Cells whose minimum or maximum may have come from it are rebuilt from
+        the unsourced rows and the remaining contributions; the caller holds
+        the lock.
+        """
+        _, cubes, contributed_rows, _ = contribution
+        for position, cube in enumerate(self.rollups[name]):
+            stale = cube.subtract(cubes[position])
+            if stale:
+                parts = [self.unsourced[name][position]] + [other[1][position] for other in self.sources[name].values()]
+                for key in stale:
+                    cube.recompute_cell(key, parts)
+        self.row_counts[name] -= contributed_rows
+    
+    def _expire_sources(self, name: str) -> None:
+        """Drop contributions past ROLLUP_SOURCE_TTL or beyond ROLLUP_MAX_SOURCES; the caller holds the lock"""
+        contributions = self.sources[name]
+        now = time.monotonic()
+        # Every ingest moves its source to the end, so the first one expires first
+        while contributions:
+            source, contribution = next(iter(contributions.items()))
+            if len(contributions) <= ROLLUP_MAX_SOURCES and contribution[3] > now:
+                break
+            del contributions[source]
+            self._remove_contribution(name, contribution)
+    
+    def find_cube(self, name: str, dimensions: Iterable[str], measures: Iterable[str]) -> Optional[RollupCube]:
+        """Find the smallest cube of a rollup that covers the given dimensions and measures"""
+        if name not in self.rollups:
+            raise KeyError(name)
+        dimensions = list(dimensions)
+        measures = list(measures)
+        candidates = [cube for cube in self.rollups[name] if cube.covers(dimensions, measures)]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda cube: len(cube.cells))
+    
+    def query(self, name: str, group_by: List[str], measures: Dict[str, List[str]],
+              filters: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Answer an aggregation query from the smallest covering cube
+        
+        Returns:
+            Dictionary with the aggregated records and the cube used, or None if no cube covers the query
+        """
+        validate_aggregations(measures)
+        filters = filters or {}
+        with self.lock:
+            cube = self.find_cube(name, list(group_by) + list(filters), measures)
+            if cube is None:
+                return None
+            return {
+                "data": cube.query(group_by, measures, filters),
+                "servedBy": cube.describe()
+            }
+    
+    def describe(self, name: str) -> Dict[str, Any]:
+        """Get the cubes and ingested row count of a rollup"""
+        if name not in self.rollups:
+            raise KeyError(name)
+        with self.lock:
+            return {
+                "name": name,
+                "rowCount": self.row_counts[name],
+                "sourceCount": len(self.sources[name]),
+                "cubes": [cube.describe() for cube in self.rollups[name]]
+            }
+
+def validate_aggregations(measures: Dict[str, List[str]]) -> None:
+    """Reject unknown aggregation names"""
+    if not measures:
+        raise ValueError("At least one measure is required")
+    for aggregations in measures.values():
+        for aggregation in aggregations:
+            if aggregation not in AGGREGATIONS:
+                raise ValueError(f"Invalid aggregation '{aggregation}'. Available aggregations: {AGGREGATIONS}")
+
+def aggregate_batches(batches: Iterable[List[Dict[str, Any]]], group_by: List[str], measures: Dict[str, List[str]],
+                      filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Aggregate raw rows by building a throwaway cube with exactly the query dimensions"""
+    validate_aggregations(measures)
+    filters = filters or {}
+    cube = RollupCube(list(dict.fromkeys(list(group_by) + list(filters))), list(measures))
+    for batch in batches:
+        if batch:
+            cube.ingest(pd.DataFrame(batch))
+    return cube.query(group_by, measures, filters)
+
+# Global instance
+rollup_manager = RollupManager()
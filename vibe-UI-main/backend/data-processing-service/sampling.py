@@ -0,0 +1,176 @@
+"""
+Bounded, seedable sampling over streams of record batches
+
+All samplers make a single pass over the input and keep at most `size`
+records per group, so their cost does not depend on the size of the source.
+"""
+import math
+import random
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+import pandas as pd
+
+# strftime formats used to label time buckets
+TIME_BUCKET_FORMATS = {
+    "hour": "%Y-%m-%dT%H:00",
+    "day": "%Y-%m-%d",
+    "week": "%G-W%V",
+    "month": "%Y-%m",
+    "year": "%Y"
+}
+
+# Upper bound on the number of strata or time buckets kept in memory
+DEFAULT_MAX_GROUPS = 10000
+
+class Reservoir:
+    """Fixed-size uniform reservoir using Li's Algorithm L"""
+    
+    def __init__(self, size: int, rng: random.Random):
+        if size <= 0:
+            raise ValueError("Sample size must be positive")
+        self.size = size
+        self.rng = rng
+        self.items: List[Tuple[int, Any]] = []
+        self.seen = 0
+        self._weight = math.exp(math.log(self._uniform()) / size)
+        self._next = size + self._skip()
+    
+    def _uniform(self) -> float:
+        """Draw from the open interval (0, 1)"""
+        value = self.rng.random()
+        while value == 0.0:
+            value = self.rng.random()
+        return value
+    
+    def _skip(self) -> int:
+        """Number of items to skip before the next replacement"""
+        return int(math.floor(math.log(self._uniform()) / math.log(1 - self._weight)))
+    
+    def add(self, position: int, item: Any) -> None:
+        """Offer an item seen at the given stream position"""
+        if self.seen < self.size:
+            self.items.append((position, item))
+        elif self.seen == self._next:
+            self.items[self.rng.randrange(self.size)] = (position, item)
+            self._weight *= math.exp(math.log(self._uniform()) / self.size)
+            self._next += self._skip() + 1
+        self.seen += 1
+    
+    def sorted_items(self) -> List[Tuple[int, Any]]:
+        """Sampled items in the order they appeared in the stream"""
+        return sorted(self.items, key=lambda pair: pair[0])
+
+def reservoir_sample(batches: Iterable[List[Dict[str, Any]]], size: int, seed: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Draw a uniform sample of at most `size` records in one pass
+    
+    Args:
+        batches: Iterable of record batches
+        size: Maximum number of records to return
+        seed: Random seed; the same seed and input give the same sample
+    
+    Returns:
+        Dictionary with the sampled records and source row count
+    """
+    reservoir = Reservoir(size, random.Random(seed))
+    position = 0
+    for batch in batches:
+        for record in batch:
+            reservoir.add(position, record)
+            position += 1
+    
+    return {
+        "data": [record for _, record in reservoir.sorted_items()],
+        "sourceRowCount": position
+    }
+
+def _grouped_sample(labelled_batches: Iterable[Tuple[List[Dict[str, Any]], List[Any]]], size: int, seed: Optional[int],
+                    max_groups: int) -> Dict[str, Any]:
+    """Keep one reservoir per group label and merge them back in stream order"""
+    rng = random.Random(seed)
+    reservoirs: Dict[Any, Reservoir] = {}
+    position = 0
+    skipped = 0
+    for batch, labels in labelled_batches:
+        for record, label in zip(batch, labels):
+            if label is None:
+                skipped += 1
+            else:
+                reservoir = reservoirs.get(label)
+                if reservoir is None:
+                    if len(reservoirs) >= max_groups:
+                        raise ValueError(f"Sample has more than {max_groups} groups")
+                    reservoir = reservoirs[label] = Reservoir(size, rng)
+                reservoir.add(position, record)
+            position += 1
+    
+    sampled = []
+    for reservoir in reservoirs.values():
+        sampled.extend(reservoir.items)
+    sampled.sort(key=lambda pair: pair[0])
+    
+    return {
+        "data": [record for _, record in sampled],
+        "sourceRowCount": position,
+        "groupCount": len(reservoirs),
+        "groups": {str(label): reservoir.seen for label, reservoir in reservoirs.items()},
+        "skippedRowCount": skipped
+    }
+
+def stratified_sample(batches: Iterable[List[Dict[str, Any]]], key_columns: List[str], size: int,
+                      seed: Optional[int] = None, max_groups: int = DEFAULT_MAX_GROUPS) -> Dict[str, Any]:
+    """
+    Draw up to `size` records from every combination of key column values
+    
+    Args:
+        batches: Iterable of record batches
+        key_columns: Columns that define the strata
+        size: Maximum number of records per stratum
+        seed: Random seed
+        max_groups: Maximum number of strata before the sample is rejected
+    
+    Returns:
+        Dictionary with the sampled records, source row count and per-stratum counts
+    """
+    if not key_columns:
+        raise ValueError("At least one key column is required for stratified sampling")
+    
+    def labelled():
+        for batch in batches:
+            labels = [
+                "|".join(str(record.get(column)) for column in key_columns)
+                for record in batch
+            ]
+            yield batch, labels
+    
+    return _grouped_sample(labelled(), size, seed, max_groups)
+
+def time_bucket_sample(batches: Iterable[List[Dict[str, Any]]], time_column: str, size: int, bucket: str = "day",
+                       seed: Optional[int] = None, max_groups: int = DEFAULT_MAX_GROUPS) -> Dict[str, Any]:
+    """
+    Draw up to `size` records from every time bucket
+    
+    Args:
+        batches: Iterable of record batches
+        time_column: Column holding the record timestamp
+        size: Maximum number of records per bucket
+        bucket: Bucket width ("hour", "day", "week", "month" or "year")
+        seed: Random seed
+        max_groups: Maximum number of buckets before the sample is rejected
+    
+    Returns:
+        Dictionary with the sampled records, source row count and per-bucket counts.
+        Records whose timestamp cannot be parsed are skipped.
+    """
+    if bucket not in TIME_BUCKET_FORMATS:
+        raise ValueError(f"Invalid bucket. Available buckets: {list(TIME_BUCKET_FORMATS)}")
+    bucket_format = TIME_BUCKET_FORMATS[bucket]
+    
+    def labelled():
+        for batch in batches:
+            # Parse the whole batch at once rather than record by record
+            times = pd.to_datetime(pd.Series([record.get(time_column) for record in batch], dtype=object),
+                                   format='mixed', errors='coerce')
+            labels = [None if pd.isna(label) else label for label in times.dt.strftime(bucket_format)]
+            yield batch, labels
+    
+    return _grouped_sample(labelled(), size, seed, max_groups)
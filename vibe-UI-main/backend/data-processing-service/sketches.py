@@ -0,0 +1,347 @@
+"""
+Mergeable approximate column sketches
+
+Each column keeps a HyperLogLog for distinct counts, a Space-Saving summary
+for its most frequent values and, for numeric columns, a KLL sketch for
+quantiles. Sketches are updated one batch at a time, use bounded memory and
+can be merged, so profiles of very large tables are answered without a scan.
+"""
+import base64
+import math
+import random
+from typing import List, Dict, Any, Optional
+import numpy as np
+import pandas as pd
+
+class HyperLogLog:
+    """HyperLogLog distinct counter with 2^precision registers"""
+    
+    def __init__(self, precision: int = 12):
+        if not 4 <= precision <= 16:
+            raise ValueError("HyperLogLog precision must be between 4 and 16")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+    
+    def update_hashes(self, hashes: np.ndarray) -> None:
+        """Add 64-bit hashes of values to the sketch"""
+        if len(hashes) == 0:
+            return
+        hashes = hashes.astype(np.uint64, copy=False)
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        remainder = hashes & np.uint64((1 << (64 - self.precision)) - 1)
+        # frexp gives the exact bit length because the remainder fits in a float mantissa
+        _, bit_length = np.frexp(remainder.astype(np.float64))
+        rank = (64 - self.precision - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+    
+    def merge(self, other: "HyperLogLog") -> None:
+        """Fold another sketch with the same precision into this one"""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+    
+    def estimate(self) -> int:
+        """Estimate the number of distinct values"""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            return int(round(m * math.log(m / zeros)))
+        return int(round(raw))
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialise the sketch to JSON-compatible data"""
+        return {
+            "precision": self.precision,
+            "registers": base64.b64encode(self.registers.tobytes()).decode('ascii')
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HyperLogLog":
+        """Rebuild a sketch from to_dict output"""
+        sketch = cls(data["precision"])
+        sketch.registers = np.frombuffer(base64.b64decode(data["registers"]), dtype=np.uint8).copy()
+        return sketch
+
+class SpaceSaving:
+    """Space-Saving heavy hitters summary with a fixed number of counters"""
+    
+    def __init__(self, capacity: int = 64):
+        self.capacity = capacity
+        # value -> [count, overestimation error]
+        self.counters: Dict[Any, List[int]] = {}
+    
+    def update_counts(self, counts: Dict[Any, int]) -> None:
+        """Add pre-aggregated value counts from one batch"""
+        for value, count in counts.items():
+            counter = self.counters.get(value)
+            if counter is not None:
+                counter[0] += count
+            elif len(self.counters) < self.capacity:
+                self.counters[value] = [count, 0]
+            else:
+                # Evict the smallest counter and inherit its count as error
+                evicted = min(self.counters, key=lambda key: self.counters[key][0])
+                floor = self.counters.pop(evicted)[0]
+                self.counters[value] = [floor + count, floor]
+    
+    def merge(self, other: "SpaceSaving") -> None:
+        """Fold another summary into this one, keeping the largest counters"""
+        for value, (count, error) in other.counters.items():
+            counter = self.counters.setdefault(value, [0, 0])
+            counter[0] += count
+            counter[1] += error
+        if len(self.counters) > self.capacity:
+            kept = sorted(self.counters.items(), key=lambda item: item[1][0], reverse=True)[:self.capacity]
+            self.counters = dict(kept)
+    
+    def top(self, k: int = 10) -> List[Dict[str, Any]]:
+        """Get the k most frequent values with their estimated counts"""
+        ranked = sorted(self.counters.items(), key=lambda item: item[1][0], reverse=True)[:k]
+        return [{"value": value, "count": count, "error": error} for value, (count, error) in ranked]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialise the sketch to JSON-compatible data"""
+        return {
+            "capacity": self.capacity,
+            "counters": [[value, count, error] for value, (count, error) in self.counters.items()]
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SpaceSaving":
+        """Rebuild a sketch from to_dict output"""
+        sketch = cls(data["capacity"])
+        sketch.counters = {value: [count, error] for value, count, error in data["counters"]}
+        return sketch
+
+class KLLSketch:
+    """KLL quantile sketch (Karnin, Lang and Liberty)"""
+    
+    def __init__(self, k: int = 200, seed: Optional[int] = None):
+        self.k = k
+        self.compactors: List[List[float]] = [[]]
+        self.count = 0
+        self.rng = random.Random(seed)
+    
+    def _capacity(self, level: int) -> int:
+        """Number of items a level may hold; lower levels get geometrically less room"""
+        depth = len(self.compactors) - level - 1
+        return max(2, int(math.ceil(self.k * (2.0 / 3.0) ** depth)))
+    
+    def _compress(self) -> None:
+        """Compact full levels, promoting every other sorted item, until the sketch fits"""
+        while sum(len(items) for items in self.compactors) > sum(self._capacity(level) for level in range(len(self.compactors))):
+            for level, items in enumerate(self.compactors):
+                if len(items) >= self._capacity(level):
+                    if level + 1 == len(self.compactors):
+                        self.compactors.append([])
+                    items.sort()
+                    # Keep one item back when the count is odd so no weight is lost
+                    leftover = [items.pop()] if len(items) % 2 else []
+                    offset = self.rng.randrange(2)
+                    self.compactors[level + 1].extend(items[offset::2])
+                    self.compactors[level] = leftover
+                    break
+    
+    def update_many(self, values: List[float]) -> None:
+        """Add a batch of numeric values"""
+        if not values:
+            return
+        self.compactors[0].extend(values)
+        self.count += len(values)
+        self._compress()
+    
+    def merge(self, other: "KLLSketch") -> None:
+        """Fold another sketch into this one"""
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+        self.count += other.count
+        self._compress()
+    
+    def quantiles(self, fractions: List[float]) -> List[Optional[float]]:
+        """Estimate the values at the given quantile fractions (0.0 - 1.0)"""
+        weighted = sorted(
+            (value, 1 << level)
+            for level, items in enumerate(self.compactors)
+            for value in items
+        )
+        if not weighted:
+            return [None for _ in fractions]
+        
+        total = sum(weight for _, weight in weighted)
+        results = []
+        for fraction in fractions:
+            target = fraction * total
+            cumulative = 0
+            chosen = weighted[-1][0]
+            for value, weight in weighted:
+                cumulative += weight
+                if cumulative >= target:
+                    chosen = value
+                    break
+            results.append(chosen)
+        return results
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialise the sketch to JSON-compatible data"""
+        return {"k": self.k, "count": self.count, "compactors": self.compactors}
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "KLLSketch":
+        """Rebuild a sketch from to_dict output"""
+        sketch = cls(data["k"])
+        sketch.count = data["count"]
+        sketch.compactors = [list(items) for items in data["compactors"]]
+        return sketch
+
+def _plain_value(value: Any) -> Any:
+    """Convert numpy scalars and other objects to JSON-friendly Python values"""
+    if hasattr(value, "item"):
+        value = value.item()
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+class ColumnSketch:
+    """All sketches kept for a single column"""
+    
+    def __init__(self):
+        self.count = 0
+        self.null_count = 0
+        self.distinct = HyperLogLog()
+        self.frequent = SpaceSaving()
+        self.quantiles: Optional[KLLSketch] = None
+        self.min = None
+        self.max = None
+    
+    def update(self, series: pd.Series) -> None:
+        """Add one batch of column values"""
+        self.count += len(series)
+        values = series.dropna()
+        self.null_count += len(series) - len(values)
+        if values.empty:
+            return
+        
+        # Hash the string form so the same value hashes identically in every batch
+        as_text = values.astype(str).to_numpy(dtype=object)
+        self.distinct.update_hashes(pd.util.hash_array(as_text))
+        
+        counts = values.value_counts()
+        self.frequent.update_counts({_plain_value(value): int(count) for value, count in counts.items()})
+        
+        numeric = pd.to_numeric(values, errors='coerce') if values.dtype == object else values
+        if pd.api.types.is_numeric_dtype(numeric) and not pd.api.types.is_bool_dtype(numeric):
+            numeric = numeric.dropna()
+            if len(numeric) == len(values):
+                if self.quantiles is None:
+                    self.quantiles = KLLSketch(seed=0)
+                self.quantiles.update_many(numeric.astype(float).tolist())
+                low, high = float(numeric.min()), float(numeric.max())
+                self.min = low if self.min is None else min(self.min, low)
+                self.max = high if self.max is None else max(self.max, high)
+    
+    def merge(self, other: "ColumnSketch") -> None:
+        """Fold another column sketch into this one"""
+        self.count += other.count
+        self.null_count += other.null_count
+        self.distinct.merge(other.distinct)
+        self.frequent.merge(other.frequent)
+        if other.quantiles is not None:
+            if self.quantiles is None:
+                self.quantiles = KLLSketch(seed=0)
+            self.quantiles.merge(other.quantiles)
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+    
+    def profile(self, top_k: int = 10) -> Dict[str, Any]:
+        """Summarise the column from its sketches"""
+        summary = {
+            "count": self.count,
+            "nullCount": self.null_count,
+            "distinctCount": self.distinct.estimate(),
+            "topValues": self.frequent.top(top_k)
+        }
+        if self.quantiles is not None:
+            p25, p50, p75 = self.quantiles.quantiles([0.25, 0.5, 0.75])
+            summary.update({
+                "min": self.min,
+                "max": self.max,
+                "quantiles": {"p25": p25, "p50": p50, "p75": p75}
+            })
+        return summary
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialise the sketch to JSON-compatible data"""
+        return {
+            "count": self.count,
+            "nullCount": self.null_count,
+            "distinct": self.distinct.to_dict(),
+            "frequent": self.frequent.to_dict(),
+            "quantiles": self.quantiles.to_dict() if self.quantiles is not None else None,
+            "min": self.min,
+            "max": self.max
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ColumnSketch":
+        """Rebuild a sketch from to_dict output"""
+        sketch = cls()
+        sketch.count = data["count"]
+        sketch.null_count = data["nullCount"]
+        sketch.distinct = HyperLogLog.from_dict(data["distinct"])
+        sketch.frequent = SpaceSaving.from_dict(data["frequent"])
+        sketch.quantiles = KLLSketch.from_dict(data["quantiles"]) if data["quantiles"] else None
+        sketch.min = data["min"]
+        sketch.max = data["max"]
+        return sketch
+
+class DatasetSketch:
+    """Column sketches for a whole dataset"""
+    
+    def __init__(self):
+        self.row_count = 0
+        self.columns: Dict[str, ColumnSketch] = {}
+    
+    def update(self, records: List[Dict[str, Any]]) -> None:
+        """Add one batch of records"""
+        if not records:
+            return
+        df = pd.DataFrame(records)
+        self.row_count += len(df)
+        for column in df.columns:
+            self.columns.setdefault(str(column), ColumnSketch()).update(df[column])
+    
+    def merge(self, other: "DatasetSketch") -> None:
+        """Fold another dataset sketch into this one"""
+        self.row_count += other.row_count
+        for name, column in other.columns.items():
+            if name in self.columns:
+                self.columns[name].merge(column)
+            else:
+                self.columns[name] = column
+    
+    def profile(self, top_k: int = 10) -> Dict[str, Any]:
+        """Summarise every column"""
+        return {
+            "rowCount": self.row_count,
+            "columns": {name: column.profile(top_k) for name, column in self.columns.items()}
+        }
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialise the sketch to JSON-compatible data"""
+        return {
+            "rowCount": self.row_count,
+            "columns": {name: column.to_dict() for name, column in self.columns.items()}
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DatasetSketch":
+        """Rebuild a sketch from to_dict output"""
+        sketch = cls()
+        sketch.row_count = data["rowCount"]
+        sketch.columns = {name: ColumnSketch.from_dict(column) for name, column in data["columns"].items()}
+        return sketch
@@ -2,8 +2,21 @@
 Test script for new data connectors
 """
 import os
+import sys
 import json
+import sqlite3
+import tempfile
+import numpy as np
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared'))
 from data_connectors import create_connector
+from dataset_store import DatasetStore
+from fetch_budget import FetchBudget, fetch_bounded
+from sampling import reservoir_sample, stratified_sample, time_bucket_sample
+from sketches import DatasetSketch
+from query_cache import build_cache_key, build_cache_tags, extract_tables, normalize_sql, table_tag
+import rollups
+from rollups import RollupManager
+import downsampling
 
 def test_json_connector():
     """Test JSON connector with sample data"""
@@ -55,6 +68,855 @@ def test_csv_connector():
         print("✗ CSV connection failed")
         return False
 
+def test_csv_batches():
+    """Test streaming CSV data in batches"""
+    print("\nTesting CSV Connector batch streaming...")
+    
+    file_path = os.path.join(os.path.dirname(__file__), 'sample_data.csv')
+    connector = create_connector('csv', file_path=file_path)
+    
+    try:
+        batches = list(connector.fetch_batches(batch_size=3))
+        total = sum(len(batch) for batch in batches)
+        if total == len(connector.fetch_data()) and all(len(batch) <= 3 for batch in batches):
+            print(f"✓ Streamed {total} records in {len(batches)} batches")
+            return True
+        print("✗ Batched records do not match full fetch")
+        return False
+    except Exception as e:
+        print(f"✗ Error streaming CSV batches: {e}")
+        return False
+
+def test_sqlite_connector():
+    """Test reading a SQLite database read-only, in batches and after it is replaced"""
+    print("\nTesting SQLite connector...")
+    
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'extract.db')
+            connection = sqlite3.connect(path)
+            connection.execute("CREATE TABLE orders (id INTEGER, region TEXT, amount REAL)")
+            connection.executemany("INSERT INTO orders VALUES (?, ?, ?)", [(i, "north" if i % 2 else "south", i * 2.5) for i in range(25)])
+            connection.commit()
+            connection.close()
+            
+            connector = create_connector('sqlite', file_path=path)
+            if not connector.connect():
+                print("✗ Failed to connect to SQLite database")
+                return False
+            batches = list(connector.fetch_batches("SELECT * FROM orders ORDER BY id", 10))
+            if [len(batch) for batch in batches] != [10, 10, 5] or batches[0][1] != {"id": 1, "region": "north", "amount": 2.5}:
+                print("✗ SQLite batches are wrong")
+                return False
+            try:
+                connector.fetch_data("DELETE FROM orders")
+                print("✗ SQLite connection accepted a write")
+                return False
+            except Exception:
+                pass
+            connector.disconnect()
+            
+            # Replacing the file (as an extract refresh does) must not serve the old database
+            replacement = os.path.join(directory, 'new.db')
+            connection = sqlite3.connect(replacement)
+            connection.execute("CREATE TABLE orders (id INTEGER)")
+            connection.execute("INSERT INTO orders VALUES (99)")
+            connection.commit()
+            connection.close()
+            os.replace(replacement, path)
+            connector.connect()
+            data = connector.fetch_data("SELECT * FROM orders")
+            connector.disconnect()
+            if data != [{"id": 99}]:
+                print(f"✗ Replaced database was not reopened: {data[:3]}")
+                return False
+        print("✓ SQLite reads are batched, read-only and follow a replaced file")
+        return True
+    except Exception as e:
+        print(f"✗ Error testing SQLite connector: {e}")
+        return False
+
+def test_partition_pruning():
+    """Test that partition filters prune directories and partition keys become columns"""
+    print("\nTesting partitioned dataset pruning...")
+    
+    try:
+        import pandas as pd
+        with tempfile.TemporaryDirectory() as directory:
+            for year in (2023, 2024):
+                for month in ("01", "02", "03"):
+                    partition = os.path.join(directory, f"year={year}", f"month={month}")
+                    os.makedirs(partition)
+                    pd.DataFrame({"amount": [1, 2, 3], "region": ["north", "south", "north"]}).to_csv(
+                        os.path.join(partition, "part-0.csv"), index=False)
+            os.makedirs(os.path.join(directory, "_temporary"))
+            
+            connector = create_connector('csv', file_path=directory)
+            if not connector.connect():
+                print("✗ Failed to open partitioned directory")
+                return False
+            query = {"filters": {"year": 2024, "month": {"min": "02"}, "region": "north"}, "columns": ["month", "amount"]}
+            files = connector.list_files(query["filters"])
+            if [partitions for _, partitions in files] != [{"year": 2024, "month": 2}, {"year": 2024, "month": 3}]:
+                print(f"✗ Partition filters did not prune directories: {files}")
+                return False
+            data = connector.fetch_data(json.dumps(query))
+            if data != [{"month": 2, "amount": 1}, {"month": 2, "amount": 3}, {"month": 3, "amount": 1}, {"month": 3, "amount": 3}]:
+                print(f"✗ Partitioned rows are wrong: {data}")
+                return False
+            if len(connector.fetch_data(None)) != 18:
+                print("✗ Unfiltered read did not return every file")
+                return False
+        print("✓ Partition filters pruned directories and row filters applied")
+        return True
+    except Exception as e:
+        print(f"✗ Error reading partitioned dataset: {e}")
+        return False
+
+def test_compressed_csv():
+    """Test that compressed CSV files read the same as the uncompressed file"""
+    print("\nTesting compressed CSV files...")
+    
+    import gzip
+    import bz2
+    text = "id,city,amount\n" + "".join(f"{i},Zürich-{i % 7},{i * 0.5}\n" for i in range(500))
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            plain = os.path.join(directory, 'plain.csv')
+            with open(plain, 'w', encoding='utf-8') as f:
+                f.write(text)
+            expected = create_connector('csv', file_path=plain).fetch_data()
+            for name, opener in (('data.csv.gz', gzip.open), ('data.csv.bz2', bz2.open), ('no_suffix.csv', gzip.open)):
+                path = os.path.join(directory, name)
+                with opener(path, 'wt', encoding='utf-8') as f:
+                    f.write(text)
+                connector = create_connector('csv', file_path=path)
+                if not connector.connect() or connector.fetch_data() != expected:
+                    print(f"✗ {name} did not read the same as the uncompressed file")
+                    return False
+                batches = list(connector.fetch_batches(batch_size=200))
+                if [len(batch) for batch in batches] != [200, 200, 100] or batches[0][0] != expected[0]:
+                    print(f"✗ {name} batches are wrong")
+                    return False
+        print("✓ gzip and bz2 CSV files read the same as uncompressed ones")
+        return True
+    except Exception as e:
+        print(f"✗ Error reading compressed CSV: {e}")
+        return False
+
+def test_parquet_metadata():
+    """Test answering count, min, max and null count queries from Parquet footers"""
+    print("\nTesting Parquet metadata queries...")
+    
+    previous_url = os.environ.get('CACHE_SERVICE_URL')
+    os.environ['CACHE_SERVICE_URL'] = 'http://127.0.0.1:9'
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        from app import app
+        client = app.test_client()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'sales.parquet')
+            table = pa.table({"amount": [5, None, 12, 3], "region": ["north", "south", None, "east"]})
+            pq.write_table(table, path, row_group_size=2)
+            
+            response = client.post('/api/metadata', json={"type": "parquet", "params": {"file_path": path}})
+            metadata = response.get_json()
+            amount = metadata.get("columns", {}).get("amount", {}) if response.status_code == 200 else {}
+            if metadata.get("rowCount") != 4 or (amount.get("min"), amount.get("max"), amount.get("nullCount")) != (3, 12, 1):
+                print(f"✗ Footer statistics are wrong: {metadata}")
+                return False
+            
+            response = client.post('/api/metadata', json={
+                "type": "parquet", "params": {"file_path": path}, "query": {"filters": {"region": "north"}}
+            })
+            if response.status_code != 400:
+                print(f"✗ Filtered query on a single file returned {response.status_code} instead of 400")
+                return False
+            
+            partition = os.path.join(directory, 'dataset', 'year=2024')
+            os.makedirs(partition)
+            pq.write_table(table, os.path.join(partition, 'part-0.parquet'))
+            response = client.post('/api/metadata', json={
+                "type": "parquet", "params": {"file_path": os.path.dirname(partition)}, "query": {"filters": {"year": 2023}}
+            })
+            if response.status_code != 200 or response.get_json().get("rowCount") != 0:
+                print(f"✗ Pruned partitioned query returned {response.get_json()}")
+                return False
+            response = client.post('/api/metadata', json={
+                "type": "parquet", "params": {"file_path": os.path.dirname(partition)},
+                "query": {"filters": {"year": 2024, "region": "north"}}
+            })
+            if response.status_code != 400:
+                print(f"✗ Row filter on a partitioned dataset returned {response.status_code}: {response.get_json()}")
+                return False
+        print("✓ Metadata answered from footers; row filters rejected")
+        return True
+    except Exception as e:
+        print(f"✗ Error querying Parquet metadata: {e}")
+        return False
+    finally:
+        if previous_url is None:
+            os.environ.pop('CACHE_SERVICE_URL', None)
+        else:
+            os.environ['CACHE_SERVICE_URL'] = previous_url
+
+def test_export_targets():
+    """Test that file exports stay inside EXPORT_DIR and database writes map NaT to NULL"""
+    print("\nTesting export targets...")
+    
+    previous = {name: os.environ.get(name) for name in ('CACHE_SERVICE_URL', 'EXPORT_DIR')}
+    os.environ['CACHE_SERVICE_URL'] = 'http://127.0.0.1:9'
+    try:
+        import pandas as pd
+        from app import app
+        from data_connectors import _sql_insert_batches, _table_identifier
+        client = app.test_client()
+        source = {"type": "csv", "params": {"file_path": os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sample_data.csv')}}
+        with tempfile.TemporaryDirectory() as directory:
+            export_dir = os.path.join(directory, 'exports')
+            os.makedirs(export_dir)
+            os.symlink(directory, os.path.join(export_dir, 'escape'))
+            os.environ['EXPORT_DIR'] = export_dir
+            
+            for file_path in ('../outside.csv', os.path.join(directory, 'outside.csv'), 'escape/outside.csv', '.'):
+                response = client.post('/api/export', json={"source": source, "target": {"type": "csv", "params": {"file_path": file_path}}})
+                if response.status_code != 400 or os.path.exists(os.path.join(directory, 'outside.csv')):
+                    print(f"✗ Export to {file_path} was not rejected")
+                    return False
+            
+            response = client.post('/api/export', json={"source": source, "target": {"type": "csv", "params": {"file_path": "report.csv"}}})
+            if response.status_code != 200 or not os.path.exists(os.path.join(export_dir, 'report.csv')):
+                print(f"✗ Export inside the export directory failed: {response.get_json()}")
+                return False
+        
+        if _table_identifier({"table": "sales.my_table"}, '"', '"', upper_case=True) != '"SALES"."MY_TABLE"':
+            print("✗ Oracle table names were not upper-cased")
+            return False
+        
+        connection = sqlite3.connect(':memory:')
+        connection.execute('CREATE TABLE "EVENTS" ("ID" INTEGER, "AT" TEXT, "Mixed Case" REAL)')
+        written = _sql_insert_batches(connection, '"EVENTS"', [[
+            {"id": 1, "at": pd.Timestamp("2024-01-01"), "Mixed Case": 1.5},
+            {"id": 2, "at": pd.NaT, "Mixed Case": float("nan")}
+        ]], 10, None, lambda position: "?", ('"', '"'), upper_case=True)
+        rows = connection.execute('SELECT "ID", "AT", "Mixed Case" FROM "EVENTS" ORDER BY "ID"').fetchall()
+        connection.close()
+        if written != 2 or rows[1] != (2, None, None) or rows[0][1] is None:
+            print(f"✗ NaT and NaN were not written as NULL: {rows}")
+            return False
+        print("✓ File exports are confined to EXPORT_DIR; NaT and NaN are written as NULL")
+        return True
+    except Exception as e:
+        print(f"✗ Error exporting: {e}")
+        return False
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+def test_array_fetch():
+    """Test that array fetches batch rows and convert values like pd.read_sql"""
+    print("\nTesting array fetch batches...")
+    
+    try:
+        import pandas as pd
+        from data_connectors import _array_fetch_batches
+        connection = sqlite3.connect(':memory:')
+        connection.execute("CREATE TABLE readings (id INTEGER, sensor TEXT, value INTEGER)")
+        connection.executemany("INSERT INTO readings VALUES (?, ?, ?)",
+                               [(i, f"s{i % 3}", None if i % 5 == 0 else i * 10) for i in range(23)])
+        query = "SELECT * FROM readings ORDER BY id"
+        expected = pd.read_sql(query, connection).to_dict('records')
+        
+        cursor = connection.cursor()
+        cursor.execute(query)
+        batches = list(_array_fetch_batches(cursor, 10, 3))
+        cursor.close()
+        connection.close()
+        if [len(batch) for batch in batches] != [10, 10, 3]:
+            print(f"✗ Array fetch batch sizes are wrong: {[len(batch) for batch in batches]}")
+            return False
+        records = [record for batch in batches for record in batch]
+        if json.dumps(records) != json.dumps(expected):
+            print("✗ Array fetch records differ from pd.read_sql")
+            return False
+        print("✓ Array fetch batches match pd.read_sql")
+        return True
+    except Exception as e:
+        print(f"✗ Error reading with array fetch: {e}")
+        return False
+
+def test_dataset_store_round_trip():
+    """Test storing records by content hash and reading them back"""
+    print("\nTesting dataset store round trip...")
+    
+    records = [{"id": i, "name": f"row-{i}", "amount": i * 1.5} for i in range(25)]
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            store = DatasetStore(directory)
+            handle = store.put_records(records)
+            if not DatasetStore.is_handle(handle) or store.put_records(records) != handle:
+                print("✗ Identical content did not map to the same handle")
+                return False
+            if store.get_records(handle) != records or store.get_records(handle, 20, 10) != records[20:]:
+                print("✗ Stored records do not read back unchanged")
+                return False
+            batches = list(store.iter_batches(handle, 10))
+            if [len(batch) for batch in batches] != [10, 10, 5] or store.info(handle)["rowCount"] != 25:
+                print("✗ Stored dataset batches or row count are wrong")
+                return False
+            if store.exists("ds-" + "0" * 32) or store.exists("../etc/passwd"):
+                print("✗ Unknown or invalid handles reported as present")
+                return False
+            
+            # Pages are read by offset and limit, which must not be negative
+            from app import app, dataset_store
+            previous_root, dataset_store.root = dataset_store.root, directory
+            try:
+                client = app.test_client()
+                page = client.get(f'/api/datasets/{handle}?offset=20&limit=10').get_json()
+                statuses = [client.get(f'/api/datasets/{handle}?{query}').status_code
+                            for query in ('offset=-1', 'limit=-5', 'limit=abc')]
+            finally:
+                dataset_store.root = previous_root
+            if page["data"] != records[20:] or "nextOffset" in page or statuses != [400, 400, 400]:
+                print(f"✗ Dataset pages or invalid page requests were handled wrongly: {statuses}")
+                return False
+        print(f"✓ Stored and read back {len(records)} records as {handle}")
+        return True
+    except Exception as e:
+        print(f"✗ Error using dataset store: {e}")
+        return False
+
+def test_spill_schema_drift():
+    """Test that a spilled fetch keeps batches whose column types drift"""
+    print("\nTesting spilled fetch with schema drift...")
+    
+    batches = [
+        [{"id": 1, "amount": 10, "note": None}],
+        [{"id": 2, "amount": 2.5, "note": None}],
+        [{"id": 3, "amount": 4, "note": "late", "flag": True}],
+        [{"id": 4, "amount": None, "note": 7}]
+    ]
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            store = DatasetStore(directory)
+            result = fetch_bounded(iter(batches), FetchBudget(memory_bytes=0), store)
+            if not result.spilled:
+                print("✗ Fetch over the memory budget was not spilled")
+                return False
+            records = store.get_records(result.dataset_handle)
+            expected = [
+                {"id": 1, "amount": 10.0, "note": None, "flag": None},
+                {"id": 2, "amount": 2.5, "note": None, "flag": None},
+                {"id": 3, "amount": 4.0, "note": "late", "flag": True},
+                {"id": 4, "amount": None, "note": "7", "flag": None}
+            ]
+            if records != expected:
+                print(f"✗ Spilled rows were changed: {records}")
+                return False
+            if [name for name in os.listdir(directory) if name.endswith(".tmp")]:
+                print("✗ Rewriting the spill file left a temporary file behind")
+                return False
+        print("✓ Spilled dataset widened its schema for null, float and new columns")
+        return True
+    except Exception as e:
+        print(f"✗ Error spilling drifting batches: {e}")
+        return False
+
+def test_incremental_batches():
+    """Test that SQL cursors, JSON arrays and Excel sheets are read batch by batch like fetch_data"""
+    print("\nTesting incremental batch readers...")
+    
+    import data_connectors
+    records = [{"id": i, "name": f"row-{i}", "note": "a],[\"b" if i % 3 else None, "amount": i * 0.5} for i in range(25)]
+    try:
+        # Server-side cursor batches are built like pd.read_sql rows
+        connection = sqlite3.connect(":memory:")
+        connection.execute("CREATE TABLE items (id INTEGER, amount REAL)")
+        connection.executemany("INSERT INTO items VALUES (?, ?)", [(i, i * 0.5) for i in range(25)])
+        batches = list(data_connectors._sql_batches(connection.cursor(), "SELECT * FROM items", 10))
+        connection.close()
+        if [len(batch) for batch in batches] != [10, 10, 5] or batches[2][-1] != {"id": 24, "amount": 12.0}:
+            print("✗ SQL cursor batches are wrong")
+            return False
+        
+        with tempfile.TemporaryDirectory() as directory:
+            json_path = os.path.join(directory, "records.json")
+            with open(json_path, "w") as f:
+                json.dump(records, f, indent=2)
+            previous_size, data_connectors.JSON_READ_SIZE = data_connectors.JSON_READ_SIZE, 7
+            try:
+                connector = create_connector("json", file_path=json_path)
+                batches = list(connector.fetch_batches(None, 10))
+            finally:
+                data_connectors.JSON_READ_SIZE = previous_size
+            if [len(batch) for batch in batches] != [10, 10, 5] or sum(batches, []) != connector.fetch_data(None):
+                print("✗ JSON array batches differ from the whole file")
+                return False
+            
+            excel_path = os.path.join(directory, "records.xlsx")
+            import pandas as pd
+            pd.DataFrame(records).to_excel(excel_path, index=False)
+            connector = create_connector("excel", file_path=excel_path)
+            batches = list(connector.fetch_batches(None, 10))
+            whole = pd.DataFrame(connector.fetch_data(None))
+            if [len(batch) for batch in batches] != [10, 10, 5] or not pd.DataFrame(sum(batches, [])).equals(whole):
+                print("✗ Excel sheet batches differ from the whole sheet")
+                return False
+        print("✓ SQL, JSON and Excel batches match the whole result")
+        return True
+    except ImportError as e:
+        print(f"⚠ Skipping incremental batch readers: {e}")
+        return True
+    except Exception as e:
+        print(f"✗ Error reading batches: {e}")
+        return False
+
+
+def test_sampling():
+    """Test reservoir, stratified and time bucket samples stay bounded and repeatable"""
+    print("\nTesting sampling...")
+    
+    records = [
+        {"id": i, "region": ["north", "south", "east"][i % 3], "ts": f"2024-01-{i % 5 + 1:02d}T12:00:00"}
+        for i in range(1000)
+    ]
+    records.append({"id": 1000, "region": "north", "ts": "not a date"})
+    
+    def batches():
+        return (records[start:start + 128] for start in range(0, len(records), 128))
+    
+    try:
+        sample = reservoir_sample(batches(), 50, seed=7)
+        ids = [record["id"] for record in sample["data"]]
+        if len(ids) != 50 or sample["sourceRowCount"] != 1001 or ids != sorted(ids):
+            print("✗ Reservoir sample is not 50 records in stream order")
+            return False
+        if reservoir_sample(batches(), 50, seed=7)["data"] != sample["data"]:
+            print("✗ Reservoir sample is not repeatable with the same seed")
+            return False
+        
+        stratified = stratified_sample(batches(), ["region"], 10, seed=7)
+        counts = {}
+        for record in stratified["data"]:
+            counts[record["region"]] = counts.get(record["region"], 0) + 1
+        if counts != {"north": 10, "south": 10, "east": 10}:
+            print(f"✗ Stratified sample per region is wrong: {counts}")
+            return False
+        
+        by_day = time_bucket_sample(batches(), "ts", 5, "day", seed=7)
+        if by_day["groupCount"] != 5 or len(by_day["data"]) != 25 or by_day["skippedRowCount"] != 1:
+            print("✗ Time bucket sample did not keep 5 records for each of 5 days")
+            return False
+        
+        try:
+            stratified_sample(batches(), ["id"], 1, max_groups=100)
+            print("✗ Stratified sample accepted more groups than max_groups")
+            return False
+        except ValueError:
+            pass
+        print("✓ Samples are bounded per group and repeatable")
+        return True
+    except Exception as e:
+        print(f"✗ Error sampling: {e}")
+        return False
+
+def test_sketches():
+    """Test that column sketches merge across batches and survive serialisation"""
+    print("\nTesting column sketches...")
+    
+    records = [
+        {"id": i, "amount": float(i % 1000), "category": "common" if i % 4 else f"rare_{i % 400}", "note": None if i % 10 == 0 else "x"}
+        for i in range(20000)
+    ]
+    try:
+        streamed = DatasetSketch()
+        for start in range(0, len(records), 1000):
+            streamed.update(records[start:start + 1000])
+        merged = DatasetSketch()
+        for half in (records[:10000], records[10000:]):
+            part = DatasetSketch()
+            part.update(half)
+            merged.merge(DatasetSketch.from_dict(json.loads(json.dumps(part.to_dict()))))
+        
+        for sketch in (streamed, merged):
+            profile = sketch.profile(top_k=1)
+            columns = profile["columns"]
+            if profile["rowCount"] != 20000 or columns["note"]["nullCount"] != 2000:
+                print("✗ Sketch row or null counts are wrong")
+                return False
+            if abs(columns["id"]["distinctCount"] - 20000) > 20000 * 0.05:
+                print(f"✗ Distinct count estimate {columns['id']['distinctCount']} is off by more than 5%")
+                return False
+            if columns["category"]["topValues"][0]["value"] != "common" or columns["category"]["topValues"][0]["count"] < 15000:
+                print("✗ Most frequent value was not found")
+                return False
+            amount = columns["amount"]
+            if (amount["min"], amount["max"]) != (0.0, 999.0) or abs(amount["quantiles"]["p50"] - 500) > 50:
+                print(f"✗ Quantiles are off: {amount['quantiles']}")
+                return False
+        print("✓ Streamed and merged sketches agree with the data")
+        return True
+    except Exception as e:
+        print(f"✗ Error building sketches: {e}")
+        return False
+
+def test_query_cache_keys():
+    """Test that equivalent SQL shares a cache key and queries are tagged with their tables"""
+    print("\nTesting query cache keys and tags...")
+    
+    params = {"host": "db", "port": 5432, "database": "sales", "password": "secret"}
+    try:
+        first = build_cache_key("postgresql", params, "SELECT *\n  FROM orders o -- recent\nWHERE o.id = 5")
+        second = build_cache_key("PostgreSQL", params, "select * from ORDERS o where o.id=5;")
+        other = build_cache_key("postgresql", params, "select * from orders o where o.id = 6")
+        if first != second or first == other:
+            print("✗ Normalised queries do not share keys, or different literals collide")
+            return False
+        
+        if normalize_sql("SELECT 'it''s' , 2.5") != ("select ?,?", ["it's", 2.5]):
+            print("✗ String and numeric literals were not lifted out as parameters")
+            return False
+        
+        tables = extract_tables('SELECT * FROM sales.Orders o JOIN "Customers" c ON o.cid = c.id WHERE o.id IN (SELECT id FROM refunds)')
+        tables += extract_tables("SELECT * FROM items i, [Stock] WHERE i.id = 1")
+        if tables != ["customers", "refunds", "sales.orders", "items", "stock"]:
+            print(f"✗ Wrong tables extracted: {tables}")
+            return False
+        
+        tags = build_cache_tags("postgresql", params, "select * from orders")
+        if tags != [table_tag("postgresql", {**params, "password": "other"}, "ORDERS")] or "secret" in tags[0]:
+            print(f"✗ Wrong tags for a SQL query: {tags}")
+            return False
+        file_tags = build_cache_tags("csv", {"file_path": "/data/a.csv"}, "")
+        if len(file_tags) != 1 or not file_tags[0].startswith("source:csv:"):
+            print(f"✗ Wrong tags for a file source: {file_tags}")
+            return False
+        print("✓ Equivalent queries share keys and results are tagged by table")
+        return True
+    except Exception as e:
+        print(f"✗ Error building cache keys: {e}")
+        return False
+
+def test_benchmark_fixture_restart():
+    """Test that a fixture is rewritten from scratch after an interrupted run"""
+    print("\nTesting benchmark fixture generation...")
+    
+    try:
+        from benchmark_connectors import generate_fixture
+        with tempfile.TemporaryDirectory() as directory:
+            for fmt in ("csv", "sqlite"):
+                extension = {"sqlite": "db"}.get(fmt, fmt)
+                # Simulate a run that was killed half way through writing the fixture
+                partial = os.path.join(directory, f"partial_bench_20_1.{extension}")
+                generate_fixture(fmt, 20, directory, 1)
+                os.replace(os.path.join(directory, f"bench_20_1.{extension}"), partial)
+                
+                path = generate_fixture(fmt, 20, directory, 1)
+                connector = create_connector(fmt, file_path=path)
+                connector.connect()
+                data = connector.fetch_data("SELECT * FROM bench" if fmt == "sqlite" else None)
+                connector.disconnect()
+                if len(data) != 20 or os.path.exists(partial):
+                    print(f"✗ {fmt} fixture has {len(data)} rows instead of 20 after an interrupted run")
+                    return False
+            
+            # The measuring process must not report the memory its parent used
+            from benchmark_connectors import run_benchmark
+            ballast = np.ones(400 * 2**20 // 8)
+            measurement = run_benchmark("csv", generate_fixture("csv", 20, directory, 1), "fetch_data", 10, 300)
+            del ballast
+            if measurement.get("peak_rss_exact") and measurement["peak_rss_bytes"] >= 400 * 2**20:
+                print(f"✗ Peak RSS of {measurement['peak_rss_bytes'] / 2**20:.0f} MiB includes the parent's memory")
+                return False
+        print("✓ Fixtures ignore files left by interrupted runs")
+        return True
+    except Exception as e:
+        print(f"✗ Error generating fixtures: {e}")
+        return False
+
+def test_downsampling():
+    """Test that LTTB, min/max and average downsampling keep the shape of a series"""
+    print("\nTesting downsampling...")
+    
+    x = np.arange(10000, dtype=float)
+    y = np.sin(x / 500.0)
+    y[4321] = 50.0
+    try:
+        kept = downsampling.lttb(x, y, 100)
+        if len(kept) != 100 or kept[0] != 0 or kept[-1] != 9999 or 4321 not in kept or np.any(np.diff(kept) <= 0):
+            print("✗ LTTB did not keep 100 ordered points including the ends and the spike")
+            return False
+        
+        kept = downsampling.minmax(x, y, 100)
+        if len(kept) > 100 or 4321 not in kept or np.argmin(y) not in kept or np.any(np.diff(kept) <= 0):
+            print("✗ Min/max downsampling lost an extreme point")
+            return False
+        
+        mean_x, mean_y = downsampling.average(x, np.ones_like(x), 10)
+        if len(mean_x) != 10 or mean_x[0] != 499.5 or not np.allclose(mean_y, 1.0):
+            print("✗ Averaged buckets are wrong")
+            return False
+        
+        if len(downsampling.lttb(x[:50], y[:50], 100)) != 50:
+            print("✗ Series shorter than the threshold were not returned whole")
+            return False
+        
+        # Timezone-aware time axes keep their offset
+        from app import _downsample_series
+        import pandas as pd
+        times = pd.Series(pd.date_range("2024-01-01", periods=1000, freq="min", tz="Europe/Berlin"))
+        for method in ("lttb", "minmax", "average"):
+            x_out, y_out = _downsample_series(times, pd.Series(y[:1000]), 50, method)
+            if not x_out or not x_out[0].startswith("2024-01-01T00:0") or not x_out[0].endswith("+01:00"):
+                print(f"✗ {method} downsampling of timezone-aware times returned {x_out[:1]}")
+                return False
+        print("✓ Downsampled series keep their ends and extremes")
+        return True
+    except Exception as e:
+        print(f"✗ Error downsampling: {e}")
+        return False
+
+def test_rollup_idempotent_ingest():
+    """Test that ingesting a source again replaces its rows in a rollup instead of adding them"""
+    print("\nTesting idempotent rollup ingest...")
+    
+    rows = [{"region": "north", "amount": 10}, {"region": "south", "amount": 5}, {"region": "north", "amount": 1}]
+    try:
+        manager = RollupManager()
+        manager.declare("sales", [{"dimensions": ["region"], "measures": ["amount"]}])
+        manager.ingest("sales", [rows], source="query-1", version="v1")
+        if manager.ingest("sales", [rows], source="query-1", version="v1") != 0:
+            print("✗ Same source and version was ingested twice")
+            return False
+        manager.ingest("sales", [rows[:2]], source="query-1", version="v2")
+        manager.ingest("sales", [[{"region": "north", "amount": 100}]])
+        
+        totals = manager.query("sales", ["region"], {"amount": ["sum", "count"]})["data"]
+        totals = {record["region"]: (record["amount_sum"], record["amount_count"]) for record in totals}
+        if totals != {"north": (110.0, 2), "south": (5.0, 1)} or manager.describe("sales")["rowCount"] != 3:
+            print(f"✗ Rollup totals after re-ingesting a source are wrong: {totals}")
+            return False
+        
+        # Replacing a source that supplied a minimum or maximum recomputes it from the rest
+        manager.ingest("sales", [[{"region": "south", "amount": 50}]], source="query-2")
+        manager.ingest("sales", [[{"region": "south", "amount": 7}]], source="query-2")
+        south = manager.query("sales", ["region"], {"amount": ["min", "max", "sum"]}, {"region": "south"})["data"][0]
+        if (south["amount_min"], south["amount_max"], south["amount_sum"]) != (5, 7, 12.0):
+            print(f"✗ Replaced contribution left stale aggregates: {south}")
+            return False
+        
+        # Contributions beyond the limit are dropped, least recently ingested first
+        previous_limit, rollups.ROLLUP_MAX_SOURCES = rollups.ROLLUP_MAX_SOURCES, 2
+        try:
+            manager.ingest("sales", [[{"region": "east", "amount": 3}]], source="query-3")
+        finally:
+            rollups.ROLLUP_MAX_SOURCES = previous_limit
+        description = manager.describe("sales")
+        totals = manager.query("sales", ["region"], {"amount": ["sum"]})["data"]
+        totals = {record["region"]: record["amount_sum"] for record in totals}
+        if description["sourceCount"] != 2 or totals != {"north": 100.0, "south": 7.0, "east": 3.0}:
+            print(f"✗ Oldest contribution was not dropped: {description['sourceCount']} sources, {totals}")
+            return False
+        print("✓ Re-ingested source replaced its rows; unsourced rows were added")
+    except Exception as e:
+        print(f"✗ Error ingesting rollup rows: {e}")
+        return False
+    
+    # Fetching the same query again (a cache miss, replay or warm-up) must not double the cube
+    previous_url = os.environ.get('CACHE_SERVICE_URL')
+    os.environ['CACHE_SERVICE_URL'] = 'http://127.0.0.1:9'
+    try:
+        from app import app, dataset_store
+        client = app.test_client()
+        with tempfile.TemporaryDirectory() as directory:
+            previous_root, dataset_store.root = dataset_store.root, directory
+            try:
+                client.post('/api/rollups', json={
+                    "name": "refetch_test",
+                    "cubes": [{"dimensions": ["department"], "measures": ["salary"]}]
+                })
+                config = {
+                    "type": "csv",
+                    "params": {"file_path": os.path.join(os.path.dirname(__file__), 'sample_data.csv')},
+                    "rollup": "refetch_test",
+                    "include_data": False
+                }
+                first = client.post('/api/connect', json=config).get_json()
+                client.post('/api/connect', json=config)
+            finally:
+                dataset_store.root = previous_root
+        rollup = client.get('/api/rollups/refetch_test').get_json()
+        if rollup["rowCount"] != first["rowCount"]:
+            print(f"✗ Refetching a query left {rollup['rowCount']} rows in the rollup instead of {first['rowCount']}")
+            return False
+        print(f"✓ Refetched query kept {rollup['rowCount']} rows in the rollup")
+        return True
+    except Exception as e:
+        print(f"✗ Error refetching into a rollup: {e}")
+        return False
+    finally:
+        if previous_url is None:
+            os.environ.pop('CACHE_SERVICE_URL', None)
+        else:
+            os.environ['CACHE_SERVICE_URL'] = previous_url
+
+def test_rollup_budget_overflow():
+    """Test that a fetch aborted over its row limit leaves the rollup cubes untouched"""
+    print("\nTesting rollup ingest of an over-budget fetch...")
+    
+    # Keep cached results from answering the request
+    previous_url = os.environ.get('CACHE_SERVICE_URL')
+    os.environ['CACHE_SERVICE_URL'] = 'http://127.0.0.1:9'
+    try:
+        from app import app
+        client = app.test_client()
+        client.post('/api/rollups', json={
+            "name": "budget_test",
+            "cubes": [{"dimensions": ["department"], "measures": ["salary"]}]
+        })
+        response = client.post('/api/connect', json={
+            "type": "csv",
+            "params": {"file_path": os.path.join(os.path.dirname(__file__), 'sample_data.csv')},
+            "rollup": "budget_test",
+            "max_rows": 3,
+            "batch_size": 2
+        })
+        rollup = client.get('/api/rollups/budget_test').get_json()
+        if response.status_code != 413 or rollup["rowCount"] != 0:
+            print(f"✗ Over-budget fetch returned {response.status_code} and left {rollup['rowCount']} rows in the rollup")
+            return False
+        print("✓ Over-budget fetch was rejected and ingested nothing")
+        return True
+    except Exception as e:
+        print(f"✗ Error testing rollup ingest: {e}")
+        return False
+    finally:
+        if previous_url is None:
+            os.environ.pop('CACHE_SERVICE_URL', None)
+        else:
+            os.environ['CACHE_SERVICE_URL'] = previous_url
+
+def test_warm_up_recipe():
+    """Test that warm-up recipes carry no credentials or rollup and only token-bearing replays get configured credentials"""
+    print("\nTesting warm-up recipes...")
+    
+    import threading
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    cache_writes = []
+    
+    class CacheService(BaseHTTPRequestHandler):
+        """Cache service that misses every read and records every write"""
+        def do_GET(self):
+            self.send_response(404)
+            self.end_headers()
+        
+        def do_POST(self):
+            cache_writes.append(json.loads(self.rfile.read(int(self.headers['Content-Length']))))
+            self.send_response(201)
+            self.end_headers()
+        
+        def log_message(self, *args):
+            pass
+    
+    server = HTTPServer(('127.0.0.1', 0), CacheService)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    previous = {name: os.environ.get(name) for name in ('CACHE_SERVICE_URL', 'DATA_SOURCE_CREDENTIALS_FILE', 'WARMUP_TOKEN')}
+    os.environ['CACHE_SERVICE_URL'] = f'http://127.0.0.1:{server.server_port}'
+    try:
+        import app as app_module
+        from app import app, dataset_store
+        client = app.test_client()
+        with tempfile.TemporaryDirectory() as directory:
+            previous_root, dataset_store.root = dataset_store.root, directory
+            try:
+                client.post('/api/rollups', json={
+                    "name": "recipe_test",
+                    "cubes": [{"dimensions": ["department"], "measures": ["salary"]}]
+                })
+                client.post('/api/connect', json={
+                    "type": "csv",
+                    "params": {
+                        "file_path": os.path.join(os.path.dirname(__file__), 'sample_data.csv'),
+                        "username": "analyst",
+                        "password": "secret"
+                    },
+                    "rollup": "recipe_test"
+                })
+                body = cache_writes[0]["recipe"]["body"]
+                if "rollup" in body or set(body["params"]) != {"file_path"}:
+                    print(f"✗ Recipe kept credentials or the rollup: {body}")
+                    return False
+                if client.post('/api/connect', json=body).status_code != 200 or len(cache_writes) != 2:
+                    print("✗ Replaying the recipe failed")
+                    return False
+            finally:
+                dataset_store.root = previous_root
+            
+            # Only warm-up replays carrying the token connect with the configured credentials
+            params = {"host": "db", "port": 5432, "database": "sales"}
+            credentials_file = os.path.join(directory, 'credentials.json')
+            with open(credentials_file, 'w') as f:
+                json.dump([{"type": "postgresql", **params, "username": "warmer", "password": "secret"}], f)
+            os.environ['DATA_SOURCE_CREDENTIALS_FILE'] = credentials_file
+            os.environ['WARMUP_TOKEN'] = 'warm-up-token'
+            connected = []
+            
+            def connect(connector_type, **connector_params):
+                # Serves the sample file in place of a database server
+                connected.append(connector_params)
+                return create_connector("csv", file_path=os.path.join(os.path.dirname(__file__), 'sample_data.csv'))
+            
+            app_module.create_connector = connect
+            try:
+                query = "select * from orders"
+                cache_writes.clear()
+                client.post('/api/connect', json={"type": "postgresql", "params": {**params, "username": "warmer", "password": "secret"}, "query": query})
+                recipe = cache_writes[0].get("recipe")
+                if recipe is None or set(recipe["body"]["params"]) != set(params):
+                    print(f"✗ Recipe of a request with the configured credentials was not saved without them: {recipe}")
+                    return False
+                client.post('/api/connect', json=recipe["body"])
+                client.post('/api/connect', json=recipe["body"], headers={"X-Warm-Up-Token": "wrong"})
+                client.post('/api/connect', json=recipe["body"], headers={"X-Warm-Up-Token": "warm-up-token"})
+                if [connection.get("password") for connection in connected[1:]] != [None, None, "secret"]:
+                    print(f"✗ Configured credentials were used without the warm-up token: {connected[1:]}")
+                    return False
+                if cache_writes[3]["key"] != cache_writes[0]["key"]:
+                    print("✗ Warm-up replay computed a different cache key")
+                    return False
+                
+                # Other credentials get their own keys and no recipe a replay could not match
+                cache_writes.clear()
+                for credentials in ({"username": "warmer", "password": "guess"}, {"username": "warmer"}):
+                    client.post('/api/connect', json={"type": "postgresql", "params": {**params, **credentials}, "query": query})
+                keys = {write["key"] for write in cache_writes}
+                if len(keys) != 2 or build_cache_key("postgresql", {**params, "username": "warmer", "password": "secret"}, query) in keys:
+                    print("✗ Cache key does not depend on the password")
+                    return False
+                if any("recipe" in write for write in cache_writes):
+                    print("✗ Recipe was saved for credentials a replay cannot reproduce")
+                    return False
+            finally:
+                app_module.create_connector = create_connector
+        print("✓ Recipe had no credentials or rollup and only the warm-up replay got configured credentials")
+        return True
+    except Exception as e:
+        print(f"✗ Error replaying a warm-up recipe: {e}")
+        return False
+    finally:
+        server.shutdown()
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
 def main():
     """Main test function"""
     print("New Data Connectors Test")
@@ -63,6 +925,24 @@ def main():
     results = []
     results.append(test_csv_connector())
     results.append(test_json_connector())
+    results.append(test_csv_batches())
+    results.append(test_sqlite_connector())
+    results.append(test_partition_pruning())
+    results.append(test_compressed_csv())
+    results.append(test_parquet_metadata())
+    results.append(test_export_targets())
+    results.append(test_array_fetch())
+    results.append(test_dataset_store_round_trip())
+    results.append(test_spill_schema_drift())
+    results.append(test_incremental_batches())
+    results.append(test_sampling())
+    results.append(test_sketches())
+    results.append(test_query_cache_keys())
+    results.append(test_benchmark_fixture_restart())
+    results.append(test_downsampling())
+    results.append(test_rollup_idempotent_ingest())
+    results.append(test_rollup_budget_overflow())
+    results.append(test_warm_up_recipe())
     
     print("\nTest Summary:")
     print("=" * 25)
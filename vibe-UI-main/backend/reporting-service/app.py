@@ -2,7 +2,10 @@ from flask import Flask, jsonify, request, send_file
 from flask_cors import CORS
 import os
 import io
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared'))
 from report_generator import report_generator
+from dataset_store import dataset_store
 
 app = Flask(__name__)
 CORS(app, resources={r"/api/*": {"origins": "*"}})
@@ -30,6 +33,20 @@ def get_template(template_id):
         return jsonify({"error": "Template not found"}), 404
     return jsonify(template)
 
+def _resolve_data_sources(data_sources):
+    """Replace {"dataset_handle": ...} data sources with records read from the dataset store"""
+    resolved = {}
+    for name, source in data_sources.items():
+        if isinstance(source, dict) and source.get("dataset_handle"):
+            resolved[name] = dataset_store.get_records(
+                source["dataset_handle"],
+                int(source.get("offset", 0)),
+                source.get("limit")
+            )
+        else:
+            resolved[name] = source
+    return resolved
+
 # Generate report from template
 @app.route('/api/reports/generate', methods=['POST'])
 def generate_report():
@@ -43,8 +60,11 @@ def generate_report():
         return jsonify({"error": "template_id is required"}), 400
     
     try:
+        data_sources = _resolve_data_sources(data_sources)
         report = report_generator.create_report_from_template(template_id, data_sources, parameters)
         return jsonify(report)
+    except KeyError as e:
+        return jsonify({"error": f"Dataset not found: {str(e)}"}), 404
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
@@ -0,0 +1,337 @@
+"""
+Content-addressed dataset store shared between backend services
+
+Datasets are written once as uncompressed Arrow IPC files named after the
+SHA-256 of their contents. Services exchange the short dataset handle
+instead of the rows themselves and read the file through a memory map, so
+the same bytes are not serialised to JSON on every hop.
+"""
+import os
+import re
+import json
+import hashlib
+import tempfile
+from typing import List, Dict, Any, Optional, Iterator
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+HANDLE_PREFIX = "ds-"
+HANDLE_PATTERN = re.compile(r"^ds-[0-9a-f]{32}$")
+
+class DatasetStore:
+    """Arrow IPC dataset store keyed by content hash"""
+    
+    def __init__(self, root: Optional[str] = None):
+        """Initialize the store rooted at DATASET_STORE_PATH"""
+        self.root = root or os.getenv('DATASET_STORE_PATH', '/data/datasets')
+    
+    @staticmethod
+    def is_handle(value: Any) -> bool:
+        """Check if a value looks like a dataset handle"""
+        return isinstance(value, str) and HANDLE_PATTERN.match(value) is not None
+    
+    def _path(self, handle: str) -> str:
+        """Resolve the file path of a dataset handle"""
+        if not self.is_handle(handle):
+            raise ValueError(f"Invalid dataset handle: {handle}")
+        return os.path.join(self.root, f"{handle}.arrow")
+    
+    def exists(self, handle: str) -> bool:
+        """Check if a dataset is present in the store"""
+        return self.is_handle(handle) and os.path.exists(self._path(handle))
+    
+    def put_table(self, table: pa.Table) -> str:
+        """
+        Store an Arrow table
+        
+        Args:
+            table: Table to store
+        
+        Returns:
+            Dataset handle; storing identical content twice returns the same handle
+        """
+        sink = pa.BufferOutputStream()
+        with ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        buffer = sink.getvalue()
+        
+        handle = HANDLE_PREFIX + hashlib.sha256(buffer).hexdigest()[:32]
+        path = self._path(handle)
+        if os.path.exists(path):
+            return handle
+        
+        # Write to a temporary file first so readers never see a partial dataset
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(buffer)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return handle
+    
+    def open_writer(self) -> "DatasetWriter":
+        """Start writing a dataset incrementally, one table at a time"""
+        os.makedirs(self.root, exist_ok=True)
+        return DatasetWriter(self)
+    
+    def put_records(self, records: List[Dict[str, Any]]) -> str:
+        """
+        Store a list of records
+        
+        Args:
+            records: List of data records
+        
+        Returns:
+            Dataset handle
+        """
+        return self.put_table(records_to_table(records))
+    
+    def open_table(self, handle: str) -> pa.Table:
+        """
+        Open a stored dataset as a memory-mapped Arrow table
+        
+        Args:
+            handle: Dataset handle
+        
+        Returns:
+            Arrow table backed by the memory-mapped file
+        """
+        path = self._path(handle)
+        if not os.path.exists(path):
+            raise KeyError(f"Dataset {handle} not found")
+        source = pa.memory_map(path, 'r')
+        return ipc.open_file(source).read_all()
+    
+    def get_records(self, handle: str, offset: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Read records from a stored dataset
+        
+        Args:
+            handle: Dataset handle
+            offset: Index of the first record to return
+            limit: Maximum number of records to return (optional)
+        
+        Returns:
+            List of data records
+        """
+        table = self.open_table(handle)
+        return table.slice(offset, limit).to_pylist()
+    
+    def iter_batches(self, handle: str, batch_size: int = 10000) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Read a stored dataset as an iterator of record batches
+        
+        Args:
+            handle: Dataset handle
+            batch_size: Maximum number of records per batch
+        
+        Returns:
+            Iterator yielding lists of records
+        """
+        table = self.open_table(handle)
+        for batch in table.to_batches(max_chunksize=batch_size):
+            yield batch.to_pylist()
+    
+    def get_dataframe(self, handle: str) -> pd.DataFrame:
+        """Read a stored dataset as a pandas DataFrame"""
+        return self.open_table(handle).to_pandas()
+    
+    def save_attachment(self, handle: str, name: str, payload: Dict[str, Any]) -> None:
+        """
+        Store JSON metadata alongside a dataset, such as column sketches
+        
+        Args:
+            handle: Dataset handle
+            name: Attachment name
+            payload: JSON-serialisable data
+        """
+        if not re.match(r"^[a-z0-9_]+$", name):
+            raise ValueError(f"Invalid attachment name: {name}")
+        path = f"{self._path(handle)}.{name}.json"
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(fd, 'w') as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, path)
+    
+    def load_attachment(self, handle: str, name: str) -> Optional[Dict[str, Any]]:
+        """Read JSON metadata stored alongside a dataset, or None if there is none"""
+        if not re.match(r"^[a-z0-9_]+$", name):
+            raise ValueError(f"Invalid attachment name: {name}")
+        path = f"{self._path(handle)}.{name}.json"
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as f:
+            return json.load(f)
+    
+    def info(self, handle: str) -> Dict[str, Any]:
+        """Get row count, columns and size of a stored dataset"""
+        table = self.open_table(handle)
+        return {
+            "datasetHandle": handle,
+            "rowCount": table.num_rows,
+            "columns": table.column_names,
+            "bytes": os.path.getsize(self._path(handle))
+        }
+
+class DatasetWriter:
+    """
+    Incremental writer for datasets too large to hold in memory
+    
+    Tables are appended to a temporary Arrow IPC file; commit hashes the file
+    and moves it to its content address.
+    """
+    
+    def __init__(self, store: DatasetStore):
+        self.store = store
+        fd, self.tmp_path = tempfile.mkstemp(dir=store.root, suffix=".tmp")
+        os.close(fd)
+        self.sink = None
+        self.writer = None
+        self.schema = None
+        self.row_count = 0
+    
+    @property
+    def bytes_written(self) -> int:
+        """Number of bytes written to the temporary file so far"""
+        return self.sink.tell() if self.sink is not None else 0
+    
+    def write_table(self, table: pa.Table) -> None:
+        """
+        Append a table
+        
+        When a later table's schema differs (a column that was all null, an
+        integer column that now holds floats, a new column), the dataset's
+        schema is widened to hold both and the rows written so far are
+        rewritten with it.
+        """
+        if self.writer is None:
+            self.schema = table.schema
+            self.sink = pa.OSFile(self.tmp_path, 'wb')
+            self.writer = ipc.new_file(self.sink, self.schema)
+        elif not table.schema.equals(self.schema):
+            try:
+                schema = _widen_schema(self.schema, table.schema)
+                if not schema.equals(self.schema):
+                    self._rewrite(schema)
+                table = _conform_table(table, self.schema)
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError) as e:
+                raise ValueError(f"Dataset schema changed between batches: {str(e)}")
+        self.writer.write_table(table)
+        self.row_count += table.num_rows
+    
+    def _rewrite(self, schema: pa.Schema) -> None:
+        """Copy the rows written so far into a new temporary file with a wider schema"""
+        self.writer.close()
+        self.sink.close()
+        fd, tmp_path = tempfile.mkstemp(dir=self.store.root, suffix=".tmp")
+        os.close(fd)
+        sink = pa.OSFile(tmp_path, 'wb')
+        writer = ipc.new_file(sink, schema)
+        try:
+            with pa.memory_map(self.tmp_path, 'r') as source:
+                reader = ipc.open_file(source)
+                for index in range(reader.num_record_batches):
+                    writer.write_table(_conform_table(pa.Table.from_batches([reader.get_batch(index)]), schema))
+        except Exception:
+            writer.close()
+            sink.close()
+            os.remove(tmp_path)
+            raise
+        os.remove(self.tmp_path)
+        self.tmp_path, self.sink, self.writer, self.schema = tmp_path, sink, writer, schema
+    
+    def commit(self) -> str:
+        """Finish the file and return its dataset handle"""
+        if self.writer is None:
+            self.abort()
+            raise ValueError("Cannot commit an empty dataset")
+        self.writer.close()
+        self.sink.close()
+        
+        digest = hashlib.sha256()
+        with open(self.tmp_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        handle = HANDLE_PREFIX + digest.hexdigest()[:32]
+        path = self.store._path(handle)
+        if os.path.exists(path):
+            os.remove(self.tmp_path)
+        else:
+            os.replace(self.tmp_path, path)
+        return handle
+    
+    def abort(self) -> None:
+        """Discard everything written so far"""
+        try:
+            if self.writer is not None:
+                self.writer.close()
+            if self.sink is not None:
+                self.sink.close()
+        finally:
+            if os.path.exists(self.tmp_path):
+                os.remove(self.tmp_path)
+
+def _widen_type(left: pa.DataType, right: pa.DataType) -> pa.DataType:
+    """Smallest common type of two column types; columns with unrelated types become strings"""
+    if left.equals(right):
+        return left
+    if pa.types.is_null(left):
+        return right
+    if pa.types.is_null(right):
+        return left
+    if pa.types.is_integer(left) and pa.types.is_integer(right):
+        return pa.int64()
+    if (pa.types.is_integer(left) or pa.types.is_floating(left)) and (pa.types.is_integer(right) or pa.types.is_floating(right)):
+        return pa.float64()
+    return pa.string()
+
+def _widen_schema(current: pa.Schema, incoming: pa.Schema) -> pa.Schema:
+    """Schema holding the columns of both schemas, in first-seen order"""
+    fields = []
+    for field in current:
+        index = incoming.get_field_index(field.name)
+        if index < 0:
+            fields.append(field.with_nullable(True))
+        else:
+            fields.append(pa.field(field.name, _widen_type(field.type, incoming.field(index).type)))
+    for field in incoming:
+        if current.get_field_index(field.name) < 0:
+            fields.append(field.with_nullable(True))
+    return pa.schema(fields)
+
+def _conform_table(table: pa.Table, schema: pa.Schema) -> pa.Table:
+    """Cast a table to a schema, filling columns it lacks with nulls"""
+    columns = []
+    for field in schema:
+        if field.name in table.column_names:
+            columns.append(table.column(field.name).cast(field.type))
+        else:
+            columns.append(pa.nulls(table.num_rows, field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+def records_to_table(records: List[Dict[str, Any]]) -> pa.Table:
+    """
+    Convert records to an Arrow table
+    
+    Columns with mixed Python types that Arrow cannot infer are stored as
+    strings, the same way they would have been serialised to JSON.
+    """
+    df = pd.DataFrame(records)
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+        for column in df.columns:
+            if df[column].dtype == object:
+                try:
+                    pa.array(df[column], from_pandas=True)
+                except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+                    df[column] = df[column].map(lambda v: v if v is None else str(v))
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+# Global instance
+dataset_store = DatasetStore()